@@ -1,22 +1,42 @@
 # app.py
-import streamlit as st
-import pandas as pd
-# Configurar pandas para evitar warnings
-pd.set_option('future.no_silent_downcasting', False)
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
+import time
 
 # Agregar src al path para imports
 sys.path.append(str(Path(__file__).parent / 'src'))
 
 from config import Config
+from utils import import_timer
+
+# Per-module import costs: IMPORT_TIME_REPORT=true or `streamlit run app.py -- --import-report`
+if Config.IMPORT_TIME_REPORT or '--import-report' in sys.argv:
+    import_timer.install()
+
+# Heavy modules (plotly, the Google discovery and OAuth modules, Excel
+# engines) are imported where they are first used
+import streamlit as st
+import pandas as pd
+# Configurar pandas para evitar warnings
+pd.set_option('future.no_silent_downcasting', False)
 from auth.gmail_auth import GmailAuthenticator
+from services.accounts import Account, create_account, get_account, list_accounts
+from services.analytics_summary import AnalyticsSummary
 from services.gmail_service import GmailService
+from services.label_catalog import LabelCatalog
 from services.calendar_service import CalendarService
 from services.data_service import DataService
+from services.message_cache import MessageCache
+from services.sync_scheduler import SyncScheduler, refresh_open_followups, sync_tracked_emails
+from services.thread_cache import ThreadCache
+from utils import discovery
+from utils.api_executor import get_executor
+from utils.health_monitor import HealthMonitor
+from utils.reporter import ConsoleReporter, Reporter
+
+if import_timer.is_installed():
+    import_timer.print_report()
 
 # Configuración de la página
 st.set_page_config(
@@ -58,17 +78,140 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def init_services():
-    """Inicializa todos los servicios necesarios"""
+def init_services(account: Account):
+    """Inicializa todos los servicios necesarios (de la cuenta seleccionada)"""
     Config.ensure_directories()
+    discovery.set_cache_dir(Config.DISCOVERY_DIR)
+    
+    # Shared rate governors, created before any service makes a call.
+    # Quotas are per mailbox, so every account gets its own
+    get_executor(
+        'gmail',
+        account.name,
+        units_per_second=Config.GMAIL_QUOTA_UNITS_PER_SEC,
+        max_concurrency=Config.API_MAX_CONCURRENCY,
+        max_retries=Config.API_MAX_RETRIES
+    )
+    get_executor(
+        'calendar',
+        account.name,
+        units_per_second=Config.CALENDAR_QUOTA_PER_SEC,
+        max_concurrency=Config.API_MAX_CONCURRENCY,
+        max_retries=Config.API_MAX_RETRIES
+    )
     
     # Inicializar servicios
-    gmail_auth = GmailAuthenticator(Config.CREDENTIALS_FILE, Config.GMAIL_SCOPES)
-    calendar_service = CalendarService(Config.CREDENTIALS_FILE, Config.CALENDAR_SCOPES)
-    data_service = DataService(Config.DATA_DIR)
+    gmail_auth = GmailAuthenticator(
+        Config.CREDENTIALS_FILE, Config.GMAIL_SCOPES,
+        token_file=account.gmail_token_file, account=account.name
+    )
+    calendar_service = CalendarService(
+        Config.CREDENTIALS_FILE, Config.CALENDAR_SCOPES,
+        token_file=account.calendar_token_file, account=account.name
+    )
+    data_service = create_data_service(account)
     
     return gmail_auth, calendar_service, data_service
 
+def create_data_service(account: Account, reporter: Reporter = None) -> DataService:
+    """Tracking data of one account (its shard directory)"""
+    return DataService(
+        account.data_dir,
+        backend=Config.STORAGE_BACKEND,
+        journal_max_bytes=Config.JOURNAL_MAX_KB * 1024,
+        journal_max_age_seconds=Config.JOURNAL_MAX_AGE_MINUTES * 60,
+        backup_retention={
+            'keep_recent': Config.MAX_BACKUPS,
+            'keep_hourly': Config.BACKUP_KEEP_HOURLY,
+            'keep_daily': Config.BACKUP_KEEP_DAILY,
+            'keep_weekly': Config.BACKUP_KEEP_WEEKLY
+        },
+        reporter=reporter
+    )
+
+@st.cache_resource
+def get_thread_cache():
+    """Thread cache shared by every session and rerun"""
+    return ThreadCache(
+        max_entries=Config.THREAD_CACHE_MAX_ENTRIES,
+        max_bytes=Config.THREAD_CACHE_MAX_MB * 1024 * 1024
+    )
+
+@st.cache_resource
+def get_message_cache(cache_file: Path):
+    """On-disk cache of parsed messages (one per account) shared by every session and rerun"""
+    Config.ensure_directories()
+    return MessageCache(cache_file)
+
+@st.cache_resource
+def get_label_catalog(catalog_file: Path):
+    """Gmail label list (one per account) shared by every session and rerun"""
+    Config.ensure_directories()
+    return LabelCatalog(catalog_file, ttl_seconds=Config.LABEL_CACHE_TTL_MINUTES * 60)
+
+@st.cache_resource
+def get_startup_report():
+    """Timings of the first run of the process (cold start)"""
+    return {}
+
+@st.cache_resource
+def get_health_monitor(account_name: str):
+    """Connection health (one per account) shared by every session and rerun"""
+    return HealthMonitor(
+        ttl_seconds=Config.HEALTH_TTL_SECONDS,
+        failure_ttl_seconds=Config.HEALTH_FAILURE_TTL_SECONDS,
+        deadline_seconds=Config.HEALTH_DEADLINE_SECONDS
+    )
+
+@st.cache_resource
+def get_sync_scheduler(account_name: str):
+    """
+    Background sync of one account, started once per process. It runs on
+    its own thread with its own Gmail client, so no page waits for Gmail.
+    """
+    account = get_account(Config.DATA_DIR, account_name)
+    # The thread has no page to write to: its messages go to the console
+    reporter = ConsoleReporter(prefix=f"[sync {account.name}] ", quiet=True)
+    thread_cache = get_thread_cache()
+    message_cache = get_message_cache(account.message_cache_file)
+    state = {}
+    
+    def job():
+        if 'gmail_service' not in state:
+            gmail_auth = GmailAuthenticator(
+                Config.CREDENTIALS_FILE, Config.GMAIL_SCOPES,
+                reporter=reporter, interactive=False,
+                token_file=account.gmail_token_file, account=account.name
+            )
+            service = gmail_auth.new_service()
+            if service is None:
+                raise RuntimeError("Gmail is not authenticated")
+            state['gmail_service'] = GmailService(
+                gmail_auth,
+                thread_cache=thread_cache,
+                message_cache=message_cache,
+                reporter=reporter,
+                service=service
+            )
+        return sync_tracked_emails(state['gmail_service'], create_data_service(account, reporter), {
+            'max_results': Config.MAX_RESULTS,
+            'batch_size': Config.BATCH_SIZE,
+            'fetch_mode': Config.FETCH_MODE,
+            'workers': Config.FETCH_WORKERS,
+            'tiered': Config.TIERED_FETCH,
+            'reply_detection': Config.REPLY_DETECTION
+        })
+    
+    scheduler = SyncScheduler(
+        job,
+        account.sync_status_file,
+        interval_seconds=Config.SYNC_INTERVAL_MINUTES * 60,
+        jitter_seconds=Config.SYNC_JITTER_SECONDS,
+        name=f'sync-{account.name}'
+    )
+    scheduler.start()
+    return scheduler
+
 def render_header():
     """Renders the main header"""
     st.markdown(f"""
@@ -78,6 +221,29 @@ def render_header():
     </div>
     """, unsafe_allow_html=True)
 
+def select_account() -> Account:
+    """Account selector, shown once more than one account exists"""
+    accounts = list_accounts(Config.DATA_DIR)
+    if len(accounts) == 1:
+        return accounts[0]
+    
+    names = [account.name for account in accounts]
+    selected = st.sidebar.selectbox("📬 Account", names, key="sidebar_account")
+    return accounts[names.index(selected)]
+
+def get_all_accounts_analytics(accounts) -> dict:
+    """
+    Dashboard metrics of every account: each shard keeps its own
+    aggregates, which are summed here without merging the tables
+    """
+    summaries = []
+    for account in accounts:
+        try:
+            summaries.append(create_data_service(account).get_analytics_summary())
+        except Exception as e:
+            st.warning(f"Could not read the data of account {account.name}: {e}")
+    return AnalyticsSummary.combine(summaries).report()
+
 def render_sidebar(data_service):
     """Renders the sidebar with configuration settings"""
     st.sidebar.title("⚙️ Configuration")
@@ -148,16 +314,49 @@ def render_sidebar(data_service):
         'reminder_days': reminder_days
     }
 
+def render_sync_status(account: Account, sync_scheduler=None):
+    """Last background sync, read from the published status (never waits for Gmail)"""
+    status = sync_scheduler.status() if sync_scheduler else SyncScheduler.read_status(account.sync_status_file)
+    if not status and sync_scheduler is None:
+        return
+    
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        if status.get('running'):
+            message = "🔄 Syncing with Gmail in the background..."
+        elif status.get('last_synced'):
+            message = f"🔄 Last synced: {status['last_synced']}"
+        else:
+            message = "🔄 Not synced yet"
+        if status.get('next_run') and not status.get('running'):
+            message += f" · next sync: {status['next_run']}"
+        st.caption(message)
+        if status.get('last_error'):
+            st.caption(f"⚠️ Last sync failed: {status['last_error']}")
+        elif (status.get('last_result') or {}).get('warning'):
+            st.caption(f"⚠️ {status['last_result']['warning']}")
+    
+    with col2:
+        if sync_scheduler is not None and st.button("Sync now", key="dashboard_sync_now"):
+            sync_scheduler.run_now()
+            st.toast("Sync started in the background")
+
 def render_analytics_dashboard(data_service):
     """Renders the analytics dashboard"""
     st.subheader("📊 Follow-up Dashboard")
     
-    analytics = data_service.get_analytics_data()
+    accounts = list_accounts(Config.DATA_DIR)
+    if len(accounts) > 1 and st.toggle("All accounts", key="dashboard_all_accounts"):
+        analytics = get_all_accounts_analytics(accounts)
+    else:
+        analytics = data_service.get_analytics_data()
     
     if not analytics:
         st.info("No data to display. Please search for emails first.")
         return
     
+    import plotly.express as px
+    
     # Main metrics
     col1, col2, col3, col4 = st.columns(4)
     
@@ -194,13 +393,11 @@ def render_analytics_dashboard(data_service):
     
     with col1:
         # Status distribution chart
-        df_current = data_service.load_email_data()
-        if not df_current.empty and 'status' in df_current.columns:
-            status_counts = df_current['status'].value_counts()
-            
+        status_counts = analytics['status_distribution']
+        if status_counts:
             fig_status = px.pie(
-                values=status_counts.values,
-                names=status_counts.index,
+                values=list(status_counts.values()),
+                names=list(status_counts.keys()),
                 title="Distribution by Status",
                 color_discrete_map={
                     'Pending': '#ff7f0e',
@@ -239,9 +436,10 @@ def render_email_search(gmail_service, data_service, search_config):
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        # Get available labels
-        labels = gmail_service.get_labels()
-        label_options = {label['name']: label['id'] for label in labels}
+        # Get available labels (from the shared catalog, listed once per TTL)
+        refresh_labels = st.button("🔄 Refresh labels", key="refresh_labels")
+        gmail_service.get_labels(refresh=refresh_labels)
+        label_options = gmail_service.label_catalog.name_to_id()
         
         selected_labels = st.multiselect(
             "Select Gmail labels",
@@ -262,6 +460,17 @@ def render_email_search(gmail_service, data_service, search_config):
             help="Number of emails to retrieve. Higher values may take longer to process."
         )
     
+    sync_state = data_service.load_sync_state()
+    incremental = st.checkbox(
+        "⚡ Only sync changes since the last search",
+        value=bool(sync_state.get('history_id')),
+        help="Uses Gmail history to fetch only new emails, new replies and label changes. "
+             "Falls back to a full search when the history has expired.",
+        key="incremental_sync"
+    )
+    if sync_state.get('last_sync'):
+        st.caption(f"Last sync: {sync_state['last_sync']} ({sync_state.get('mode', 'full')})")
+    
     # Search button
     if st.button("🔍 Search Emails", type="primary", use_container_width=True):
         if not selected_labels:
@@ -273,11 +482,19 @@ def render_email_search(gmail_service, data_service, search_config):
             label_ids = [label_options[name] for name in selected_labels]
             
             try:
-                df_results = gmail_service.analyze_sent_emails(
+                df_results, new_sync_state = gmail_service.incremental_sync(
+                    data_service.load_email_data(),
+                    sync_state,
                     days_back=search_config['lookback_days'],
                     keywords=search_config['keywords'],
                     exclude_automated=search_config['exclude_automated'],
-                    max_results=max_results
+                    max_results=max_results,
+                    batch_size=Config.BATCH_SIZE,
+                    force_full=not incremental,
+                    fetch_mode=Config.FETCH_MODE,
+                    workers=Config.FETCH_WORKERS,
+                    tiered=Config.TIERED_FETCH,
+                    reply_detection=Config.REPLY_DETECTION
                 )
                 if not df_results.empty:
                     emergency_columns = {
@@ -296,8 +513,30 @@ def render_email_search(gmail_service, data_service, search_config):
                 # Merge with existing data
                 df_merged = data_service.merge_with_existing_data(df_results)
                 
+                scan_stats = gmail_service.last_scan_stats
+                if scan_stats:
+                    st.caption(
+                        f"Fetched {scan_stats['messages']} emails in {scan_stats['seconds']}s "
+                        f"({scan_stats['messages_per_sec']} emails/sec, {scan_stats['mode']} mode, "
+                        f"{scan_stats['bodies_fetched']} full bodies downloaded)"
+                    )
+                cache_stats = gmail_service.thread_cache.stats()
+                message_stats = gmail_service.message_cache.stats()
+                st.caption(
+                    f"Thread cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"({cache_stats['entries']} threads, {cache_stats['size_mb']} MB) · "
+                    f"Message cache: {message_stats['hits']} hits, {message_stats['messages']} messages stored"
+                )
+                api_stats = gmail_service.api.stats()
+                st.caption(
+                    f"Gmail API: {api_stats['calls']} calls, {api_stats['units']} quota units, "
+                    f"{api_stats['retries']} retries, {api_stats['throttled']} throttled "
+                    f"(concurrency limit {api_stats['concurrency_limit']}, circuit {api_stats['circuit']})"
+                )
+                
                 # Save updated data
                 if data_service.save_email_data(df_merged):
+                    data_service.save_sync_state(new_sync_state)
                     st.success(f"✅ Found {len(df_merged)} emails. Data saved successfully.")
                     return df_merged
                 else:
@@ -311,7 +550,7 @@ def render_email_search(gmail_service, data_service, search_config):
     return None
 
 
-def render_email_table(df, data_service, calendar_service, tab_prefix=""):
+def render_email_table(df, data_service, calendar_service, tab_prefix="", gmail_service=None):
     """Renders the email table with editing functionalities"""
     if df is None or df.empty:
         st.info("No emails to display. Please search first.")
@@ -436,9 +675,13 @@ def render_email_table(df, data_service, calendar_service, tab_prefix=""):
                 original_idx = df_filtered.index[idx]
                 for col in display_columns:
                     if col in df.columns:
+                        # A priority set by hand is no longer recomputed from age and keywords
+                        if col == 'priority' and df.loc[original_idx, col] != row[col]:
+                            df.loc[original_idx, 'priority_locked'] = True
                         df.loc[original_idx, col] = row[col]
             
-            if data_service.save_email_data(df):
+            # Only edits of loaded rows: nothing to delete, no full backup
+            if data_service.upsert_email_data(df):
                 st.success("✅ Changes saved successfully")
                 st.rerun()
     
@@ -469,6 +712,30 @@ def render_email_table(df, data_service, calendar_service, tab_prefix=""):
     with col4:
         if st.button("📅 Create Reminders", use_container_width=True, disabled=not selected_emails, key=f"{tab_prefix}create_reminders"):
             create_calendar_reminders(df_filtered, selected_emails, calendar_service, data_service)
+    
+    if gmail_service is not None:
+        render_email_preview(df_filtered, gmail_service, tab_prefix)
+
+def render_email_preview(df, gmail_service, tab_prefix=""):
+    """Shows the full body of one email, downloaded only when it is opened"""
+    if df.empty or 'id' not in df.columns:
+        return
+    
+    with st.expander("📖 Open email"):
+        selected = st.selectbox(
+            "Email",
+            options=[None] + df.index.tolist(),
+            format_func=lambda x: "Select an email..." if x is None else str(df.loc[x, 'subject'])[:80],
+            key=f"{tab_prefix}preview_email"
+        )
+        if selected is None:
+            return
+        
+        # Served from the message cache when the body was already downloaded
+        details = gmail_service.get_message_details(df.loc[selected, 'id'])
+        if details:
+            st.caption(f"To: {details['to']} · {details['date'] or details['internal_date']}")
+            st.text(details['body'] or details['snippet'])
 
 def create_calendar_reminders(df, selected_indices, calendar_service, data_service):
     """Creates reminders in Google Calendar for selected emails"""
@@ -499,9 +766,15 @@ def create_calendar_reminders(df, selected_indices, calendar_service, data_servi
                     df.loc[mask, 'follow_up_date'] = event_info['scheduled_time']
             
             # Save changes
-            data_service.save_email_data(df)
+            data_service.upsert_email_data(df)
             
-            st.success(f"✅ Created {len(created_events)} reminders in Google Calendar")
+            existing = sum(1 for event_info in created_events if event_info.get('existing'))
+            st.success(
+                f"✅ Created {len(created_events) - existing} reminders in Google Calendar"
+                + (f" ({existing} already existed)" if existing else "")
+            )
+            if len(created_events) < len(selected_records):
+                st.warning(f"⚠️ {len(selected_records) - len(created_events)} reminders could not be created")
             
             # Show links to events
             st.subheader("🔗 Created Reminder Links")
@@ -548,7 +821,7 @@ def render_backup_management(data_service):
         
         if backups:
             backup_df = pd.DataFrame(backups)
-            st.dataframe(backup_df[['filename', 'size_mb', 'created', 'age_days']], use_container_width=True)
+            st.dataframe(backup_df[['filename', 'rows', 'size_mb', 'created', 'age_days']], use_container_width=True)
             
             col1, col2 = st.columns(2)
             with col1:
@@ -567,25 +840,50 @@ def render_backup_management(data_service):
 
 def main():
     """Main application function"""
+    started = time.perf_counter()
+    
     # Render header
     render_header()
     
     # Initialize services
+    account = select_account()
     try:
-        gmail_auth, calendar_service, data_service = init_services()
+        gmail_auth, calendar_service, data_service = init_services(account)
     except Exception as e:
         st.error(f"Error initializing services: {e}")
         return
     
-    # Verify authentication
-    if not gmail_auth.test_connection():
+    # Verify authentication. Services are resolved here (OAuth may need the
+    # page); the API round trips come from the cached health monitor
+    gmail_auth.get_service()
+    calendar_service.get_service()
+    health_monitor = get_health_monitor(account.name)
+    health = health_monitor.check({'gmail': gmail_auth.probe, 'calendar': calendar_service.probe})
+    
+    if not health['gmail']['ok']:
+        st.error(health['gmail']['message'])
         st.error("❌ Could not connect to Gmail. Please verify your authentication.")
         if st.button("🔄 Re-authenticate"):
             gmail_auth.revoke_credentials()
+            health_monitor.invalidate('gmail')
             st.rerun()
         return
-    
-    if not calendar_service.test_connection():
+    st.success(health['gmail']['message'])
+    
+    # Reply status is kept fresh by the background sync, not by this page
+    sync_scheduler = get_sync_scheduler(account.name) if Config.BACKGROUND_SYNC else None
+    
+    # Services and connection checks are ready: the first run of the process is the cold start
+    startup_report = get_startup_report()
+    if 'cold_start_seconds' not in startup_report:
+        startup_report['cold_start_seconds'] = round(time.perf_counter() - started, 2)
+        startup_report['services'] = dict(discovery.build_timings)
+        print(f"Cold start: {startup_report['cold_start_seconds']}s, services: {startup_report['services']}")
+    
+    if health['calendar']['ok']:
+        st.success(health['calendar']['message'])
+    else:
+        st.error(health['calendar']['message'])
         st.warning("⚠️ Could not connect to Google Calendar. Some features will not be available.")
     
     # Render sidebar with configurations
@@ -595,21 +893,44 @@ def main():
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "🔍 Search", "📋 Management", "⚙️ Settings"])
     
     with tab1:
+        render_sync_status(account, sync_scheduler)
         render_analytics_dashboard(data_service)
         render_upcoming_followups(calendar_service)
     
+    gmail_service = GmailService(
+        gmail_auth,
+        thread_cache=get_thread_cache(),
+        message_cache=get_message_cache(account.message_cache_file),
+        label_catalog=get_label_catalog(account.label_catalog_file)
+    )
+    
     with tab2:
-        gmail_service = GmailService(gmail_auth)
         df_results = render_email_search(gmail_service, data_service, search_config)
         
         if df_results is not None:
-            render_email_table(df_results, data_service, calendar_service, "search_")
+            render_email_table(df_results, data_service, calendar_service, "search_", gmail_service)
     
     with tab3:
+        # Re-rank stored emails when the sidebar keywords change, no Gmail calls needed
+        if st.button("🔁 Re-rank with current keywords", key="manage_rerank"):
+            started = time.perf_counter()
+            changed = data_service.rescore_priorities(search_config['keywords'])
+            st.success(f"✅ Priorities recomputed in {time.perf_counter() - started:.2f}s ({changed} changed)")
+        
+        # Only the open follow-ups are checked, one lightweight call per thread
+        if st.button("📬 Refresh replies of open follow-ups", key="manage_refresh_replies"):
+            started = time.perf_counter()
+            with st.spinner("Checking open threads..."):
+                result = refresh_open_followups(gmail_service, data_service, Config.BATCH_SIZE)
+            st.success(
+                f"✅ {result['open']} open follow-ups checked in {time.perf_counter() - started:.2f}s "
+                f"({result['changed']} updated)"
+            )
+        
         # Load existing data for management
         existing_df = data_service.load_email_data()
         if not existing_df.empty:
-            render_email_table(existing_df, data_service, calendar_service, "manage_")
+            render_email_table(existing_df, data_service, calendar_service, "manage_", gmail_service)
         else:
             st.info("No data to manage. Go to the 'Search' tab to get started.")
     
@@ -621,13 +942,27 @@ def main():
         with col1:
             if st.button("🔄 Renew Gmail Credentials"):
                 gmail_auth.revoke_credentials()
+                health_monitor.invalidate('gmail')
                 st.success("Gmail credentials removed. Restart the app to re-authenticate.")
         
         with col2:
             if st.button("🔄 Renew Calendar Credentials"):
                 calendar_service.revoke_credentials()
+                health_monitor.invalidate('calendar')
                 st.success("Calendar credentials removed. Restart the app to re-authenticate.")
         
+        # Accounts: each one is authorized on first use and keeps its own data
+        st.subheader("📬 Accounts")
+        st.caption(f"Current account: {account.name} ({account.data_dir})")
+        new_account = st.text_input("New account name", key="settings_new_account",
+                                    help="Letters, digits and . _ @ + -, e.g. the email address")
+        if st.button("➕ Add Account"):
+            try:
+                created = create_account(Config.DATA_DIR, new_account.strip())
+                st.success(f"Account {created.name} added. Select it in the sidebar to sign in.")
+            except ValueError as e:
+                st.error(str(e))
+        
         # Backup management
         render_backup_management(data_service)
         
@@ -635,10 +970,24 @@ def main():
         st.subheader("ℹ️ System Information")
         st.info(f"""
         **Version:** 1.0.0
-        **Data directory:** {Config.DATA_DIR}
+        **Data directory:** {account.data_dir}
         **Credentials file:** {Config.CREDENTIALS_FILE}
         **Last update:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         """)
+        
+        startup_report = get_startup_report()
+        if startup_report:
+            st.caption(f"Cold start: {startup_report['cold_start_seconds']}s")
+            for name, timing in startup_report['services'].items():
+                st.caption(
+                    f"{name}: {timing['source']} discovery document, "
+                    f"loaded in {timing['load_ms']} ms, built in {timing['build_ms']} ms"
+                )
+        
+        if import_timer.is_installed():
+            import_timer.print_report()
+            st.caption("Slowest imports (own time, excluding the modules they import)")
+            st.dataframe(pd.DataFrame(import_timer.report()), hide_index=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
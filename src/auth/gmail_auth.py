@@ -2,56 +2,80 @@
 import os
 import pickle
 from pathlib import Path
-from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import streamlit as st
-from typing import Optional
+from typing import Optional, Tuple
+from utils.api_executor import CircuitOpenError, get_executor
+from utils.discovery import build_service, drop_shared_service, new_http, shared_service
+from utils.reporter import Reporter, get_reporter
 
 class GmailAuthenticator:
-    def __init__(self, credentials_file: Path, scopes: list):
+    def __init__(self,
+                 credentials_file: Path,
+                 scopes: list,
+                 reporter: Reporter = None,
+                 interactive: bool = True,
+                 token_file: Path = None,
+                 account: str = 'me'):
         self.credentials_file = credentials_file
         self.scopes = scopes
-        self.token_file = Path('token_gmail.pickle')
+        # One token per account (see services.accounts)
+        self.token_file = token_file or Path('token_gmail.pickle')
+        self.account = account
         self._service = None
+        self.reporter = reporter or get_reporter()
+        # Without a browser (CLI, cron) the OAuth consent flow can't run
+        self.interactive = interactive
         import socket
         socket.setdefaulttimeout(30)        
-    @st.cache_resource
-    def authenticate(_self) -> Optional[object]:
+    
+    def authenticate(self) -> Optional[object]:
         """
-        Autentica con Gmail API y retorna el servicio
+        Autentica con Gmail API y retorna el servicio.
+        The service is built once per process and shared by every instance.
         """
+        return shared_service(self._service_key(), self._authenticate)
+    
+    def _service_key(self) -> str:
+        return f"gmail:{self.token_file.resolve()}"
+    
+    def _authenticate(self) -> Optional[object]:
+        """Loads, refreshes or obtains the credentials and builds the service"""
         creds = None
         
         # Cargar credenciales existentes
-        if _self.token_file.exists():
+        if self.token_file.exists():
             try:
-                with open(_self.token_file, 'rb') as token:
+                with open(self.token_file, 'rb') as token:
                     creds = pickle.load(token)
             except Exception as e:
-                st.warning(f"Error loading existing credentials: {e}")
+                self.reporter.warning(f"Error loading existing credentials: {e}")
                 # Eliminar archivo corrupto
-                _self.token_file.unlink(missing_ok=True)
+                self.token_file.unlink(missing_ok=True)
         
         # Si no hay credenciales válidas, obtener nuevas
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
+                from google.auth.transport.requests import Request
                 try:
                     creds.refresh(Request())
                 except Exception as e:
-                    st.error(f"Error refreshing credentials: {e}")
+                    self.reporter.error(f"Error refreshing credentials: {e}")
                     return None
             else:
-                if not _self.credentials_file.exists():
-                    st.error(f"Credentials file not found: {_self.credentials_file}")
-                    st.info("Please download credentials.json from Google Cloud Console")
+                if not self.interactive:
+                    self.reporter.error("No valid Gmail token. Run the app once to authorize Gmail access.")
+                    return None
+                if not self.credentials_file.exists():
+                    self.reporter.error(f"Credentials file not found: {self.credentials_file}")
+                    self.reporter.info("Please download credentials.json from Google Cloud Console")
                     return None
                 
+                # The OAuth flow modules are only needed the first time
+                from google_auth_oauthlib.flow import InstalledAppFlow
                 try:
                     flow = InstalledAppFlow.from_client_secrets_file(
-                        str(_self.credentials_file), _self.scopes)
+                        str(self.credentials_file), self.scopes)
                     
                     # Usar puerto específico para evitar conflictos
                     creds = flow.run_local_server(
@@ -61,22 +85,23 @@ class GmailAuthenticator:
                         success_message='Authorization successful! You can close this window.'
                     )
                 except Exception as e:
-                    st.error(f"Error during OAuth flow: {e}")
+                    self.reporter.error(f"Error during OAuth flow: {e}")
                     return None
             
             # Guardar credenciales para próximas ejecuciones
             try:
-                with open(_self.token_file, 'wb') as token:
+                with open(self.token_file, 'wb') as token:
                     pickle.dump(creds, token)
-                st.success("Gmail authentication successful!")
+                self.reporter.success("Gmail authentication successful!")
             except Exception as e:
-                st.warning(f"Could not save credentials: {e}")
+                self.reporter.warning(f"Could not save credentials: {e}")
         
         try:
-            _self._service = build('gmail', 'v1', credentials=creds)
-            return _self._service
-        except HttpError as e:
-            st.error(f"Error building Gmail service: {e}")
+            # Built from the discovery document on disk, no network round trip
+            self._service = build_service('gmail', 'v1', creds)
+            return self._service
+        except Exception as e:
+            self.reporter.error(f"Error building Gmail service: {e}")
             return None
     
     def get_service(self):
@@ -85,96 +110,57 @@ class GmailAuthenticator:
             self._service = self.authenticate()
         return self._service
     
-    def test_connection(self, max_retries=3, timeout=20) -> bool:
-        """Tests Gmail API connection with automatic retries"""
-        import socket
-        import ssl
-        import time
+    def new_service(self):
+        """
+        Builds a Gmail service with its own HTTP client and the shared
+        credentials, for a background thread (httplib2 is not thread-safe)
+        """
+        service = self.get_service()
+        if not service:
+            return None
+        return build_service('gmail', 'v1', service._http.credentials)
+    
+    def test_connection(self, timeout=20) -> bool:
+        """Tests Gmail API connection; retries are handled by the shared API executor"""
+        ok, detail = self.probe(timeout)
+        if ok:
+            self.reporter.success(detail)
+        else:
+            self.reporter.error(detail)
+        return ok
+    
+    def probe(self, timeout=20) -> Tuple[bool, str]:
+        """
+        Quiet connection test (no Streamlit calls, safe in a background
+        thread). Returns whether Gmail answered and a message to show.
+        """
+        service = self._service or self.get_service()
+        if not service:
+            return False, "Gmail is not authenticated"
         
-        for attempt in range(max_retries):
-            try:
-                service = self.get_service()
-                if not service:
-                    return False
-                
-                # Configure timeout for the request if available
-                if hasattr(service, '_http') and hasattr(service._http, 'timeout'):
-                    service._http.timeout = timeout
-                
-                # Connection test with timeout
-                profile = service.users().getProfile(userId='me').execute()
-                st.success(f"Connected to Gmail: {profile.get('emailAddress', 'Unknown')}")
-                return True
-                
-            except socket.timeout:
-                if attempt < max_retries - 1:
-                    st.warning(f"Timeout on attempt {attempt + 1}/{max_retries}. Retrying...")
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                    continue
-                else:
-                    st.error("Gmail connection timed out")
-                    return False
-                
-            except TimeoutError:
-                if attempt < max_retries - 1:
-                    st.warning(f"Timeout on attempt {attempt + 1}/{max_retries}. Retrying...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.error("Gmail connection timed out")
-                    return False
-                
-            except ssl.SSLError as e:
-                if attempt < max_retries - 1:
-                    # Don't show SSL errors to user, just log them silently
-                    print(f"SSL error on attempt {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.warning("SSL connection issue resolved after retries")
-                    return False
-                    
-            except HttpError as e:
-                if e.resp.status in [429, 500, 502, 503, 504]:  # Temporary errors
-                    if attempt < max_retries - 1:
-                        st.warning(f"Temporary error {e.resp.status}. Retrying in {2 ** attempt} seconds...")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        st.error(f"Persistent Gmail API error: {e}")
-                        return False
-                else:
-                    st.error(f"Gmail connection test failed: {e}")
-                    return False
-                    
-            except Exception as e:
-                # Check if it's an SSL-related error
-                if "SSL" in str(e) or "ssl" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        # Don't show SSL errors to user, handle silently
-                        print(f"SSL-related error on attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        st.info("Connection established successfully after SSL retry")
-                        return False
-                else:
-                    if attempt < max_retries - 1:
-                        st.warning(f"Unexpected error on attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        st.error(f"Unexpected error: {e}")
-                        return False
+        try:
+            # Probes run on HealthMonitor threads: their own HTTP client with
+            # the probe timeout, the shared service's one is left alone
+            profile = get_executor('gmail', self.account).run(
+                service.users().getProfile(userId='me'),
+                operation='connection test',
+                http=new_http(service, timeout)
+            )
+        except CircuitOpenError as e:
+            return False, f"Gmail API temporarily unavailable: {e}"
+        except HttpError as e:
+            return False, f"Gmail connection test failed: {e}"
+        except Exception as e:
+            return False, f"Could not connect to Gmail: {e}"
         
-        st.error("Could not connect to Gmail after multiple attempts")
-        return False
+        return True, f"Connected to Gmail: {profile.get('emailAddress', 'Unknown')}"
     
     def revoke_credentials(self):
         """Revokes stored credentials and forces re-authentication"""
         if self.token_file.exists():
             self.token_file.unlink()
-            st.success("Gmail credentials revoked. Please re-authenticate.")
+            self.reporter.success("Gmail credentials revoked. Please re-authenticate.")
         else:
-            st.info("No stored Gmail credentials found.")
-        self._service = None
\ No newline at end of file
+            self.reporter.info("No stored Gmail credentials found.")
+        self._service = None
+        drop_shared_service(self._service_key())
\ No newline at end of file
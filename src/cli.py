@@ -0,0 +1,420 @@
+# src/cli.py
+"""
+Headless entry point: runs scans through the same services as the app,
+without Streamlit (for cron jobs and scripts).
+
+    python -m src.cli scan --days 90 --keywords "interview,proposal"
+    python -m src.cli scan --keywords "interview" --keywords "invoice,quote" --processes 2
+    python -m src.cli scan --all-accounts
+    python -m src.cli sync --watch
+
+Run it from the project root, where the Gmail token of the app is stored.
+Each --keywords value is one scan, run for every selected account; scans
+run in parallel processes and the results of each account are merged and
+saved once into that account's data. The summary goes to stdout, service
+messages and debug output to stderr. The sync command refreshes the
+tracked emails like the app's background sync, once or (with --watch)
+every SYNC_INTERVAL_MINUTES.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Los servicios se importan desde src, como en app.py
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+from config import Config
+from auth.gmail_auth import GmailAuthenticator
+from services.accounts import DEFAULT_ACCOUNT, Account, get_account, list_accounts
+from services.data_service import DataService
+from services.gmail_service import GmailService
+from services.message_cache import MessageCache
+from services.sync_scheduler import SyncScheduler, sync_tracked_emails
+from utils import discovery
+from utils.api_executor import get_executor
+from utils.reporter import ConsoleReporter, set_reporter
+
+
+def configure_runtime(account: Account, processes: int = 1, reporter: ConsoleReporter = None):
+    """
+    Sets up what init_services does for the app. The Gmail quota is per
+    user, so the parallel processes of one account split it.
+    """
+    discovery.set_cache_dir(Config.DISCOVERY_DIR)
+    get_executor(
+        'gmail',
+        account.name,
+        units_per_second=Config.GMAIL_QUOTA_UNITS_PER_SEC / max(1, processes),
+        max_concurrency=Config.API_MAX_CONCURRENCY,
+        max_retries=Config.API_MAX_RETRIES
+    )
+    if reporter is not None:
+        set_reporter(reporter)
+
+
+def create_data_service(account: Account, reporter: ConsoleReporter) -> DataService:
+    return DataService(
+        account.data_dir,
+        backend=Config.STORAGE_BACKEND,
+        journal_max_bytes=Config.JOURNAL_MAX_KB * 1024,
+        journal_max_age_seconds=Config.JOURNAL_MAX_AGE_MINUTES * 60,
+        backup_retention={
+            'keep_recent': Config.MAX_BACKUPS,
+            'keep_hourly': Config.BACKUP_KEEP_HOURLY,
+            'keep_daily': Config.BACKUP_KEEP_DAILY,
+            'keep_weekly': Config.BACKUP_KEEP_WEEKLY
+        },
+        reporter=reporter
+    )
+
+
+def run_scan_job(job: Dict) -> Dict:
+    """
+    Runs one scan (in this process or a worker process) and returns its
+    DataFrame with timing and API counters. With job['incremental'] it
+    syncs from the stored history like the app; otherwise it is a full scan.
+    """
+    with redirect_stdout(sys.stderr):
+        return _run_scan_job(job)
+
+
+def _run_scan_job(job: Dict) -> Dict:
+    reporter = ConsoleReporter(prefix=f"[{job['name']}] ", quiet=job['quiet'])
+    account = get_account(Config.DATA_DIR, job['account'])
+    configure_runtime(account, job['processes'], reporter)
+    # The executor lives as long as the process, so only this job's calls are counted
+    api_before = get_executor('gmail', account.name).stats()
+    started = time.perf_counter()
+    result = {
+        'name': job['name'],
+        'account': account.name,
+        'keywords': job['keywords'],
+        'df': None,
+        'sync_state': None,
+        'error': None
+    }
+
+    try:
+        gmail_auth = GmailAuthenticator(
+            Config.CREDENTIALS_FILE, Config.GMAIL_SCOPES,
+            reporter=reporter, interactive=False,
+            token_file=account.gmail_token_file, account=account.name
+        )
+        if gmail_auth.get_service() is None:
+            raise RuntimeError(f"Gmail is not authenticated for account {account.name}")
+        gmail_service = GmailService(
+            gmail_auth,
+            message_cache=MessageCache(account.message_cache_file),
+            reporter=reporter
+        )
+
+        scan_options = {
+            'days_back': job['days'],
+            'keywords': job['keywords'],
+            'exclude_automated': job['exclude_automated'],
+            'max_results': job['max_results'],
+            'batch_size': job['batch_size'],
+            'fetch_mode': job['fetch_mode'],
+            'workers': job['workers'],
+            'tiered': job['tiered'],
+            'reply_detection': job['reply_detection']
+        }
+        if job['incremental']:
+            data_service = create_data_service(account, reporter)
+            existing_df, sync_state = data_service.load_email_data(), data_service.load_sync_state()
+        else:
+            existing_df, sync_state = pd.DataFrame(), {}
+        df, sync_state = gmail_service.incremental_sync(
+            existing_df,
+            sync_state,
+            force_full=not job['incremental'],
+            **scan_options
+        )
+
+        result['df'] = df
+        result['sync_state'] = sync_state
+        result['scan'] = gmail_service.last_scan_stats
+    except Exception as e:
+        result['error'] = str(e)
+        reporter.error(f"Scan failed: {e}")
+
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    api_after = get_executor('gmail', account.name).stats()
+    result['api'] = {key: api_after[key] - api_before[key] for key in ('calls', 'units', 'retries', 'throttled', 'failed')}
+    return result
+
+
+def merge_results(results: List[Dict]) -> pd.DataFrame:
+    """Union of the scan results; an email found by several scans is kept once"""
+    frames = [result['df'] for result in results if result['df'] is not None and not result['df'].empty]
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True).drop_duplicates(subset='id', keep='first')
+    for col, default_val in {'calendar_event_id': None, 'follow_up_count': 0, 'final_outcome': None}.items():
+        if col not in df.columns:
+            df[col] = default_val
+    return df.reset_index(drop=True)
+
+
+def summarize(results: List[Dict], wall_seconds: float, saved_rows: int) -> Dict:
+    """Timing and API call counts of every scan and of the whole run"""
+    scans = []
+    totals = {'messages': 0, 'calls': 0, 'units': 0, 'retries': 0, 'throttled': 0, 'failed': 0}
+    for result in results:
+        scan = result.get('scan') or {}
+        api = result['api']
+        row = {
+            'name': result['name'],
+            'account': result['account'],
+            'keywords': result['keywords'],
+            'ok': result['error'] is None,
+            'error': result['error'],
+            'seconds': result['seconds'],
+            'messages': scan.get('messages', 0),
+            'messages_per_sec': scan.get('messages_per_sec', 0),
+            'bodies_fetched': scan.get('bodies_fetched', 0),
+            **{key: api[key] for key in ('calls', 'units', 'retries', 'throttled', 'failed')}
+        }
+        scans.append(row)
+        for key in totals:
+            totals[key] += row[key]
+
+    return {
+        'scans': scans,
+        'totals': totals,
+        'wall_seconds': round(wall_seconds, 2),
+        'saved_rows': saved_rows
+    }
+
+
+def print_summary(summary: Dict):
+    print(f"{'scan':<10} {'account':<24} {'status':<7} {'seconds':>8} {'emails':>7} {'emails/s':>9} {'calls':>6} {'units':>7} {'retries':>7} {'throttled':>9}")
+    for row in summary['scans']:
+        print(
+            f"{row['name']:<10} {row['account']:<24} {'ok' if row['ok'] else 'failed':<7} {row['seconds']:>8} {row['messages']:>7} "
+            f"{row['messages_per_sec']:>9} {row['calls']:>6} {row['units']:>7} {row['retries']:>7} {row['throttled']:>9}"
+        )
+    totals = summary['totals']
+    print(
+        f"Total: {totals['messages']} emails, {totals['calls']} API calls, {totals['units']} quota units "
+        f"in {summary['wall_seconds']}s; {summary['saved_rows']} emails saved"
+    )
+
+
+def select_accounts(args) -> List[Account]:
+    """Accounts named with --account, every account with --all-accounts, else the default one"""
+    if args.all_accounts:
+        return list_accounts(Config.DATA_DIR)
+    names = list(dict.fromkeys(args.account or [DEFAULT_ACCOUNT]))
+    return [get_account(Config.DATA_DIR, name) for name in names]
+
+
+def scan_command(args) -> int:
+    try:
+        accounts = select_accounts(args)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+
+    keyword_sets = args.keywords or [Config.DEFAULT_KEYWORDS]
+    scans = [(account, keywords) for account in accounts for keywords in keyword_sets]
+    processes = args.processes or min(len(scans), os.cpu_count() or 1)
+    processes = max(1, min(processes, len(scans)))
+    # Accounts have separate quotas; only the scans of the same account share one
+    account_processes = max(1, min(processes, len(keyword_sets)))
+    # Only a single scan per account can continue from the stored history
+    incremental = len(keyword_sets) == 1 and not args.full
+
+    jobs = [{
+        'name': f'scan-{i + 1}',
+        'account': account.name,
+        'keywords': keywords,
+        'days': args.days,
+        'exclude_automated': not args.include_automated,
+        'max_results': args.max_results,
+        'batch_size': args.batch_size,
+        'fetch_mode': args.fetch_mode,
+        'workers': args.workers,
+        'tiered': args.tiered,
+        'reply_detection': args.reply_detection,
+        'incremental': incremental,
+        'processes': account_processes,
+        'quiet': args.quiet
+    } for i, (account, keywords) in enumerate(scans)]
+
+    reporter = ConsoleReporter(quiet=args.quiet)
+    started = time.perf_counter()
+    with redirect_stdout(sys.stderr):
+        Config.ensure_directories()
+        if processes == 1:
+            results = [run_scan_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(run_scan_job, jobs))
+
+        failed = any(result['error'] for result in results)
+        saved_rows = 0
+        # Each account is saved into its own shard, never merged with the others
+        for account in accounts:
+            account_results = [result for result in results if result['account'] == account.name]
+            saved, ok = save_account_results(account, account_results, args.dry_run, reporter)
+            saved_rows += saved
+            failed = failed or not ok
+
+    summary = summarize(results, time.perf_counter() - started, saved_rows)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+    return 1 if failed else 0
+
+
+def save_account_results(account: Account, results: List[Dict], dry_run: bool,
+                         reporter: ConsoleReporter) -> Tuple[int, bool]:
+    """Merges the scans of one account with its stored data; returns (saved rows, ok)"""
+    df = merge_results(results)
+    if df.empty:
+        reporter.warning(f"No emails found with the specified criteria in account {account.name}")
+        return 0, True
+    if dry_run:
+        reporter.info(f"Dry run: {len(df)} emails found in account {account.name}, nothing saved")
+        return 0, True
+
+    data_service = create_data_service(account, reporter)
+    df_merged = data_service.merge_with_existing_data(df)
+    if not data_service.save_email_data(df_merged):
+        return 0, False
+    if len(results) == 1 and results[0]['sync_state']:
+        data_service.save_sync_state(results[0]['sync_state'])
+    return len(df_merged), True
+
+
+def sync_command(args) -> int:
+    try:
+        accounts = select_accounts(args)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+
+    schedulers = []
+    with redirect_stdout(sys.stderr):
+        Config.ensure_directories()
+        for account in accounts:
+            reporter = ConsoleReporter(prefix=f"[sync {account.name}] ", quiet=args.quiet)
+            configure_runtime(account, 1, reporter)
+            schedulers.append(SyncScheduler(
+                create_sync_job(account, reporter, args.pending_only),
+                account.sync_status_file,
+                interval_seconds=Config.SYNC_INTERVAL_MINUTES * 60,
+                jitter_seconds=Config.SYNC_JITTER_SECONDS,
+                initial_delay_seconds=0,
+                name=f'sync-{account.name}'
+            ))
+
+        if args.watch:
+            for scheduler in schedulers:
+                scheduler.start()
+            try:
+                while all(scheduler.is_alive() for scheduler in schedulers):
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+            for scheduler in schedulers:
+                scheduler.stop(timeout=5)
+        else:
+            for scheduler in schedulers:
+                scheduler.run_once()
+
+    statuses = {scheduler.name: scheduler.status() for scheduler in schedulers}
+    print(json.dumps(statuses, indent=2))
+    return 1 if any(status.get('last_error') for status in statuses.values()) else 0
+
+
+def create_sync_job(account: Account, reporter: ConsoleReporter, pending_only: bool = False):
+    """The sync of one account; its Gmail service is built on the first run"""
+    state = {}
+
+    def job() -> Dict:
+        if 'gmail_service' not in state:
+            gmail_auth = GmailAuthenticator(
+                Config.CREDENTIALS_FILE, Config.GMAIL_SCOPES,
+                reporter=reporter, interactive=False,
+                token_file=account.gmail_token_file, account=account.name
+            )
+            service = gmail_auth.new_service()
+            if service is None:
+                raise RuntimeError(f"Gmail is not authenticated for account {account.name}")
+            state['gmail_service'] = GmailService(
+                gmail_auth,
+                message_cache=MessageCache(account.message_cache_file),
+                reporter=reporter,
+                service=service
+            )
+        return sync_tracked_emails(state['gmail_service'], create_data_service(account, reporter), {
+            'max_results': Config.MAX_RESULTS,
+            'batch_size': Config.BATCH_SIZE,
+            'fetch_mode': Config.FETCH_MODE,
+            'workers': Config.FETCH_WORKERS,
+            'tiered': Config.TIERED_FETCH,
+            'reply_detection': Config.REPLY_DETECTION
+        }, pending_only=pending_only)
+
+    return job
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description=f"{Config.APP_NAME} (headless)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help='Search sent emails, merge them with the tracking data and save')
+    scan.add_argument('--account', action='append',
+                      help=f'Account to scan (default: {DEFAULT_ACCOUNT}); repeat it to scan several')
+    scan.add_argument('--all-accounts', action='store_true', help='Scan every account')
+    scan.add_argument('--days', type=int, default=Config.DEFAULT_LOOKBACK_DAYS, help='Days back to search')
+    scan.add_argument('--keywords', action='append',
+                      help='Comma separated keywords of one scan; repeat it to run several scans')
+    scan.add_argument('--max-results', type=int, default=Config.MAX_RESULTS)
+    scan.add_argument('--include-automated', action='store_true', help='Keep no-reply and automated emails')
+    scan.add_argument('--full', action='store_true', help='Full scan even when the stored history allows a sync')
+    scan.add_argument('--fetch-mode', choices=GmailService.FETCH_MODES, default=Config.FETCH_MODE)
+    scan.add_argument('--workers', type=int, default=Config.FETCH_WORKERS)
+    scan.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE)
+    scan.add_argument('--tiered', action=argparse.BooleanOptionalAction, default=Config.TIERED_FETCH)
+    scan.add_argument('--reply-detection', choices=GmailService.REPLY_DETECTION_MODES, default=Config.REPLY_DETECTION,
+                      help='Count replies from threads or by joining the headers of received messages')
+    scan.add_argument('--processes', type=int, default=None,
+                      help=f'Parallel scan processes (default: one per scan and account, up to {os.cpu_count()})')
+    scan.add_argument('--dry-run', action='store_true', help='Scan without saving')
+    scan.add_argument('--quiet', action='store_true', help='Only print warnings, errors and the summary')
+    scan.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    scan.set_defaults(handler=scan_command)
+
+    sync = commands.add_parser('sync', help='Refresh the tracked emails from the Gmail history of the last search')
+    sync.add_argument('--account', action='append',
+                      help=f'Account to sync (default: {DEFAULT_ACCOUNT}); repeat it to sync several')
+    sync.add_argument('--all-accounts', action='store_true', help='Sync every account')
+    sync.add_argument('--watch', action='store_true',
+                      help=f'Keep running and sync every {Config.SYNC_INTERVAL_MINUTES} minutes')
+    sync.add_argument('--pending-only', action='store_true',
+                      help='Only recount the replies of Pending / Following Up emails')
+    sync.add_argument('--quiet', action='store_true', help='Only print warnings and errors')
+    sync.set_defaults(handler=sync_command)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
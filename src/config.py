@@ -30,6 +30,43 @@ class Config:
     DEFAULT_LOOKBACK_DAYS = int(os.getenv('DEFAULT_LOOKBACK_DAYS', '30'))
     MAX_RESULTS = int(os.getenv('MAX_RESULTS', '1000'))
     
+    # Gmail API fetch settings (the batch endpoint allows up to 100 calls)
+    BATCH_SIZE = min(100, int(os.getenv('BATCH_SIZE', '50')))
+    # How details are downloaded: 'batch', 'concurrent' (worker pool) or 'serial'
+    FETCH_MODE = os.getenv('FETCH_MODE', 'batch')
+    FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+    # Fetch headers first and download bodies only when the priority needs them
+    TIERED_FETCH = os.getenv('TIERED_FETCH', 'true').lower() == 'true'
+    # How replies are found: 'threads' (download each thread) or 'headers'
+    # (join In-Reply-To/References of received messages, own follow-ups excluded)
+    REPLY_DETECTION = os.getenv('REPLY_DETECTION', 'threads')
+    THREAD_CACHE_MAX_ENTRIES = int(os.getenv('THREAD_CACHE_MAX_ENTRIES', '5000'))
+    THREAD_CACHE_MAX_MB = int(os.getenv('THREAD_CACHE_MAX_MB', '32'))
+    # Gmail and Calendar discovery documents, so services build offline
+    DISCOVERY_DIR = DATA_DIR / 'discovery'
+    # Print per-module import times at startup
+    IMPORT_TIME_REPORT = os.getenv('IMPORT_TIME_REPORT', 'false').lower() == 'true'
+    LABEL_CACHE_TTL_MINUTES = int(os.getenv('LABEL_CACHE_TTL_MINUTES', '60'))
+    
+    # Shared API rate governor: quota budgets per user per second, the
+    # ceiling of calls in flight and retries of transient errors
+    GMAIL_QUOTA_UNITS_PER_SEC = int(os.getenv('GMAIL_QUOTA_UNITS_PER_SEC', '250'))
+    CALENDAR_QUOTA_PER_SEC = int(os.getenv('CALENDAR_QUOTA_PER_SEC', '10'))
+    API_MAX_CONCURRENCY = int(os.getenv('API_MAX_CONCURRENCY', '16'))
+    API_MAX_RETRIES = int(os.getenv('API_MAX_RETRIES', '5'))
+    
+    # Connection health checks: how long a result is reused (failures are
+    # rechecked sooner) and how long the first check may block the page
+    HEALTH_TTL_SECONDS = int(os.getenv('HEALTH_TTL_SECONDS', '300'))
+    HEALTH_FAILURE_TTL_SECONDS = int(os.getenv('HEALTH_FAILURE_TTL_SECONDS', '30'))
+    HEALTH_DEADLINE_SECONDS = int(os.getenv('HEALTH_DEADLINE_SECONDS', '10'))
+    
+    # Background sync of the tracked emails (reply status) while the app runs,
+    # every SYNC_INTERVAL_MINUTES plus up to SYNC_JITTER_SECONDS
+    BACKGROUND_SYNC = os.getenv('BACKGROUND_SYNC', 'true').lower() == 'true'
+    SYNC_INTERVAL_MINUTES = int(os.getenv('SYNC_INTERVAL_MINUTES', '15'))
+    SYNC_JITTER_SECONDS = int(os.getenv('SYNC_JITTER_SECONDS', '60'))
+    
     # UI Configuration
     PAGE_TITLE = os.getenv('PAGE_TITLE', 'Gmail Follow-up Manager')
     PAGE_ICON = os.getenv('PAGE_ICON', '📧')
@@ -40,8 +77,18 @@ class Config:
     DEFAULT_REMINDER_TIME = '09:00'
     DEFAULT_TIMEZONE = 'America/New_York'
     
+    # Storage backend for tracking data: 'sqlite' (default) or 'excel'
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+    # Status edits are journaled and merged into storage past these limits
+    JOURNAL_MAX_KB = int(os.getenv('JOURNAL_MAX_KB', '256'))
+    JOURNAL_MAX_AGE_MINUTES = int(os.getenv('JOURNAL_MAX_AGE_MINUTES', '10'))
+    
     # Backup configurations
     MAX_BACKUPS = int(os.getenv('MAX_BACKUPS', '10'))
+    # Tiered retention on top of the MAX_BACKUPS most recent restore points
+    BACKUP_KEEP_HOURLY = int(os.getenv('BACKUP_KEEP_HOURLY', '24'))
+    BACKUP_KEEP_DAILY = int(os.getenv('BACKUP_KEEP_DAILY', '7'))
+    BACKUP_KEEP_WEEKLY = int(os.getenv('BACKUP_KEEP_WEEKLY', '8'))
     AUTO_BACKUP = os.getenv('AUTO_BACKUP', 'true').lower() == 'true'
     
     # Network configurations
@@ -85,5 +132,9 @@ class Config:
             'app_name': cls.APP_NAME,
             'default_lookback_days': cls.DEFAULT_LOOKBACK_DAYS,
             'max_results': cls.MAX_RESULTS,
-            'auto_backup': cls.AUTO_BACKUP
+            'batch_size': cls.BATCH_SIZE,
+            'fetch_mode': cls.FETCH_MODE,
+            'fetch_workers': cls.FETCH_WORKERS,
+            'auto_backup': cls.AUTO_BACKUP,
+            'storage_backend': cls.STORAGE_BACKEND
         }
\ No newline at end of file
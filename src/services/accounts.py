@@ -0,0 +1,66 @@
+# src/services/accounts.py
+import re
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_ACCOUNT = 'default'
+# Account names become directory names
+ACCOUNT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.@+-]{0,63}$')
+
+
+class Account:
+    """
+    One Gmail mailbox and its shard: tokens, tracking data, caches and
+    backups live in their own directory. The default account keeps the
+    original layout (tokens in the working directory, data in DATA_DIR),
+    the others live under DATA_DIR/accounts/<name>.
+    """
+
+    def __init__(self, name: str, data_dir: Path, token_dir: Path):
+        self.name = name
+        self.data_dir = data_dir
+        self.gmail_token_file = token_dir / 'token_gmail.pickle'
+        self.calendar_token_file = token_dir / 'token_calendar.pickle'
+        self.message_cache_file = data_dir / 'message_cache.sqlite'
+        self.label_catalog_file = data_dir / 'label_catalog.json'
+        self.sync_status_file = data_dir / 'sync_status.json'
+
+    def __repr__(self) -> str:
+        return f"Account({self.name!r}, {self.data_dir})"
+
+
+def default_account(data_dir: Path) -> Account:
+    return Account(DEFAULT_ACCOUNT, data_dir, Path('.'))
+
+
+def accounts_dir(data_dir: Path) -> Path:
+    return data_dir / 'accounts'
+
+
+def list_accounts(data_dir: Path) -> List[Account]:
+    """The default account followed by every account directory, by name"""
+    accounts = [default_account(data_dir)]
+    root = accounts_dir(data_dir)
+    if root.exists():
+        for path in sorted(root.iterdir()):
+            if path.is_dir() and ACCOUNT_NAME_PATTERN.match(path.name) and path.name != DEFAULT_ACCOUNT:
+                accounts.append(Account(path.name, path, path))
+    return accounts
+
+
+def get_account(data_dir: Path, name: str) -> Account:
+    """Finds an account by name; raises KeyError when it doesn't exist"""
+    for account in list_accounts(data_dir):
+        if account.name == name:
+            return account
+    raise KeyError(f"Unknown account: {name}")
+
+
+def create_account(data_dir: Path, name: str) -> Account:
+    """Creates the shard directory of a new account (its tokens come with the first sign-in)"""
+    if not ACCOUNT_NAME_PATTERN.match(name or '') or name == DEFAULT_ACCOUNT:
+        raise ValueError(f"Invalid account name: {name!r}")
+    path = accounts_dir(data_dir) / name
+    path.mkdir(parents=True, exist_ok=True)
+    return Account(name, path, path)
+
@@ -0,0 +1,147 @@
+# src/services/analytics_summary.py
+from datetime import date, datetime
+from typing import Dict, Iterable
+
+import pandas as pd
+
+from services.priority import age_points, priority_tier
+
+
+class AnalyticsSummary:
+    """
+    Running aggregates of the tracking table: totals per status and
+    priority, replies and per-day counters of sent and replied emails.
+    Storage adds each written row and removes the row it replaced, so the
+    dashboard reads the counters instead of rescanning the table. Rows whose
+    priority is derived at load time are counted by (keyword score, day)
+    and their tier is computed when the report is built.
+    """
+
+    def __init__(self, counters: Dict = None):
+        self.counters = counters or {
+            'total': 0,
+            'status': {},
+            'priority': {},
+            'scored': {},
+            'replied': 0,
+            'reply_count': 0,
+            'sent_per_day': {},
+            'replied_per_day': {}
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'AnalyticsSummary':
+        """Builds the summary of a whole table"""
+        summary = cls()
+        for record in records:
+            summary.add(record)
+        return summary
+
+    @classmethod
+    def combine(cls, summaries: Iterable['AnalyticsSummary']) -> 'AnalyticsSummary':
+        """Sums the counters of several summaries (one per account shard)"""
+        combined = cls()
+        for summary in summaries:
+            for key, value in summary.counters.items():
+                if isinstance(value, dict):
+                    for name, count in value.items():
+                        combined._bump(key, name, count)
+                else:
+                    combined.counters[key] += value
+        return combined
+
+    def to_dict(self) -> Dict:
+        return self.counters
+
+    def add(self, record: Dict, sign: int = 1):
+        """Counts a row (or uncounts it with sign=-1)"""
+        counters = self.counters
+        counters['total'] += sign
+
+        status = record.get('status')
+        if isinstance(status, str):
+            self._bump('status', status, sign)
+
+        day = self._day(record.get('date_sent'))
+        score = record.get('keyword_score')
+        if self._is_set(score) and not record.get('priority_locked') == True:
+            self._bump('scored', f'{int(score)}|{day}', sign)
+        elif isinstance(record.get('priority'), str):
+            self._bump('priority', record['priority'], sign)
+
+        if day:
+            self._bump('sent_per_day', day, sign)
+        if record.get('has_reply') == True:
+            counters['replied'] += sign
+            self._bump('replied_per_day', day, sign)
+
+        reply_count = record.get('reply_count')
+        if self._is_set(reply_count):
+            counters['reply_count'] += sign * int(reply_count)
+
+    def remove(self, record: Dict):
+        self.add(record, sign=-1)
+
+    def report(self, now: datetime = None) -> Dict:
+        """Dashboard metrics at a given time, in the format of get_analytics_data"""
+        counters = self.counters
+        total_emails = counters['total']
+        if total_emails <= 0:
+            return {}
+
+        now = now or datetime.now()
+        today = now.date()
+
+        def age(day: str) -> int:
+            return max(0, (today - date.fromisoformat(day)).days) if day else 0
+
+        pending_emails = counters['status'].get('Pending', 0)
+        replied_emails = counters['replied']
+
+        priority_counts = dict(counters['priority'])
+        for key, count in counters['scored'].items():
+            score, day = key.split('|', 1)
+            tier = priority_tier(int(score) + age_points(age(day)))
+            priority_counts[tier] = priority_counts.get(tier, 0) + count
+
+        weekly_count = sum(count for day, count in counters['sent_per_day'].items() if age(day) < 7)
+
+        if replied_emails > 0:
+            avg_response_time = sum(age(day) * count for day, count in counters['replied_per_day'].items()) / replied_emails
+        else:
+            avg_response_time = 0
+
+        return {
+            'total_emails': total_emails,
+            'pending_emails': pending_emails,
+            'replied_emails': replied_emails,
+            'closed_emails': counters['status'].get('Closed', 0),
+            'response_rate': round(replied_emails / total_emails * 100, 1),
+            'follow_up_rate': round(pending_emails / total_emails * 100, 1),
+            'weekly_count': weekly_count,
+            'avg_response_time': round(avg_response_time, 1),
+            'total_replies': counters['reply_count'],
+            'priority_distribution': dict(sorted(priority_counts.items(), key=lambda item: -item[1])),
+            'status_distribution': dict(sorted(counters['status'].items(), key=lambda item: -item[1])),
+            'last_updated': now.strftime('%Y-%m-%d %H:%M')
+        }
+
+    def _bump(self, counter: str, key: str, amount: int):
+        values = self.counters[counter]
+        values[key] = values.get(key, 0) + amount
+        if values[key] == 0:
+            del values[key]
+
+    def _is_set(self, value) -> bool:
+        return value is not None and not isinstance(value, str) and not pd.isna(value)
+
+    def _day(self, value) -> str:
+        """YYYY-MM-DD of a stored date (ISO text or datetime), '' when missing"""
+        if isinstance(value, str):
+            try:
+                return date.fromisoformat(value[:10]).isoformat()
+            except ValueError:
+                return ''
+        if isinstance(value, (datetime, date)) and not pd.isna(value):
+            return value.strftime('%Y-%m-%d')
+        return ''
@@ -0,0 +1,181 @@
+# src/services/backup_store.py
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils.file_lock import FileLock
+
+
+class BackupStore:
+    """
+    Deduplicated, compressed snapshots of the tracking table.
+    Rows are split into content-defined chunks (boundaries depend on row ids,
+    so one edit only changes the chunk holding that row). Each chunk is
+    stored once, zlib-compressed and named by its SHA-256, and a manifest
+    lists the restore points with the chunks they reference.
+    """
+
+    def __init__(self,
+                 backup_dir: Path,
+                 rows_per_chunk: int = 256,
+                 keep_recent: int = 10,
+                 keep_hourly: int = 24,
+                 keep_daily: int = 7,
+                 keep_weekly: int = 8):
+        self.backup_dir = backup_dir
+        self.chunks_dir = backup_dir / 'chunks'
+        self.manifest_file = backup_dir / 'manifest.json'
+        self.chunks_dir.mkdir(parents=True, exist_ok=True)
+        self.rows_per_chunk = rows_per_chunk
+        self.retention = {
+            'recent': keep_recent,
+            'hourly': keep_hourly,
+            'daily': keep_daily,
+            'weekly': keep_weekly
+        }
+        # Chunk writes, the manifest and retention run under one lock (shared
+        # with other stores and processes), so a snapshot never loses another
+        # one's manifest entry and retention never deletes chunks a
+        # concurrent snapshot is about to reference
+        self._lock = FileLock(backup_dir / 'manifest.lock')
+
+    def has_manifest(self) -> bool:
+        return self.manifest_file.exists()
+
+    def create_snapshot(self, df: pd.DataFrame, created: datetime = None, name: str = None) -> Dict:
+        """Stores a restore point of df, writing only the chunks not stored yet"""
+        created = created or datetime.now()
+        columns = df.columns.tolist()
+        if not df.empty and 'id' in df.columns:
+            df = df.sort_values('id', kind='stable')
+        lines = df.to_json(orient='records', lines=True, date_format='iso').rstrip('\n').split('\n') if not df.empty else []
+        ids = df['id'].astype(str).tolist() if 'id' in df.columns else [str(i) for i in range(len(lines))]
+
+        with self._lock:
+            chunk_hashes = []
+            raw_bytes = 0
+            new_bytes = 0
+            for chunk in self._split_chunks(lines, ids):
+                data = '\n'.join(chunk).encode('utf-8')
+                raw_bytes += len(data)
+                chunk_hash = hashlib.sha256(data).hexdigest()
+                chunk_file = self._chunk_path(chunk_hash)
+                if not chunk_file.exists():
+                    compressed = zlib.compress(data, 6)
+                    chunk_file.parent.mkdir(exist_ok=True)
+                    tmp_file = chunk_file.with_suffix('.tmp')
+                    tmp_file.write_bytes(compressed)
+                    os.replace(tmp_file, chunk_file)
+                    new_bytes += len(compressed)
+                chunk_hashes.append(chunk_hash)
+
+            snapshot = {
+                'id': name or f"email_tracking_backup_{created.strftime('%Y%m%d_%H%M%S_%f')}",
+                'created': created.isoformat(),
+                'rows': len(lines),
+                'columns': columns,
+                'chunks': chunk_hashes,
+                'raw_bytes': raw_bytes,
+                'new_bytes': new_bytes
+            }
+
+            manifest = self._read_manifest()
+            manifest['snapshots'].append(snapshot)
+            manifest['snapshots'].sort(key=lambda s: s['created'], reverse=True)
+            self._apply_retention(manifest)
+            self._write_manifest(manifest)
+
+        return snapshot
+
+    def list_snapshots(self) -> List[Dict]:
+        """Restore points, newest first"""
+        with self._lock:
+            return self._read_manifest()['snapshots']
+
+    def get_snapshot(self, snapshot_id: str) -> Optional[Dict]:
+        """Finds a restore point by id"""
+        return next((s for s in self.list_snapshots() if s['id'] == snapshot_id), None)
+
+    def load_snapshot(self, snapshot_id: str) -> pd.DataFrame:
+        """Rebuilds the DataFrame of a restore point"""
+        snapshot = self.get_snapshot(snapshot_id)
+        if snapshot is None:
+            raise KeyError(f"Backup {snapshot_id} not found")
+
+        lines = []
+        for chunk_hash in snapshot['chunks']:
+            data = zlib.decompress(self._chunk_path(chunk_hash).read_bytes()).decode('utf-8')
+            if data:
+                lines.extend(data.split('\n'))
+
+        if not lines:
+            return pd.DataFrame(columns=snapshot['columns'])
+        df = pd.DataFrame([json.loads(line) for line in lines])
+        return df.reindex(columns=snapshot['columns'])
+
+    def _split_chunks(self, lines: List[str], ids: List[str]) -> List[List[str]]:
+        """Content-defined chunking: a chunk ends after rows whose id hash hits the boundary"""
+        chunks = []
+        current = []
+        max_rows = self.rows_per_chunk * 4
+        for line, row_id in zip(lines, ids):
+            current.append(line)
+            boundary = int(hashlib.md5(row_id.encode('utf-8')).hexdigest()[:8], 16) % self.rows_per_chunk == 0
+            if boundary or len(current) >= max_rows:
+                chunks.append(current)
+                current = []
+        if current or not chunks:
+            chunks.append(current)
+        return chunks
+
+    def _apply_retention(self, manifest: Dict):
+        """
+        Tiered retention: the newest restore points, plus the newest one of
+        each hour, day and ISO week up to the configured counts. Chunks no
+        longer referenced by any restore point are deleted (lock must be held).
+        """
+        snapshots = manifest['snapshots']
+        keep = {s['id'] for s in snapshots[:self.retention['recent']]}
+
+        for tier, bucket_format in (('hourly', '%Y%m%d%H'), ('daily', '%Y%m%d'), ('weekly', '%G%V')):
+            buckets = set()
+            for snapshot in snapshots:
+                bucket = datetime.fromisoformat(snapshot['created']).strftime(bucket_format)
+                if bucket in buckets:
+                    continue
+                if len(buckets) >= self.retention[tier]:
+                    break
+                buckets.add(bucket)
+                keep.add(snapshot['id'])
+
+        removed = [s for s in snapshots if s['id'] not in keep]
+        if not removed:
+            return
+
+        manifest['snapshots'] = [s for s in snapshots if s['id'] in keep]
+        referenced = {chunk for s in manifest['snapshots'] for chunk in s['chunks']}
+        for snapshot in removed:
+            for chunk_hash in snapshot['chunks']:
+                if chunk_hash not in referenced:
+                    self._chunk_path(chunk_hash).unlink(missing_ok=True)
+
+    def _chunk_path(self, chunk_hash: str) -> Path:
+        return self.chunks_dir / chunk_hash[:2] / f'{chunk_hash}.z'
+
+    def _read_manifest(self) -> Dict:
+        if not self.manifest_file.exists():
+            return {'snapshots': []}
+        with open(self.manifest_file, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: Dict):
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
@@ -1,73 +1,107 @@
 # src/services/calendar_service.py
+import base64
+import hashlib
 import pickle
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
-from google.auth.transport.requests import Request
+from typing import Dict, List, Optional, Tuple
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import streamlit as st
+from utils.api_executor import CircuitOpenError, get_executor, is_retryable
+from utils.discovery import build_service, drop_shared_service, new_http, shared_service
+from utils.reporter import Reporter, get_reporter
 
 class CalendarService:
-    def __init__(self, credentials_file: Path, scopes: List[str]):
+    # The Calendar batch endpoint accepts at most 50 calls per HTTP request
+    MAX_BATCH_SIZE = 50
+    
+    def __init__(self,
+                 credentials_file: Path,
+                 scopes: List[str],
+                 reporter: Reporter = None,
+                 interactive: bool = True,
+                 token_file: Path = None,
+                 account: str = 'me'):
         self.credentials_file = credentials_file
         self.scopes = scopes
-        self.token_file = Path('token_calendar.pickle')
+        # One token per account (see services.accounts)
+        self.token_file = token_file or Path('token_calendar.pickle')
+        self.account = account
         self._service = None
+        self.reporter = reporter or get_reporter()
+        # Without a browser (CLI, cron) the OAuth consent flow can't run
+        self.interactive = interactive
+        # Every call goes through the executor shared by all Calendar callers
+        self.api = get_executor('calendar', account)
+    
+    def authenticate(self):
+        """
+        Autentica con Google Calendar API.
+        The service is built once per process and shared by every instance.
+        """
+        return shared_service(self._service_key(), self._authenticate)
     
-    @st.cache_resource
-    def authenticate(_self):
-        """Autentica con Google Calendar API"""
+    def _service_key(self) -> str:
+        return f"calendar:{self.token_file.resolve()}"
+    
+    def _authenticate(self):
+        """Loads, refreshes or obtains the credentials and builds the service"""
         creds = None
         
         # Cargar credenciales existentes
-        if _self.token_file.exists():
+        if self.token_file.exists():
             try:
-                with open(_self.token_file, 'rb') as token:
+                with open(self.token_file, 'rb') as token:
                     creds = pickle.load(token)
             except Exception as e:
-                st.warning(f"Error loading calendar credentials: {e}")
-                _self.token_file.unlink(missing_ok=True)
+                self.reporter.warning(f"Error loading calendar credentials: {e}")
+                self.token_file.unlink(missing_ok=True)
         
         # Si no hay credenciales válidas, obtener nuevas
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
+                from google.auth.transport.requests import Request
                 try:
                     creds.refresh(Request())
                 except Exception as e:
-                    st.error(f"Error refreshing calendar credentials: {e}")
+                    self.reporter.error(f"Error refreshing calendar credentials: {e}")
                     return None
             else:
-                if not _self.credentials_file.exists():
-                    st.error(f"Credentials file not found: {_self.credentials_file}")
+                if not self.interactive:
+                    self.reporter.error("No valid Calendar token. Run the app once to authorize Calendar access.")
+                    return None
+                if not self.credentials_file.exists():
+                    self.reporter.error(f"Credentials file not found: {self.credentials_file}")
                     return None
                 
+                # The OAuth flow modules are only needed the first time
+                from google_auth_oauthlib.flow import InstalledAppFlow
                 try:
                     flow = InstalledAppFlow.from_client_secrets_file(
-                        str(_self.credentials_file), _self.scopes)
+                        str(self.credentials_file), self.scopes)
                     creds = flow.run_local_server(
                         port=8082,
                         prompt='consent'
                     )
                 except Exception as e:
-                    st.error(f"Error during calendar OAuth flow: {e}")
+                    self.reporter.error(f"Error during calendar OAuth flow: {e}")
                     return None
             
             # Guardar credenciales
             try:
-                with open(_self.token_file, 'wb') as token:
+                with open(self.token_file, 'wb') as token:
                     pickle.dump(creds, token)
-                st.success("Calendar authentication successful!")
+                self.reporter.success("Calendar authentication successful!")
             except Exception as e:
-                st.warning(f"Could not save calendar credentials: {e}")
+                self.reporter.warning(f"Could not save calendar credentials: {e}")
         
         try:
-            _self._service = build('calendar', 'v3', credentials=creds)
-            return _self._service
-        except HttpError as e:
-            st.error(f"Error building calendar service: {e}")
+            # Built from the discovery document on disk, no network round trip
+            self._service = build_service('calendar', 'v3', creds)
+            return self._service
+        except Exception as e:
+            self.reporter.error(f"Error building calendar service: {e}")
             return None
     
     def get_service(self):
@@ -76,103 +110,42 @@ class CalendarService:
             self._service = self.authenticate()
         return self._service
     
-    def test_connection(self, max_retries: int = 3) -> bool:
-        """Test Calendar API connection with SSL error handling"""
-        import ssl
-        import time
-        
-        service = self.get_service()
+    def test_connection(self) -> bool:
+        """Test Calendar API connection; retries are handled by the shared API executor"""
+        ok, detail = self.probe()
+        if ok:
+            self.reporter.success(detail)
+        else:
+            self.reporter.error(detail)
+        return ok
+    
+    def probe(self, timeout=20) -> Tuple[bool, str]:
+        """
+        Quiet connection test (no Streamlit calls, safe in a background
+        thread). Returns whether Calendar answered and a message to show.
+        """
+        service = self._service or self.get_service()
         if not service:
-            return False
+            return False, "Calendar is not authenticated"
         
-        for attempt in range(max_retries):
-            try:
-                # Try to get calendar list
-                calendar_list = service.calendarList().list().execute()
-                calendars = calendar_list.get('items', [])
-                primary_calendar = next((cal for cal in calendars if cal.get('primary')), None)
-                
-                if primary_calendar:
-                    st.success(f"Connected to Calendar: {primary_calendar.get('summary', 'Primary Calendar')}")
-                    return True
-                else:
-                    st.error("No primary calendar found")
-                    return False
-                    
-            except ssl.SSLError as e:
-                if attempt < max_retries - 1:
-                    print(f"SSL error testing calendar connection on attempt {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.warning("Calendar connection tested successfully after SSL retry")
-                    return True
-                    
-            except Exception as e:
-                if "SSL" in str(e) or "ssl" in str(e).lower() or "record layer failure" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        print(f"SSL-related error testing calendar connection on attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        st.info("Calendar connection tested successfully after connection retry")
-                        return True
-                else:
-                    st.error(f"Error testing calendar connection: {e}")
-                    return False
-                    
-            except HttpError as e:
-                if attempt < max_retries - 1 and e.resp.status in [429, 500, 502, 503, 504]:
-                    st.warning(f"Temporary Calendar API error. Retrying in {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.error(f"Error testing calendar connection: {e}")
-                    return False
-        
-        return False
-    
-    def _execute_with_ssl_retry(self, api_call, max_retries: int = 3, operation_name: str = "API call"):
-        """Helper function to execute API calls with SSL error handling"""
-        import ssl
-        import time
+        try:
+            # Own HTTP client: probes run on HealthMonitor threads
+            calendar_list = self.api.run(
+                service.calendarList().list(),
+                operation='connection test',
+                http=new_http(service, timeout)
+            )
+        except CircuitOpenError as e:
+            return False, f"Calendar API temporarily unavailable: {e}"
+        except Exception as e:
+            return False, f"Error testing calendar connection: {e}"
         
-        for attempt in range(max_retries):
-            try:
-                return api_call()
-                
-            except ssl.SSLError as e:
-                if attempt < max_retries - 1:
-                    print(f"SSL error during {operation_name} on attempt {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    print(f"Failed {operation_name} after SSL retries")
-                    return None
-                    
-            except Exception as e:
-                if "SSL" in str(e) or "ssl" in str(e).lower() or "record layer failure" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        print(f"SSL-related error during {operation_name} on attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        print(f"Failed {operation_name} after connection retries")
-                        return None
-                else:
-                    # Re-raise non-SSL exceptions
-                    raise e
-                    
-            except HttpError as e:
-                if attempt < max_retries - 1 and e.resp.status in [429, 500, 502, 503, 504]:
-                    print(f"Temporary API error during {operation_name}. Retrying in {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    # Re-raise HttpError for proper handling
-                    raise e
+        calendars = calendar_list.get('items', [])
+        primary_calendar = next((cal for cal in calendars if cal.get('primary')), None)
         
-        return None
+        if primary_calendar:
+            return True, f"Connected to Calendar: {primary_calendar.get('summary', 'Primary Calendar')}"
+        return False, "No primary calendar found"
     
     def get_calendars(self) -> List[Dict]:
         """Gets available calendars with SSL error handling"""
@@ -181,15 +154,10 @@ class CalendarService:
             return []
         
         try:
-            result = self._execute_with_ssl_retry(
-                lambda: service.calendarList().list().execute(),
-                operation_name="get calendars"
-            )
-            if result:
-                return result.get('items', [])
-            return []
-        except HttpError as e:
-            st.error(f"Error fetching calendars: {e}")
+            result = self.api.run(service.calendarList().list(), operation='get calendars')
+            return result.get('items', [])
+        except Exception as e:
+            self.reporter.error(f"Error fetching calendars: {e}")
             return []
     
     def create_follow_up_event(self,
@@ -199,9 +167,12 @@ class CalendarService:
                               follow_up_date: datetime = None,
                               duration_minutes: int = 30,
                               calendar_id: str = 'primary',
-                              reminder_minutes: List[int] = None) -> Optional[Dict]:
+                              reminder_minutes: List[int] = None,
+                              event_id: str = None) -> Optional[Dict]:
         """
-        Crea un evento de seguimiento en Google Calendar
+        Crea un evento de seguimiento en Google Calendar.
+        With event_id (see event_id_for) creating it again returns the
+        existing event instead of a duplicate.
         """
         service = self.get_service()
         if not service:
@@ -213,6 +184,45 @@ class CalendarService:
             # Ajustar a horario laboral (9 AM)
             follow_up_date = follow_up_date.replace(hour=9, minute=0, second=0, microsecond=0)
         
+        event = self._build_event(email_subject, recipient, original_date, follow_up_date, duration_minutes, reminder_minutes)
+        if event_id:
+            event['id'] = event_id
+        
+        try:
+            try:
+                result = self.api.run(
+                    service.events().insert(calendarId=calendar_id, body=event),
+                    operation='create follow-up event'
+                )
+            except HttpError as e:
+                if not event_id or e.resp.status != 409:
+                    raise
+                # Created by an earlier attempt
+                result = self._existing_event(service, calendar_id, event)
+            
+            return self._event_summary(result)
+        except Exception as e:
+            self.reporter.error(f"Error creating calendar event: {e}")
+            return None
+    
+    @staticmethod
+    def event_id_for(email_id: str) -> str:
+        """
+        Deterministic id of the follow-up event of an email: a hash of the
+        email id in base32hex (the characters Calendar accepts in ids), so
+        a retried creation hits the same event instead of adding another
+        """
+        digest = hashlib.sha1(f'follow-up:{email_id}'.encode('utf-8')).digest()
+        return base64.b32hexencode(digest).decode('ascii').rstrip('=').lower()
+    
+    def _build_event(self,
+                     email_subject: str,
+                     recipient: str,
+                     original_date: datetime,
+                     follow_up_date: datetime,
+                     duration_minutes: int = 30,
+                     reminder_minutes: List[int] = None) -> Dict:
+        """Body of a follow-up event"""
         # Configurar recordatorios por defecto
         if reminder_minutes is None:
             reminder_minutes = [15, 60]  # 15 minutos y 1 hora antes
@@ -237,27 +247,32 @@ class CalendarService:
             },
             'colorId': '9',  # Color azul para eventos de seguimiento
         }
-        
-        try:
-            result = self._execute_with_ssl_retry(
-                lambda: service.events().insert(calendarId=calendar_id, body=event).execute(),
-                operation_name="create follow-up event"
+        return event
+    
+    def _event_summary(self, result: Dict) -> Dict:
+        return {
+            'id': result['id'],
+            'html_link': result.get('htmlLink'),
+            'summary': result['summary'],
+            'start': result['start'],
+            'end': result['end']
+        }
+    
+    def _existing_event(self, service, calendar_id: str, event: Dict) -> Dict:
+        """
+        The event already stored under event['id']. A deleted event keeps
+        its id, so it is restored with the new details instead.
+        """
+        existing = self.api.run(
+            service.events().get(calendarId=calendar_id, eventId=event['id']),
+            operation='get follow-up event'
+        )
+        if existing.get('status') == 'cancelled':
+            existing = self.api.run(
+                service.events().update(calendarId=calendar_id, eventId=event['id'], body={**event, 'status': 'confirmed'}),
+                operation='restore follow-up event'
             )
-            
-            if result:
-                return {
-                    'id': result['id'],
-                    'html_link': result.get('htmlLink'),
-                    'summary': result['summary'],
-                    'start': result['start'],
-                    'end': result['end']
-                }
-            else:
-                st.error("Failed to create follow-up event after retries")
-                return None
-        except HttpError as e:
-            st.error(f"Error creating calendar event: {e}")
-            return None
+        return existing
     
     def _build_event_description(self, email_subject: str, recipient: str, original_date: datetime) -> str:
         """Construye la descripción del evento de seguimiento"""
@@ -287,22 +302,165 @@ Generated by Gmail Follow-up Manager"""
     def create_bulk_events(self, 
                           email_records: List[Dict],
                           base_follow_up_date: datetime = None,
-                          spacing_hours: int = 1) -> List[Dict]:
+                          spacing_hours: int = 1,
+                          calendar_id: str = 'primary',
+                          batch_size: int = 50) -> List[Dict]:
         """
-        Crea múltiples eventos de seguimiento de forma masiva
+        Crea múltiples eventos de seguimiento de forma masiva.
+        Events are inserted through the batch endpoint, batch_size per
+        request, with the deterministic id of each email (event_id_for):
+        an email whose event already exists gets that event back, so
+        creating the reminders again never duplicates them. Returns one
+        entry per email with an event; existing is True for those found.
         """
         service = self.get_service()
         if not service:
             return []
         
+        started = time.perf_counter()
+        schedule = self._schedule_times(len(email_records), base_follow_up_date, spacing_hours)
+        events = {}
+        for i, (record, follow_up_time) in enumerate(zip(email_records, schedule)):
+            event = self._build_event(
+                email_subject=record.get('subject', 'No Subject'),
+                recipient=record.get('to', 'Unknown'),
+                original_date=record.get('date_sent', datetime.now()),
+                follow_up_date=follow_up_time
+            )
+            email_id = record.get('id')
+            key = str(email_id) if email_id is not None else f'row-{i}'
+            if email_id is not None:
+                event['id'] = self.event_id_for(str(email_id))
+            events.setdefault(key, (record, follow_up_time, event))
+        
+        results = self._insert_events_batch(service, {key: event for key, (_, _, event) in events.items()}, calendar_id, batch_size)
+        
+        created_events = []
+        for key, (record, follow_up_time, _) in events.items():
+            if key not in results:
+                continue
+            result, existing = results[key]
+            if existing:
+                # An event created earlier keeps its own time, not the one
+                # computed for this run
+                follow_up_time = self._event_start(result) or follow_up_time
+            created_events.append({
+                'email_id': record.get('id'),
+                'event_id': result['id'],
+                'event_link': result.get('htmlLink'),
+                'scheduled_time': follow_up_time,
+                'subject': record.get('subject', 'No Subject'),
+                'existing': existing
+            })
+        
+        print(
+            f"Calendar: {len(created_events)}/{len(events)} follow-up events "
+            f"({sum(event['existing'] for event in created_events)} already existed) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return created_events
+    
+    def _event_start(self, event: Dict) -> Optional[datetime]:
+        """
+        Start of an event as a naive datetime in its own time zone, the way
+        follow-up dates are built and stored; None when it has none
+        """
+        start = event.get('start') or {}
+        value = start.get('dateTime') or start.get('date')
+        if not value:
+            return None
+        try:
+            start_time = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if start_time.tzinfo is not None:
+            if start.get('timeZone'):
+                from zoneinfo import ZoneInfo
+                start_time = start_time.astimezone(ZoneInfo(start['timeZone']))
+            start_time = start_time.replace(tzinfo=None)
+        return start_time
+    
+    def _insert_events_batch(self,
+                             service,
+                             events: Dict[str, Dict],
+                             calendar_id: str,
+                             batch_size: int = 50,
+                             max_retries: int = 3) -> Dict[str, Tuple[Dict, bool]]:
+        """
+        Inserts events through the batch endpoint; returns
+        {key: (event, existing)} for the ones that were created or already
+        existed (409 on their deterministic id). Items failing with a
+        transient error are retried on their own in a later round.
+        """
+        batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        results = {}
+        conflicts = []
+        pending = list(events.keys())
+        
+        for attempt in range(max_retries):
+            retryable = set()
+            errors = []
+            
+            def callback(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = (response, False)
+                elif isinstance(exception, HttpError) and exception.resp.status == 409 and 'id' in events[request_id]:
+                    conflicts.append(request_id)
+                elif is_retryable(exception):
+                    retryable.add(request_id)
+                    errors.append(exception)
+                else:
+                    print(f"Calendar batch item {request_id} failed: {exception}")
+            
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                batch = service.new_batch_http_request(callback=callback)
+                cost = 0
+                for key in chunk:
+                    request = service.events().insert(calendarId=calendar_id, body=events[key])
+                    cost += self.api.cost_of(request)
+                    batch.add(request, request_id=key)
+                
+                try:
+                    # A retried batch finds the events it already created as conflicts
+                    self.api.run(batch, operation=f'batch of {len(chunk)} events', cost=cost)
+                except Exception as e:
+                    print(f"Calendar batch request failed: {e}")
+            
+            for error in errors:
+                self.api.report_error(error)
+            
+            pending = [key for key in pending if key in retryable and key not in results]
+            if not pending:
+                break
+            if attempt < max_retries - 1:
+                delay = max(self.api.retry_delay(attempt, error) for error in errors)
+                print(f"Retrying {len(pending)} failed calendar events in {delay:.1f} seconds...")
+                time.sleep(delay)
+        
+        # Events created by an earlier attempt (or an earlier click)
+        for key in dict.fromkeys(conflicts):
+            if key in results:
+                continue
+            try:
+                results[key] = (self._existing_event(service, calendar_id, events[key]), True)
+            except Exception as e:
+                print(f"Could not read existing event of {key}: {e}")
+        
+        if pending:
+            print(f"Giving up on {len(pending)} calendar events after {max_retries} attempts")
+        return results
+    
+    def _schedule_times(self, count: int, base_follow_up_date: datetime = None, spacing_hours: int = 1) -> List[datetime]:
+        """Follow-up times of count events, spaced out on working days and hours"""
         if not base_follow_up_date:
             base_follow_up_date = datetime.now() + timedelta(days=1)
             base_follow_up_date = base_follow_up_date.replace(hour=9, minute=0, second=0, microsecond=0)
         
-        created_events = []
+        times = []
         current_time = base_follow_up_date
         
-        for i, record in enumerate(email_records):
+        for i in range(count):
             # Espaciar eventos para evitar solapamiento
             follow_up_time = current_time + timedelta(hours=i * spacing_hours)
             
@@ -316,23 +474,9 @@ Generated by Gmail Follow-up Manager"""
             elif follow_up_time.hour >= 17:
                 follow_up_time = follow_up_time.replace(hour=9, minute=0) + timedelta(days=1)
             
-            event_result = self.create_follow_up_event(
-                email_subject=record.get('subject', 'No Subject'),
-                recipient=record.get('to', 'Unknown'),
-                original_date=record.get('date_sent', datetime.now()),
-                follow_up_date=follow_up_time
-            )
-            
-            if event_result:
-                created_events.append({
-                    'email_id': record.get('id'),
-                    'event_id': event_result['id'],
-                    'event_link': event_result['html_link'],
-                    'scheduled_time': follow_up_time,
-                    'subject': record.get('subject', 'No Subject')
-                })
+            times.append(follow_up_time)
         
-        return created_events
+        return times
     
     def update_event(self, event_id: str, updates: Dict, calendar_id: str = 'primary') -> bool:
         """Actualiza un evento existente"""
@@ -342,22 +486,22 @@ Generated by Gmail Follow-up Manager"""
         
         try:
             # Obtener evento actual
-            event = service.events().get(calendarId=calendar_id, eventId=event_id).execute()
+            event = self.api.run(service.events().get(calendarId=calendar_id, eventId=event_id))
             
             # Aplicar actualizaciones
             event.update(updates)
             
             # Guardar cambios
-            updated_event = service.events().update(
+            updated_event = self.api.run(service.events().update(
                 calendarId=calendar_id,
                 eventId=event_id,
                 body=event
-            ).execute()
+            ))
             
             return True
             
-        except HttpError as e:
-            st.error(f"Error updating event {event_id}: {e}")
+        except Exception as e:
+            self.reporter.error(f"Error updating event {event_id}: {e}")
             return False
     
     def delete_event(self, event_id: str, calendar_id: str = 'primary') -> bool:
@@ -367,10 +511,10 @@ Generated by Gmail Follow-up Manager"""
             return False
         
         try:
-            service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+            self.api.run(service.events().delete(calendarId=calendar_id, eventId=event_id))
             return True
-        except HttpError as e:
-            st.error(f"Error deleting event {event_id}: {e}")
+        except Exception as e:
+            self.reporter.error(f"Error deleting event {event_id}: {e}")
             return False
     
     def get_upcoming_follow_ups(self, days_ahead: int = 7) -> List[Dict]:
@@ -386,14 +530,14 @@ Generated by Gmail Follow-up Manager"""
             time_max = (now + timedelta(days=days_ahead)).isoformat() + 'Z'
             
             # Buscar eventos que contengan "Follow-up" en el título
-            events_result = service.events().list(
+            events_result = self.api.run(service.events().list(
                 calendarId='primary',
                 timeMin=time_min,
                 timeMax=time_max,
                 q='Follow-up',
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ))
             
             events = events_result.get('items', [])
             
@@ -410,16 +554,17 @@ Generated by Gmail Follow-up Manager"""
             
             return follow_up_events
             
-        except HttpError as e:
-            st.error(f"Error fetching upcoming follow-ups: {e}")
+        except Exception as e:
+            self.reporter.error(f"Error fetching upcoming follow-ups: {e}")
             return []
     
     def revoke_credentials(self):
         """Revoca las credenciales almacenadas"""
         if self.token_file.exists():
             self.token_file.unlink()
-            st.success("Calendar credentials revoked. Please re-authenticate.")
+            self.reporter.success("Calendar credentials revoked. Please re-authenticate.")
         else:
-            st.info("No stored calendar credentials found.")
+            self.reporter.info("No stored calendar credentials found.")
         self._service = None
+        drop_shared_service(self._service_key())
             
\ No newline at end of file
@@ -0,0 +1,161 @@
+# src/services/change_journal.py
+import json
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from utils.file_lock import FileLock
+
+
+class ChangeJournal:
+    """
+    Append-only JSON lines log of per-row changes to the tracking data.
+    Each entry sets column values and/or increments counters of one row.
+    Readers fold the entries over the last snapshot until compaction merges
+    them into the snapshot and empties the journal.
+    """
+
+    def __init__(self, journal_file: Path):
+        self.journal_file = journal_file
+        # The app, `cli sync --watch` and CLI scans are separate processes:
+        # appends, reads over storage and compactions all hold this lock
+        self.lock = FileLock(journal_file.with_suffix('.lock'))
+
+    def append(self, row_id: str, set_values: Dict = None, increments: Dict = None):
+        """Records a change of one row as a single appended line"""
+        entry = {
+            'ts': time.time(),
+            'id': str(row_id),
+            'set': {col: self._to_json_value(value) for col, value in (set_values or {}).items()},
+            'inc': increments or {}
+        }
+        line = json.dumps(entry) + '\n'
+
+        with self.lock:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self) -> List[Dict]:
+        """Reads the journal entries in the order they were written"""
+        if not self.journal_file.exists():
+            return []
+
+        entries = []
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted write
+                    print(f"Skipping malformed journal line in {self.journal_file.name}")
+        return entries
+
+    def size_bytes(self) -> int:
+        """Size of the journal file"""
+        return self.journal_file.stat().st_size if self.journal_file.exists() else 0
+
+    def version(self):
+        """Changes whenever entries are appended or compacted"""
+        if not self.journal_file.exists():
+            return None
+        stat = self.journal_file.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def age_seconds(self) -> float:
+        """Age of the oldest pending entry"""
+        if not self.journal_file.exists():
+            return 0.0
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+        try:
+            return time.time() - json.loads(first_line)['ts']
+        except (json.JSONDecodeError, KeyError):
+            return 0.0
+
+    def needs_compaction(self, max_bytes: int, max_age_seconds: float) -> bool:
+        """Tells whether the journal passed its size or age threshold"""
+        size = self.size_bytes()
+        if size == 0:
+            return False
+        return size >= max_bytes or self.age_seconds() >= max_age_seconds
+
+    def fold(self, df: pd.DataFrame, entries: List[Dict] = None) -> pd.DataFrame:
+        """Applies the journal entries to a snapshot DataFrame"""
+        entries = self.entries() if entries is None else entries
+        if not entries or df.empty or 'id' not in df.columns:
+            return df
+
+        positions = {str(row_id): idx for idx, row_id in zip(df.index, df['id'])}
+        for entry in entries:
+            idx = positions.get(entry['id'])
+            if idx is None:
+                continue
+
+            for col, value in entry['set'].items():
+                if col not in df.columns:
+                    df[col] = None
+                if df[col].dtype != object:
+                    df[col] = df[col].astype(object)
+                df.at[idx, col] = value
+
+            for col, amount in entry['inc'].items():
+                current = df.at[idx, col] if col in df.columns else 0
+                df.at[idx, col] = (0 if pd.isna(current) else current) + amount
+
+        return df
+
+    def fold_records(self, records: Dict[str, Dict], entries: List[Dict]) -> Dict[str, Dict]:
+        """
+        Applies journal entries to {id: record} rows and returns the resulting
+        absolute {id: {column: value}} changes
+        """
+        changes = {}
+        for entry in entries:
+            record = records.get(entry['id'])
+            if record is None:
+                continue
+
+            row_changes = changes.setdefault(entry['id'], {})
+            for col, value in entry['set'].items():
+                record[col] = value
+                row_changes[col] = value
+
+            for col, amount in entry['inc'].items():
+                current = record.get(col)
+                record[col] = (0 if current is None or pd.isna(current) else current) + amount
+                row_changes[col] = record[col]
+
+        return changes
+
+    def drop_entries(self, count: int):
+        """Removes the first count entries, keeping anything appended afterwards (lock must be held)"""
+        remaining = self.entries()[count:]
+        if not remaining:
+            self.journal_file.unlink(missing_ok=True)
+            return
+
+        tmp_file = self.journal_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for entry in remaining:
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_file, self.journal_file)
+
+    def clear(self):
+        """Discards every pending entry"""
+        with self.lock:
+            self.journal_file.unlink(missing_ok=True)
+
+    def _to_json_value(self, value):
+        """Converts a value to something JSON can store"""
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if hasattr(value, 'item'):
+            # numpy scalars
+            return value.item()
+        return value
@@ -1,37 +1,186 @@
 # src/services/data_service.py
 import pandas as pd
 import json
-from datetime import datetime
+import threading
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, List, Optional
-import streamlit as st
+from typing import Dict, List, Optional, Tuple
+from services.analytics_summary import AnalyticsSummary
+from services.backup_store import BackupStore
+from services.change_journal import ChangeJournal
+from services.priority import age_points_array, get_matcher, priority_tiers
+from services.storage import ExcelStorage, SQLiteStorage, StorageBackend
+from utils.reporter import Reporter, get_reporter
 
 class DataService:
-    def __init__(self, data_dir: Path):
+    # Columnas de fecha del seguimiento
+    DATE_COLUMNS = ['date_sent', 'follow_up_date', 'last_updated']
+    # Columnas calculadas al cargar, nunca guardadas
+    DERIVED_COLUMNS = ['days_since_sent']
+    # Estados que siguen esperando respuesta
+    OPEN_STATUSES = ['Pending', 'Following Up']
+    
+    # Journals being compacted in the background, shared by all instances
+    _compacting = set()
+    _compacting_guard = threading.Lock()
+    
+    # Loaded tables shared by every instance (and rerun) of the process,
+    # keyed by storage location: {key: (version, DataFrame)}
+    _table_cache = {}
+    _table_cache_lock = threading.Lock()
+    
+    def __init__(self,
+                 data_dir: Path,
+                 backend: str = 'sqlite',
+                 journal_max_bytes: int = 256 * 1024,
+                 journal_max_age_seconds: float = 600,
+                 backup_retention: Dict = None,
+                 reporter: Reporter = None):
         self.data_dir = data_dir
+        self.reporter = reporter or get_reporter()
         self.data_dir.mkdir(exist_ok=True)
         self.emails_file = self.data_dir / 'email_tracking.xlsx'
         self.settings_file = self.data_dir / 'app_settings.json'
+        self.sync_state_file = self.data_dir / 'sync_state.json'
         self.backup_dir = self.data_dir / 'backups'
         self.backup_dir.mkdir(exist_ok=True)
+        self.storage = self._create_storage(backend)
+        self.backup_store = BackupStore(self.backup_dir, **(backup_retention or {}))
+        self._import_legacy_backups()
+        
+        # Single-row edits are appended here and merged into storage later
+        self.journal = ChangeJournal(self.data_dir / 'email_tracking.journal.jsonl')
+        self.journal_max_bytes = journal_max_bytes
+        self.journal_max_age_seconds = journal_max_age_seconds
+        self._schedule_compaction()
+    
+    def _create_storage(self, backend: str) -> StorageBackend:
+        """
+        Crea el backend de almacenamiento.
+        With SQLite, Excel is only an import/export format: an existing
+        email_tracking.xlsx is imported once into the empty database.
+        """
+        if backend == 'excel':
+            return ExcelStorage(self.emails_file)
+        if backend != 'sqlite':
+            raise ValueError(f"Unknown storage backend: {backend}")
+        
+        storage = SQLiteStorage(self.data_dir / 'email_tracking.sqlite')
+        if not storage.exists() and self.emails_file.exists():
+            try:
+                storage.save(self._normalize_datetimes(pd.read_excel(self.emails_file)))
+                print(f"Imported {self.emails_file.name} into {storage.db_path.name}")
+            except Exception as e:
+                self.reporter.warning(f"Could not import {self.emails_file.name}: {e}")
+        return storage
     
     def load_email_data(self) -> pd.DataFrame:
-        """Carga los datos de seguimiento de emails"""
-        if self.emails_file.exists():
+        """
+        Carga los datos de seguimiento de emails.
+        The table is parsed once per storage version and kept in memory;
+        callers get a copy they are free to modify.
+        """
+        if self.storage.exists():
             try:
-                df = pd.read_excel(self.emails_file)
-                # Asegurar que las columnas de fecha sean datetime
-                date_columns = ['date_sent', 'follow_up_date', 'last_updated']
-                for col in date_columns:
-                    if col in df.columns:
-                        df[col] = pd.to_datetime(df[col], errors='coerce')
-                return df
+                return self._cached_table().copy()
             except Exception as e:
-                st.error(f"Error loading email data: {e}")
+                self.reporter.error(f"Error loading email data: {e}")
                 return self._create_empty_dataframe()
         else:
             return self._create_empty_dataframe()
     
+    def _cached_table(self) -> pd.DataFrame:
+        """
+        Loaded table of the current storage version. The version covers
+        writes of other processes, the pending journal and the day (for
+        days_since_sent); it is read before loading, so a write racing with
+        the load only causes one more reload.
+        """
+        key = self._table_cache_key()
+        version = (self.storage.version(), self.journal.version(), date.today())
+        with DataService._table_cache_lock:
+            cached = DataService._table_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        # Storage and journal are read together, so a compaction of another
+        # process can't apply the same entries twice
+        with self.journal.lock:
+            snapshot = self.journal.fold(self.storage.load())
+        df = self._add_derived_columns(self._parse_dates(snapshot))
+        with DataService._table_cache_lock:
+            DataService._table_cache[key] = (version, df)
+        return df
+    
+    def _table_cache_key(self) -> str:
+        return f"{self.data_dir.resolve()}:{type(self.storage).__name__}"
+    
+    def _invalidate_table_cache(self):
+        with DataService._table_cache_lock:
+            DataService._table_cache.pop(self._table_cache_key(), None)
+    
+    def _load_rows(self, ids: List[str]) -> pd.DataFrame:
+        """Carga solo algunas filas, con sus cambios pendientes del journal"""
+        with self.journal.lock:
+            rows = self.journal.fold(self.storage.get_rows(ids))
+        return self._parse_dates(rows)
+    
+    def _parse_dates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Asegura que las columnas de fecha sean datetime (naive, en hora local)"""
+        for col in self.DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = self._to_local_naive(df[col])
+        return df
+    
+    def _normalize_datetimes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convierte fechas con timezone a naive para almacenarlas"""
+        return self._parse_dates(df)
+    
+    def _to_local_naive(self, values: pd.Series) -> pd.Series:
+        """
+        Converts dates to naive local time. Timezone-aware values are
+        converted (not just stripped), so emails sent from any offset line up
+        with the local clock; naive values are already local.
+        """
+        local_tz = datetime.now().astimezone().tzinfo
+        if values.dtype == object:
+            # A fresh scan mixes datetimes of several offsets
+            aware = values.map(lambda value: isinstance(value, datetime) and value.tzinfo is not None).astype(bool)
+            if aware.any():
+                converted = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+                converted[aware] = pd.to_datetime(values[aware], utc=True).dt.tz_convert(local_tz).dt.tz_localize(None)
+                converted[~aware] = pd.to_datetime(values[~aware], errors='coerce')
+                return converted
+        
+        converted = pd.to_datetime(values, errors='coerce')
+        if isinstance(converted.dtype, pd.DatetimeTZDtype):
+            return converted.dt.tz_convert(local_tz).dt.tz_localize(None)
+        return converted
+    
+    def _add_derived_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Computes days_since_sent from date_sent, and the priority of the rows
+        with a stored keyword score from that score plus the current age
+        bonus. Priorities set by hand (priority_locked) are kept.
+        """
+        if df.empty or 'date_sent' not in df.columns:
+            return df
+        
+        # Calendar days, the same unit the analytics summary counts by
+        days = (pd.Timestamp.now().normalize() - df['date_sent'].dt.normalize()).dt.days
+        df['days_since_sent'] = days.clip(lower=0).fillna(0).astype(int)
+        
+        if 'keyword_score' in df.columns:
+            scores = pd.to_numeric(df['keyword_score'], errors='coerce')
+            derivable = scores.notna()
+            if 'priority_locked' in df.columns:
+                derivable &= ~df['priority_locked'].eq(True)
+            if derivable.any():
+                totals = scores[derivable].to_numpy() + age_points_array(df.loc[derivable, 'days_since_sent'].to_numpy())
+                df.loc[derivable, 'priority'] = priority_tiers(totals)
+        
+        return df
+    
     def _create_empty_dataframe(self) -> pd.DataFrame:
         """Crea un DataFrame vacío con las columnas necesarias"""
         columns = [
@@ -39,91 +188,122 @@ class DataService:
             'snippet', 'has_reply', 'reply_count', 'status', 'priority',
             'days_since_sent', 'body_preview', 'labels', 'notes', 
             'follow_up_date', 'created_reminder', 'last_updated',
-            'calendar_event_id', 'follow_up_count', 'final_outcome'
+            'calendar_event_id', 'follow_up_count', 'final_outcome',
+            'keyword_score', 'priority_locked'
         ]
         return pd.DataFrame(columns=columns)
     
     def save_email_data(self, df: pd.DataFrame) -> bool:
-        """Guarda los datos de seguimiento de emails"""
+        """
+        Guarda los datos de seguimiento de emails, replacing the table:
+        stored rows df lacks are deleted, so a backup is taken first
+        """
+        return self._write_email_data(df, replace=True)
+    
+    def upsert_email_data(self, df: pd.DataFrame) -> bool:
+        """
+        Writes the rows of df without deleting the stored rows it lacks,
+        for writers (the background sync, edits of loaded rows) that must
+        never replace the table. Nothing is lost, so no backup is taken and
+        the cost follows the rows that changed.
+        """
+        return self._write_email_data(df, replace=False)
+    
+    def _write_email_data(self, df: pd.DataFrame, replace: bool) -> bool:
         try:
-            # Crear backup antes de guardar
-            self._create_backup()
-            
-            # Agregar timestamp de última actualización
-            df['last_updated'] = datetime.now()
-            
-
-            # Convertir fechas con timezone a naive para Excel
-            datetime_columns = ['date_sent', 'follow_up_date', 'last_updated']
-            for col in datetime_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-                    if hasattr(df[col].dtype, 'tz') and df[col].dt.tz is not None:
-                        df[col] = df[col].dt.tz_localize(None)
-
-            # Guardar en Excel
-            df.to_excel(self.emails_file, index=False)
+            self._normalize_datetimes(df)
+            stored_df = df.drop(columns=self.DERIVED_COLUMNS, errors='ignore')
             
-            # También guardar en CSV para compatibilidad
-            csv_file = self.emails_file.with_suffix('.csv')
-            df.to_csv(csv_file, index=False)
+            # Under the journal lock no other process can append and compact
+            # a change between our compaction and the write
+            with self.journal.lock:
+                # The journal changes df was loaded with go into storage (and
+                # are dropped from the journal) before it is replaced; anything
+                # appended later stays pending and is applied over the new data
+                self._compact_journal()
+                
+                # Crear backup antes de reemplazar: the whole table is loaded
+                # and serialized, so only writes that can delete rows pay it
+                if replace:
+                    self._create_backup()
+                
+                # Only changed rows get a new last_updated timestamp and are written
+                if replace:
+                    written = self.storage.save(stored_df, touch_column='last_updated')
+                else:
+                    written = self.storage.upsert(stored_df, touch_column='last_updated')
+            self._invalidate_table_cache()
+            print(f"Saved email data: {written} rows written")
             
             return True
             
         except Exception as e:
-            st.error(f"Error saving email data: {e}")
+            self.reporter.error(f"Error saving email data: {e}")
             return False
     
     def _create_backup(self) -> bool:
-        """Crea un backup de los datos actuales"""
-        if not self.emails_file.exists():
+        """Crea un backup de los datos actuales (journal lock held and journal compacted)"""
+        if not self.storage.exists():
             return True
         
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = self.backup_dir / f'email_tracking_backup_{timestamp}.xlsx'
-            
-            # Copiar archivo actual
-            import shutil
-            shutil.copy2(self.emails_file, backup_file)
-            
-            # Mantener solo los últimos 10 backups
-            self._cleanup_old_backups()
+            # Only chunks that changed since earlier backups are written;
+            # old restore points are pruned by the tiered retention
+            snapshot = self.backup_store.create_snapshot(self.storage.load())
+            print(f"Backup {snapshot['id']}: {snapshot['rows']} rows, {snapshot['new_bytes']} new bytes stored")
             
             return True
             
         except Exception as e:
-            st.warning(f"Could not create backup: {e}")
+            self.reporter.warning(f"Could not create backup: {e}")
             return False
     
-    def _cleanup_old_backups(self, keep_count: int = 10):
-        """Limpia backups antiguos, manteniendo solo los más recientes"""
+    def _import_legacy_backups(self):
+        """Adds the whole-file backups of earlier versions to the backup manifest, once"""
+        if self.backup_store.has_manifest():
+            return
+        
         try:
-            backup_files = list(self.backup_dir.glob('email_tracking_backup_*.xlsx'))
-            if len(backup_files) > keep_count:
-                # Ordenar por fecha de modificación
-                backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-                # Eliminar los más antiguos
-                for old_backup in backup_files[keep_count:]:
-                    old_backup.unlink()
+            legacy_files = sorted(self.backup_dir.glob('email_tracking_backup_*.*'), key=lambda x: x.stat().st_mtime)
+            for backup_file in legacy_files:
+                if backup_file.suffix == '.xlsx':
+                    df = pd.read_excel(backup_file)
+                elif backup_file.suffix == '.sqlite':
+                    df = SQLiteStorage(backup_file).load()
+                else:
+                    continue
+                self.backup_store.create_snapshot(
+                    df,
+                    created=datetime.fromtimestamp(backup_file.stat().st_mtime),
+                    name=backup_file.stem
+                )
         except Exception as e:
-            st.warning(f"Could not cleanup old backups: {e}")
+            self.reporter.warning(f"Could not import old backups: {e}")
     
     def merge_with_existing_data(self, new_df: pd.DataFrame) -> pd.DataFrame:
         """
         Fusiona datos nuevos con existentes, preservando estados y notas
         """
-        existing_df = self.load_email_data()
+        # Only the rows being merged are read from storage
+        existing_df = self._load_rows(new_df['id'].tolist()) if 'id' in new_df.columns else pd.DataFrame()
         
         if existing_df.empty:
-            return new_df
+            return self._add_derived_columns(self._parse_dates(new_df))
+        
+        # Priorities set by hand survive a new scan
+        if 'priority_locked' in existing_df.columns:
+            locked = existing_df['priority_locked'].eq(True)
+            existing_df['locked_priority'] = existing_df['priority'].where(locked)
         
         # Columnas que queremos preservar de los datos existentes
         preserve_columns = [
             'status', 'notes', 'follow_up_date', 'created_reminder',
-            'calendar_event_id', 'follow_up_count', 'final_outcome'
+            'calendar_event_id', 'follow_up_count', 'final_outcome',
+            'priority_locked', 'locked_priority'
         ]
         
+        preserve_columns = [col for col in preserve_columns if col in existing_df.columns]
+        
         # Hacer merge manteniendo datos existentes
         merged_df = pd.merge(
             new_df, 
@@ -140,85 +320,204 @@ class DataService:
                 merged_df[col] = merged_df[existing_col].combine_first(merged_df[col])
                 merged_df = merged_df.drop(columns=[existing_col])
         
-        return merged_df
+        if 'locked_priority' in merged_df.columns:
+            merged_df['priority'] = merged_df['locked_priority'].combine_first(merged_df['priority'])
+            merged_df = merged_df.drop(columns=['locked_priority'])
+        
+        return self._add_derived_columns(self._parse_dates(merged_df))
     
     def update_email_status(self, email_id: str, status: str, notes: str = None) -> bool:
         """Actualiza el estado de un email específico"""
         try:
-            df = self.load_email_data()
-            
             # Encontrar el email
-            mask = df['id'] == email_id
-            if not mask.any():
-                st.error(f"Email with ID {email_id} not found")
+            if self._load_rows([email_id]).empty:
+                self.reporter.error(f"Email with ID {email_id} not found")
                 return False
             
             # Actualizar estado
-            df.loc[mask, 'status'] = status
+            changes = {'status': status, 'last_updated': datetime.now()}
             if notes is not None:
-                df.loc[mask, 'notes'] = notes
+                changes['notes'] = notes
             
             # Incrementar contador de seguimientos si es apropiado
+            increments = None
             if status in ['Following Up', 'Contacted Again']:
-                current_count = df.loc[mask, 'follow_up_count'].fillna(0).iloc[0]
-                df.loc[mask, 'follow_up_count'] = current_count + 1
+                increments = {'follow_up_count': 1}
             
-            # Guardar cambios
-            return self.save_email_data(df)
+            # Registrar el cambio en el journal (una sola línea)
+            self.journal.append(email_id, changes, increments)
+            self._schedule_compaction()
+            return True
             
         except Exception as e:
-            st.error(f"Error updating email status: {e}")
+            self.reporter.error(f"Error updating email status: {e}")
             return False
     
-    def get_analytics_data(self) -> Dict:
-        """Genera datos analíticos del seguimiento de emails"""
+    def get_open_followups(self) -> pd.DataFrame:
+        """Emails still waiting for a reply, with what a reply refresh needs"""
         df = self.load_email_data()
-        
         if df.empty:
-            return {}
+            return df
+        columns = ['id', 'thread_id', 'has_reply', 'reply_count', 'status']
+        return df.loc[df['status'].isin(self.OPEN_STATUSES), columns].reset_index(drop=True)
+    
+    def apply_reply_status(self, replies: Dict[str, Tuple[bool, int]]) -> int:
+        """
+        Writes refreshed reply counts of open emails in one storage write.
+        An open email that got a reply is closed, as a new scan would mark
+        it. Only rows that changed are written; returns how many.
+        """
+        try:
+            open_df = self.get_open_followups()
+            if open_df.empty or not replies:
+                return 0
+            
+            now = datetime.now()
+            updates = {}
+            for row in open_df.itertuples(index=False):
+                row_id = str(row.id)
+                if row_id not in replies:
+                    continue
+                has_reply, reply_count = replies[row_id]
+                if has_reply == (row.has_reply == True) and reply_count == row.reply_count:
+                    continue
+                changes = {'has_reply': has_reply, 'reply_count': reply_count, 'last_updated': now}
+                if has_reply:
+                    changes['status'] = 'Closed'
+                updates[row_id] = changes
+            
+            if updates:
+                # Older journal changes go into storage first, so they can't
+                # fold over this newer refresh
+                with self.journal.lock:
+                    self._compact_journal()
+                    self.storage.update_rows(updates)
+            return len(updates)
+            
+        except Exception as e:
+            self.reporter.error(f"Error saving reply status: {e}")
+            return 0
+    
+    def keyword_scores(self, df: pd.DataFrame, keywords: str = "") -> pd.Series:
+        """
+        Vectorized keyword score of every row from its stored subject and
+        body preview, with the same rules used when emails are fetched
+        """
+        text = (df['subject'].fillna('').astype(str) + '\n' + df['body_preview'].fillna('').astype(str)).str.lower()
+        return get_matcher(keywords).score_series(text)
+    
+    def rescore_priorities(self, keywords: str = "") -> int:
+        """
+        Re-ranks every stored email for a keyword configuration without
+        calling the Gmail API. Priorities set by hand are kept. Only rows
+        whose score or priority changed are written; returns how many.
+        """
+        try:
+            df = self.load_email_data()
+            if df.empty:
+                return 0
+            
+            scores = self.keyword_scores(df, keywords)
+            priorities = pd.Series(
+                priority_tiers(scores.to_numpy() + age_points_array(df['days_since_sent'].to_numpy())),
+                index=df.index
+            )
+            
+            changed = priorities != df['priority']
+            if 'keyword_score' in df.columns:
+                changed |= scores != pd.to_numeric(df['keyword_score'], errors='coerce')
+            else:
+                changed[:] = True
+            if 'priority_locked' in df.columns:
+                changed &= ~df['priority_locked'].eq(True)
+            
+            updates = {
+                str(row_id): {'keyword_score': int(score), 'priority': priority}
+                for row_id, score, priority in zip(df.loc[changed, 'id'], scores[changed], priorities[changed])
+            }
+            if updates:
+                # Same as apply_reply_status: pending journal changes first
+                with self.journal.lock:
+                    self._compact_journal()
+                    self.storage.update_rows(updates)
+            return len(updates)
+            
+        except Exception as e:
+            self.reporter.error(f"Error re-ranking emails: {e}")
+            return 0
+    
+    def compact_journal(self) -> int:
+        """Merges the pending journal changes into storage; returns how many were merged"""
+        with self.journal.lock:
+            return self._compact_journal()
+    
+    def _compact_journal(self) -> int:
+        """compact_journal with the journal lock already held"""
+        entries = self.journal.entries()
+        if not entries:
+            return 0
         
-        total_emails = len(df)
-        pending_emails = len(df[df['status'] == 'Pending'])
-        replied_emails = len(df[df['has_reply'] == True])
-        closed_emails = len(df[df['status'] == 'Closed'])
+        ids = list(dict.fromkeys(entry['id'] for entry in entries))
+        rows = self.storage.get_rows(ids)
+        records = {str(record['id']): record for record in rows.to_dict('records')} if not rows.empty else {}
         
-        # Calcular métricas
-        response_rate = (replied_emails / total_emails * 100) if total_emails > 0 else 0
-        follow_up_rate = (pending_emails / total_emails * 100) if total_emails > 0 else 0
+        changes = self.journal.fold_records(records, entries)
+        if changes:
+            self.storage.update_rows(changes)
+        self.journal.drop_entries(len(entries))
+        return len(entries)
+    
+    def _schedule_compaction(self):
+        """Compacts the journal in a background thread once it passes its size or age threshold"""
+        if not self.journal.needs_compaction(self.journal_max_bytes, self.journal_max_age_seconds):
+            return
         
-        # Análisis por prioridad
-        priority_counts = df['priority'].value_counts().to_dict() if 'priority' in df.columns else {}
+        key = str(self.journal.journal_file)
+        with DataService._compacting_guard:
+            if key in DataService._compacting:
+                return
+            DataService._compacting.add(key)
         
-        # Análisis temporal
-        if 'date_sent' in df.columns:
-            df['date_sent'] = pd.to_datetime(df['date_sent'], errors='coerce')
-            recent_emails = df[df['date_sent'] >= (datetime.now() - pd.Timedelta(days=7))]
-            weekly_count = len(recent_emails)
-        else:
-            weekly_count = 0
+        def run():
+            try:
+                merged = self.compact_journal()
+                print(f"Journal compaction: {merged} changes merged into storage")
+            except Exception as e:
+                print(f"Journal compaction failed: {e}")
+            finally:
+                with DataService._compacting_guard:
+                    DataService._compacting.discard(key)
         
-        # Tiempo promedio de respuesta
-        replied_df = df[df['has_reply'] == True].copy()
-        if not replied_df.empty and 'date_sent' in replied_df.columns:
-            replied_df['response_time'] = replied_df['days_since_sent']
-            avg_response_time = replied_df['response_time'].mean()
-        else:
-            avg_response_time = 0
+        threading.Thread(target=run, name='journal-compaction', daemon=True).start()
+    
+    def get_analytics_summary(self) -> AnalyticsSummary:
+        """
+        The aggregates storage keeps up to date on every write; only the
+        rows with pending journal changes are read to adjust them.
+        """
+        with self.journal.lock:
+            summary = self.storage.summary()
+            entries = self.journal.entries()
+            ids = list(dict.fromkeys(entry['id'] for entry in entries))
+            rows = self.storage.get_rows(ids) if entries else None
         
-        analytics = {
-            'total_emails': total_emails,
-            'pending_emails': pending_emails,
-            'replied_emails': replied_emails,
-            'closed_emails': closed_emails,
-            'response_rate': round(response_rate, 1),
-            'follow_up_rate': round(follow_up_rate, 1),
-            'weekly_count': weekly_count,
-            'avg_response_time': round(avg_response_time, 1),
-            'priority_distribution': priority_counts,
-            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M')
-        }
+        if entries:
+            records = {str(record['id']): record for record in rows.to_dict('records')} if not rows.empty else {}
+            for record in records.values():
+                summary.remove(record)
+            self.journal.fold_records(records, entries)
+            for record in records.values():
+                summary.add(record)
         
-        return analytics
+        return summary
+    
+    def get_analytics_data(self) -> Dict:
+        """Genera datos analíticos del seguimiento de emails"""
+        try:
+            return self.get_analytics_summary().report()
+        except Exception as e:
+            self.reporter.error(f"Error computing analytics: {e}")
+            return {}
     
     def export_to_excel(self, df: pd.DataFrame, filename: str = None) -> str:
         """Exporta DataFrame a Excel con formato mejorado"""
@@ -253,7 +552,7 @@ class DataService:
             return str(export_path)
             
         except Exception as e:
-            st.error(f"Error exporting to Excel: {e}")
+            self.reporter.error(f"Error exporting to Excel: {e}")
             return None
     
     def load_settings(self) -> Dict:
@@ -263,7 +562,7 @@ class DataService:
                 with open(self.settings_file, 'r') as f:
                     return json.load(f)
             except Exception as e:
-                st.warning(f"Error loading settings: {e}")
+                self.reporter.warning(f"Error loading settings: {e}")
         
         # Configuraciones por defecto
         return {
@@ -282,49 +581,72 @@ class DataService:
                 json.dump(settings, f, indent=2)
             return True
         except Exception as e:
-            st.error(f"Error saving settings: {e}")
+            self.reporter.error(f"Error saving settings: {e}")
+            return False
+    
+    def load_sync_state(self) -> Dict:
+        """Carga el estado de la última sincronización con Gmail"""
+        if self.sync_state_file.exists():
+            try:
+                with open(self.sync_state_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                self.reporter.warning(f"Error loading sync state: {e}")
+        
+        return {}
+    
+    def save_sync_state(self, state: Dict) -> bool:
+        """Guarda el estado de la última sincronización con Gmail"""
+        try:
+            with open(self.sync_state_file, 'w') as f:
+                json.dump(state, f, indent=2)
+            return True
+        except Exception as e:
+            self.reporter.error(f"Error saving sync state: {e}")
             return False
     
     def get_backup_files(self) -> List[Dict]:
-        """Obtiene lista de archivos de backup disponibles"""
+        """Obtiene lista de backups disponibles desde el manifest"""
         try:
-            backup_files = list(self.backup_dir.glob('email_tracking_backup_*.xlsx'))
             backups_info = []
             
-            for backup_file in sorted(backup_files, key=lambda x: x.stat().st_mtime, reverse=True):
-                stat = backup_file.stat()
+            for snapshot in self.backup_store.list_snapshots():
+                created = datetime.fromisoformat(snapshot['created'])
                 backups_info.append({
-                    'filename': backup_file.name,
-                    'path': str(backup_file),
-                    'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                    'created': datetime.fromtimestamp(stat.st_mtime),
-                    'age_days': (datetime.now() - datetime.fromtimestamp(stat.st_mtime)).days
+                    'filename': snapshot['id'],
+                    'path': snapshot['id'],
+                    'rows': snapshot['rows'],
+                    'size_mb': round(snapshot['raw_bytes'] / (1024 * 1024), 2),
+                    'created': created,
+                    'age_days': (datetime.now() - created).days
                 })
             
             return backups_info
             
         except Exception as e:
-            st.error(f"Error getting backup files: {e}")
+            self.reporter.error(f"Error getting backup files: {e}")
             return []
     
     def restore_from_backup(self, backup_path: str) -> bool:
-        """Restaura datos desde un archivo de backup"""
+        """Restaura datos desde un backup del manifest"""
         try:
-            backup_file = Path(backup_path)
-            if not backup_file.exists():
-                st.error("Backup file not found")
+            if self.backup_store.get_snapshot(backup_path) is None:
+                self.reporter.error("Backup not found")
                 return False
             
-            # Crear backup del estado actual antes de restaurar
-            self._create_backup()
+            df = self.backup_store.load_snapshot(backup_path)
             
-            # Copiar backup al archivo principal
-            import shutil
-            shutil.copy2(backup_file, self.emails_file)
+            # Crear backup del estado actual antes de restaurar; changes
+            # appended afterwards still apply over the restored data
+            with self.journal.lock:
+                self._compact_journal()
+                self._create_backup()
+                self.storage.save(self._normalize_datetimes(df))
+            self._invalidate_table_cache()
             
-            st.success(f"Data restored from backup: {backup_file.name}")
+            self.reporter.success(f"Data restored from backup: {backup_path}")
             return True
             
         except Exception as e:
-            st.error(f"Error restoring from backup: {e}")
-            return False
\ No newline at end of file
+            self.reporter.error(f"Error restoring from backup: {e}")
+            return False
@@ -2,246 +2,266 @@
 import base64
 import email
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from googleapiclient.errors import HttpError
-import streamlit as st
 import pandas as pd
 from email.utils import parsedate_to_datetime
 import re
+import threading
+from services.label_catalog import LabelCatalog
+from services.message_cache import MessageCache
+from services.priority import age_points, days_since, get_matcher, priority_tier
+from services.reply_index import ReplyIndex, is_own_message
+from services.thread_cache import ThreadCache
+from utils.api_executor import get_executor, is_retryable
+from utils.discovery import new_http
+from utils.reporter import Reporter, get_reporter
 
 class GmailService:
-    def __init__(self, gmail_auth):
+    # The batch endpoint accepts at most 100 calls per HTTP request
+    MAX_BATCH_SIZE = 100
+    # Headers kept for the messages of a thread when checking for replies
+    THREAD_METADATA_HEADERS = ['From', 'Message-ID']
+    # Headers requested by the metadata-only first pass of a tiered fetch
+    MESSAGE_METADATA_HEADERS = ['Subject', 'From', 'To', 'Date', 'Message-ID', 'In-Reply-To', 'References']
+    # Gmail cuts snippets at about 200 characters; a shorter one holds the whole body
+    SNIPPET_COMPLETE_CHARS = 150
+    FETCH_MODES = ('batch', 'concurrent', 'serial')
+    # How replies are found: downloading each thread, or joining the
+    # In-Reply-To/References headers of received messages (ReplyIndex)
+    REPLY_DETECTION_MODES = ('threads', 'headers')
+    # Most received messages read to build a ReplyIndex
+    REPLY_INDEX_MAX_MESSAGES = 5000
+
+    def __init__(self,
+                 gmail_auth,
+                 thread_cache: ThreadCache = None,
+                 message_cache: MessageCache = None,
+                 label_catalog: LabelCatalog = None,
+                 reporter: Reporter = None,
+                 service=None):
         self.auth = gmail_auth
-        self.service = gmail_auth.get_service()
+        self.reporter = reporter or get_reporter()
+        # A background thread passes its own service (httplib2 is not thread-safe)
+        self.service = service or gmail_auth.get_service()
+        # Every call goes through the executor shared with the authenticator
+        # (one per account, each mailbox has its own quota)
+        self.api = get_executor('gmail', getattr(gmail_auth, 'account', 'me'))
+        self.thread_cache = thread_cache if thread_cache is not None else ThreadCache()
+        # Optional persistent cache of parsed messages (sent messages never change)
+        self.message_cache = message_cache
+        # Optional shared label list, fetched once per TTL
+        self.label_catalog = label_catalog
+        # Per-thread HTTP clients for concurrent fetching
+        self._local = threading.local()
+        self.last_scan_stats = {}
+        self.last_sync_changes = {}
+        self._own_address = None
     
+    def get_labels(self, refresh: bool = False) -> List[Dict]:
+        """Gets all available labels in Gmail (from the label catalog when there is one)"""
+        if self.label_catalog is not None:
+            return self.label_catalog.get_labels(self._fetch_labels, refresh=refresh)
+        return self._fetch_labels() or []
     
-    def _safe_calculate_days(self, date_obj):
-        """Safely calculates elapsed days"""
-        if date_obj is None:
-            return 0
-        
+    def _fetch_labels(self) -> Optional[List[Dict]]:
+        """Lists the labels with the API; None on failure"""
         try:
-            # Get current datetime
-            now = datetime.now()
-            
-            # Convert both to naive datetime for comparison
-            if hasattr(date_obj, 'tzinfo') and date_obj.tzinfo is not None:
-                # date_obj has timezone, remove it
-                date_naive = date_obj.replace(tzinfo=None)
-            else:
-                # date_obj is already naive
-                date_naive = date_obj
-            
-            # now must also be naive
-            if hasattr(now, 'tzinfo') and now.tzinfo is not None:
-                now_naive = now.replace(tzinfo=None)
-            else:
-                now_naive = now
-            
-            # Calculate difference
-            delta = now_naive - date_naive
-            return max(0, delta.days)
-            
+            results = self.api.run(self.service.users().labels().list(userId='me'), operation='get labels')
         except Exception as e:
-            print(f"Error calculating days: {e}")
-            return 0
-
-    def get_labels(self, max_retries: int = 3) -> List[Dict]:
-        """Gets all available labels in Gmail with SSL error handling"""
-        import ssl
-        import time
-        
-        for attempt in range(max_retries):
-            try:
-                results = self.service.users().labels().list(userId='me').execute()
-                labels = results.get('labels', [])
-                return sorted(labels, key=lambda x: x['name'])
-                
-            except ssl.SSLError as e:
-                if attempt < max_retries - 1:
-                    print(f"SSL error getting labels on attempt {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.warning("Labels loaded successfully after SSL retry")
-                    return []
-                    
-            except Exception as e:
-                if "SSL" in str(e) or "ssl" in str(e).lower() or "record layer failure" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        print(f"SSL-related error getting labels on attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        st.info("Labels loaded successfully after connection retry")
-                        return []
-                else:
-                    st.error(f"Error fetching labels: {e}")
-                    return []
-                    
-            except HttpError as e:
-                if attempt < max_retries - 1 and e.resp.status in [429, 500, 502, 503, 504]:
-                    st.warning(f"Temporary API error getting labels. Retrying in {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.error(f"Error fetching labels: {e}")
-                    return []
+            self.reporter.error(f"Error fetching labels: {e}")
+            return None
         
-        return []
+        labels = results.get('labels', [])
+        return sorted(labels, key=lambda x: x['name'])
     
     def search_messages(self, 
                        query: str = '',
                        label_ids: List[str] = None,
                        max_results: int = 100,
-                       include_spam_trash: bool = False,
-                       max_retries: int = 3) -> List[Dict]:
+                       include_spam_trash: bool = False) -> List[Dict]:
         """
-        Searches for messages based on specific criteria with SSL error handling
+        Searches for messages based on specific criteria
         """
-        import ssl
-        import time
+        messages = []
+        try:
+            for page in self.iter_message_pages(query, label_ids, max_results, include_spam_trash):
+                messages.extend(page)
+        except Exception as e:
+            self.reporter.error(f"Error searching messages: {e}")
+            return []
         
+        return messages
+    
+    def iter_message_pages(self,
+                           query: str = '',
+                           label_ids: List[str] = None,
+                           max_results: int = 100,
+                           include_spam_trash: bool = False,
+                           http=None) -> Iterator[List[Dict]]:
+        """
+        Yields the {'id', 'threadId'} messages of a search page by page, as
+        they are listed, stopping once max_results messages were yielded.
+        Raises if the first page fails; a failing later page ends the search.
+        """
         # Gmail API has a maximum of 500 results per page
         # We'll use 500 per page for efficiency, but respect the total max_results
-        page_size = min(500, max_results)
+        search_params = {
+            'userId': 'me',
+            'q': query,
+            'maxResults': min(500, max_results),
+            'includeSpamTrash': include_spam_trash
+        }
         
-        for attempt in range(max_retries):
+        if label_ids:
+            search_params['labelIds'] = label_ids
+        
+        yielded = 0
+        page_count = 0
+        while yielded < max_results:
             try:
-                search_params = {
-                    'userId': 'me',
-                    'q': query,
-                    'maxResults': page_size,
-                    'includeSpamTrash': include_spam_trash
-                }
-                
-                if label_ids:
-                    search_params['labelIds'] = label_ids
-                
-                result = self.service.users().messages().list(**search_params).execute()
-                messages = result.get('messages', [])
-                
-                # Debug logging
-                print(f"First page: got {len(messages)} messages")
-                
-                # Get next page if there are more results and we haven't reached our limit
-                page_count = 1
-                while 'nextPageToken' in result and len(messages) < max_results:
-                    # Calculate how many more messages we need
-                    remaining = max_results - len(messages)
-                    # Use the smaller of: remaining needed or max page size (500)
-                    next_page_size = min(500, remaining)
-                    
-                    search_params['pageToken'] = result['nextPageToken']
-                    search_params['maxResults'] = next_page_size
-                    
-                    try:
-                        result = self.service.users().messages().list(**search_params).execute()
-                        new_messages = result.get('messages', [])
-                        messages.extend(new_messages)
-                        page_count += 1
-                        
-                        # Debug logging
-                        print(f"Page {page_count}: got {len(new_messages)} messages, total: {len(messages)}")
-                        
-                        # If we got fewer messages than requested, we've reached the end
-                        if len(new_messages) < next_page_size:
-                            print(f"Reached end of results at page {page_count}")
-                            break
-                            
-                    except Exception as page_error:
-                        print(f"Error fetching page {page_count}: {page_error}")
-                        break
-                
-                print(f"Final result: {len(messages)} messages from {page_count} pages")
-                return messages[:max_results]
-                
-            except ssl.SSLError as e:
-                if attempt < max_retries - 1:
-                    # Handle SSL errors silently with exponential backoff
-                    print(f"SSL error on search attempt {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.warning("Search completed successfully after SSL retry")
-                    return []
-                    
-            except Exception as e:
-                # Check if it's an SSL-related error in the exception message
-                if "SSL" in str(e) or "ssl" in str(e).lower() or "record layer failure" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        # Handle SSL-related errors silently
-                        print(f"SSL-related error on search attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        st.info("Search completed successfully after connection retry")
-                        return []
-                else:
-                    # For non-SSL errors, show the error
-                    st.error(f"Error searching messages: {e}")
-                    return []
+                result = self.api.run(self.service.users().messages().list(**search_params), operation='search messages', http=http)
+            except Exception as page_error:
+                if page_count == 0:
+                    raise
+                print(f"Error fetching page {page_count + 1}: {page_error}")
+                break
             
-            except HttpError as e:
-                if attempt < max_retries - 1 and e.resp.status in [429, 500, 502, 503, 504]:
-                    st.warning(f"Temporary API error. Retrying in {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.error(f"Error searching messages: {e}")
-                    return []
+            page = result.get('messages', [])[:max_results - yielded]
+            page_count += 1
+            yielded += len(page)
+            
+            # Debug logging
+            print(f"Page {page_count}: got {len(page)} messages, total: {yielded}")
+            if page:
+                yield page
+            
+            # If we got fewer messages than requested, we've reached the end
+            if 'nextPageToken' not in result or len(page) < search_params['maxResults']:
+                break
+            
+            # Use the smaller of: remaining needed or max page size (500)
+            search_params['pageToken'] = result['nextPageToken']
+            search_params['maxResults'] = min(500, max_results - yielded)
         
-        return []
+        print(f"Final result: {yielded} messages from {page_count} pages")
     
-    def get_message_details(self, message_id: str, max_retries: int = 3) -> Optional[Dict]:
-        """Gets complete details of a message with SSL error handling"""
-        import ssl
-        import time
+    def _prefetch_pages(self, pages: Iterator[List[Dict]], depth: int = 2) -> Iterator[List[Dict]]:
+        """
+        Runs a page iterator on a producer thread, so later pages are listed
+        while the consumer processes the current one. At most depth pages
+        wait in the queue; the producer stops when the consumer does.
+        """
+        import queue
         
-        for attempt in range(max_retries):
-            try:
-                message = self.service.users().messages().get(
-                    userId='me', 
-                    id=message_id,
-                    format='full'
-                ).execute()
-                
-                return self._parse_message(message)
-                
-            except ssl.SSLError as e:
-                if attempt < max_retries - 1:
-                    print(f"SSL error getting message {message_id} on attempt {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(2 ** attempt)
+        pipe = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+        end = object()
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pipe.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
                     continue
-                else:
-                    print(f"Failed to get message {message_id} after SSL retries")
-                    return None
-                    
+            return False
+        
+        def produce():
+            try:
+                for page in pages:
+                    if not put(page):
+                        return
             except Exception as e:
-                if "SSL" in str(e) or "ssl" in str(e).lower() or "record layer failure" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        print(f"SSL-related error getting message {message_id} on attempt {attempt + 1}/{max_retries}: {e}")
-                        time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        print(f"Failed to get message {message_id} after connection retries")
-                        return None
-                else:
-                    st.error(f"Error fetching message {message_id}: {e}")
-                    return None
-                    
-            except HttpError as e:
-                if attempt < max_retries - 1 and e.resp.status in [429, 500, 502, 503, 504]:
-                    print(f"Temporary API error getting message {message_id}. Retrying in {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    st.error(f"Error fetching message {message_id}: {e}")
-                    return None
+                put(e)
+            finally:
+                put(end)
+        
+        producer = threading.Thread(target=produce, name='gmail-search', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pipe.get()
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+    
+    def _thread_http(self):
+        """
+        Returns an HTTP client owned by the calling thread.
+        httplib2 connections are not thread-safe, so every worker of the
+        concurrent mode authorizes its own client with the shared credentials.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._new_http()
+            self._local.http = http
+        return http
+    
+    def _new_http(self):
+        """Builds a new HTTP client authorized with the service credentials"""
+        return new_http(self.service, timeout=30)
+    
+    def get_message_details(self,
+                            message_id: str,
+                            http=None,
+                            message_format: str = 'full',
+                            errors: List[str] = None) -> Optional[Dict]:
+        """
+        Gets the details of a message. With message_format='metadata' only the
+        whitelisted headers are downloaded and 'body' is None. Worker threads
+        pass errors to collect error messages instead of reporting them.
+        """
+        if self.message_cache is not None and message_id in self.message_cache:
+            cached = self.message_cache.get(message_id)
+            if cached is not None and (message_format == 'metadata' or cached.get('body') is not None):
+                return cached
+        
+        try:
+            message = self.api.run(
+                self._message_request(message_id, message_format),
+                operation=f'get message {message_id}',
+                http=http
+            )
+        except Exception as e:
+            if is_retryable(e):
+                # Transient failures are already logged by the executor
+                print(f"Failed to get message {message_id}: {e}")
+            else:
+                self._report_error(f"Error fetching message {message_id}: {e}", errors)
+            return None
         
-        return None
+        details = self._parse_message(message, include_body=message_format == 'full')
+        if self.message_cache is not None:
+            self.message_cache.put(details)
+        return details
     
-    def _parse_message(self, message: Dict) -> Dict:
+    def _report_error(self, message: str, errors: Optional[List[str]] = None):
+        """
+        Reports an error, or adds it to errors when called from a worker
+        thread (the Streamlit reporter only works on the script thread)
+        """
+        if errors is not None:
+            errors.append(message)
+        else:
+            self.reporter.error(message)
+    
+    def _message_request(self, message_id: str, message_format: str):
+        """Builds a messages.get request for the full message or only its metadata"""
+        if message_format == 'metadata':
+            return self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='metadata',
+                metadataHeaders=self.MESSAGE_METADATA_HEADERS
+            )
+        return self.service.users().messages().get(userId='me', id=message_id, format='full')
+    
+    def _parse_message(self, message: Dict, include_body: bool = True) -> Dict:
         """Parses a Gmail message and extracts relevant information"""
         payload = message.get('payload', {})
         headers = payload.get('headers', [])
@@ -271,8 +291,8 @@ class GmailService:
             'references': header_dict.get('references', '')
         })
         
-        # Extraer contenido del cuerpo
-        msg_data['body'] = self._extract_body(payload)
+        # Extraer contenido del cuerpo (metadata fetches don't carry it)
+        msg_data['body'] = self._extract_body(payload) if include_body else None
         
         return msg_data
     
@@ -304,10 +324,10 @@ class GmailService:
     def get_thread_messages(self, thread_id: str) -> List[Dict]:
         """Obtiene todos los mensajes de un hilo"""
         try:
-            thread = self.service.users().threads().get(
+            thread = self.api.run(self.service.users().threads().get(
                 userId='me', 
                 id=thread_id
-            ).execute()
+            ))
             
             messages = []
             for message in thread.get('messages', []):
@@ -316,17 +336,316 @@ class GmailService:
             
             return sorted(messages, key=lambda x: x['internal_date'])
             
-        except HttpError as e:
-            st.error(f"Error fetching thread {thread_id}: {e}")
+        except Exception as e:
+            self.reporter.error(f"Error fetching thread {thread_id}: {e}")
             return []
     
-    def has_replies(self, thread_id: str, original_message_id: str) -> Tuple[bool, int]:
+    def _execute_batch(self,
+                       request_factories: Dict[str, object],
+                       batch_size: int = 50,
+                       max_retries: int = 3,
+                       progress_callback=None) -> Dict[str, Dict]:
+        """
+        Executes API requests through the batch endpoint.
+        request_factories maps a request id to a callable that builds the request.
+        Each batch is charged the quota units of all its items. Items that fail
+        with a transient error are retried on their own in a later round;
+        returns {request_id: response} for the successful ones.
+        """
+        import time
+        
+        batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        results = {}
+        pending = list(request_factories.keys())
+        total = len(pending)
+        
+        for attempt in range(max_retries):
+            retryable = set()
+            errors = []
+            
+            def callback(request_id, response, exception):
+                if exception is None:
+                    results[request_id] = response
+                elif is_retryable(exception):
+                    retryable.add(request_id)
+                    errors.append(exception)
+                else:
+                    print(f"Batch item {request_id} failed: {exception}")
+            
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                batch = self.service.new_batch_http_request(callback=callback)
+                cost = 0
+                for request_id in chunk:
+                    request = request_factories[request_id]()
+                    cost += self.api.cost_of(request)
+                    batch.add(request, request_id=request_id)
+                
+                try:
+                    # The executor retries the batch request itself; items are retried below
+                    self.api.run(batch, operation=f'batch of {len(chunk)}', cost=cost)
+                except Exception as e:
+                    print(f"Batch request failed: {e}")
+                
+                if progress_callback:
+                    progress_callback(len(results), total)
+            
+            # Throttled items slow down the shared limiter like single calls do
+            for error in errors:
+                self.api.report_error(error)
+            
+            pending = [rid for rid in pending if rid in retryable and rid not in results]
+            if not pending:
+                break
+            
+            if attempt < max_retries - 1:
+                delay = max(self.api.retry_delay(attempt, error) for error in errors) if errors else self.api.retry_delay(attempt)
+                print(f"Retrying {len(pending)} failed batch items in {delay:.1f} seconds...")
+                time.sleep(delay)
+        
+        if pending:
+            print(f"Giving up on {len(pending)} batch items after {max_retries} attempts")
+        
+        return results
+    
+    def get_messages_batch(self,
+                           message_ids: List[str],
+                           batch_size: int = 50,
+                           progress_callback=None,
+                           message_format: str = 'full') -> Dict[str, Dict]:
+        """
+        Gets the details of several messages using batch requests.
+        Messages already in the message cache are served locally, so only
+        the new ones cost API calls.
+        """
+        message_ids = list(dict.fromkeys(message_ids))
+        details_by_id = {}
+        new_ids = message_ids
+        if self.message_cache is not None:
+            cached_ids, new_ids = self.message_cache.split_known(message_ids)
+            details_by_id = self.message_cache.get_many(cached_ids)
+            if message_format == 'full':
+                # Metadata-only entries don't have the body asked for
+                details_by_id = {mid: details for mid, details in details_by_id.items() if details.get('body') is not None}
+            # Anything missing from the cache after all is fetched again
+            new_ids += [message_id for message_id in cached_ids if message_id not in details_by_id]
+            print(f"Message cache: {len(details_by_id)} served locally, {len(new_ids)} to fetch")
+        
+        factories = {
+            message_id: (lambda mid=message_id: self._message_request(mid, message_format))
+            for message_id in new_ids
+        }
+        
+        responses = self._execute_batch(factories, batch_size, progress_callback=progress_callback) if factories else {}
+        fetched = {
+            message_id: self._parse_message(message, include_body=message_format == 'full')
+            for message_id, message in responses.items()
+        }
+        if self.message_cache is not None:
+            self.message_cache.put_many(fetched.values())
+        
+        details_by_id.update(fetched)
+        return details_by_id
+    
+    def get_threads_batch(self,
+                          thread_ids: List[str],
+                          batch_size: int = 50,
+                          history_ids: Dict[str, str] = None,
+                          progress_callback=None) -> Dict[str, List[Dict]]:
+        """Gets the message summaries of several threads, using the cache and batch requests"""
+        history_ids = history_ids or {}
+        summaries = {}
+        missing = []
+        
+        for thread_id in dict.fromkeys(thread_ids):
+            cached = self.thread_cache.get(thread_id, history_ids.get(thread_id))
+            if cached is not None:
+                summaries[thread_id] = cached
+            else:
+                missing.append(thread_id)
+        
+        threads = self.service.users().threads()
+        factories = {
+            thread_id: (lambda tid=thread_id: threads.get(
+                userId='me',
+                id=tid,
+                format='metadata',
+                metadataHeaders=self.THREAD_METADATA_HEADERS
+            ))
+            for thread_id in missing
+        }
+        
+        responses = self._execute_batch(factories, batch_size, progress_callback=progress_callback) if factories else {}
+        for thread_id, thread in responses.items():
+            summaries[thread_id] = self._summarize_thread(thread)
+            self.thread_cache.put(thread_id, thread.get('historyId'), summaries[thread_id])
+        
+        return summaries
+    
+    def get_thread_summary(self, thread_id: str, history_id: str = None, http=None,
+                           errors: List[str] = None) -> List[Dict]:
+        """
+        Gets the message summaries of a thread, served from the cache when
+        unchanged (errors as in get_message_details)
+        """
+        cached = self.thread_cache.get(thread_id, history_id)
+        if cached is not None:
+            return cached
+        
+        try:
+            thread = self.api.run(self.service.users().threads().get(
+                userId='me',
+                id=thread_id,
+                format='metadata',
+                metadataHeaders=self.THREAD_METADATA_HEADERS
+            ), http=http)
+        except Exception as e:
+            self._report_error(f"Error fetching thread {thread_id}: {e}", errors)
+            return []
+        
+        summary = self._summarize_thread(thread)
+        self.thread_cache.put(thread_id, thread.get('historyId'), summary)
+        return summary
+    
+    def _summarize_thread(self, thread: Dict) -> List[Dict]:
+        """Keeps only what reply detection needs from each message of a thread"""
+        messages = []
+        for message in thread.get('messages', []):
+            headers = {h['name'].lower(): h['value'] for h in message.get('payload', {}).get('headers', [])}
+            messages.append({
+                'id': message['id'],
+                'internal_date': datetime.fromtimestamp(int(message['internalDate']) / 1000),
+                'labels': message.get('labelIds', []),
+                'from': headers.get('from', ''),
+                'message_id_header': headers.get('message-id', '')
+            })
+        
+        return sorted(messages, key=lambda x: x['internal_date'])
+    
+    def _thread_history_lookup(self, query: str):
+        """
+        Returns a function giving the current historyId of threads matching a
+        query. One threads.list page covers up to 500 threads, so validating
+        cached threads this way is much cheaper than downloading them again.
+        Pages are read only as far as needed and remembered between calls,
+        so the pages of a streamed search don't list the same threads again.
+        """
+        known = {}
+        requested = set()
+        params = {'userId': 'me', 'q': query, 'maxResults': 500}
+        state = {'pages': 0, 'done': False}
+        
+        def lookup(thread_ids: List[str]) -> Dict[str, str]:
+            wanted = set(thread_ids)
+            requested.update(wanted)
+            max_pages = len(requested) // 500 + 2
+            try:
+                while not state['done'] and state['pages'] < max_pages and not wanted <= known.keys():
+                    result = self.api.run(self.service.users().threads().list(**params))
+                    state['pages'] += 1
+                    for thread in result.get('threads', []):
+                        known[thread['id']] = thread.get('historyId')
+                    
+                    if 'nextPageToken' not in result:
+                        state['done'] = True
+                    params['pageToken'] = result.get('nextPageToken')
+            except Exception as e:
+                # Without history ids every thread is simply fetched again
+                print(f"Could not list thread history ids: {e}")
+                state['done'] = True
+            
+            return {thread_id: known[thread_id] for thread_id in wanted if thread_id in known}
+        
+        return lookup
+    
+    def refresh_replies(self, followups: pd.DataFrame, batch_size: int = 50) -> Dict[str, Tuple[bool, int]]:
+        """
+        Recounts the replies of tracked emails (columns id and thread_id)
+        with threads.get(format='minimal'): message ids, labels and dates
+        only, batch_size threads per batch request. Returns
+        {email id: (has_reply, reply_count)} for the threads that answered.
+        """
+        import time
+        
+        started = time.perf_counter()
+        thread_ids = list(dict.fromkeys(followups['thread_id'].dropna().astype(str)))
+        threads = self.service.users().threads()
+        factories = {
+            thread_id: (lambda tid=thread_id: threads.get(userId='me', id=tid, format='minimal'))
+            for thread_id in thread_ids
+        }
+        responses = self._execute_batch(factories, batch_size) if factories else {}
+        
+        replies = {}
+        for email_id, thread_id in zip(followups['id'].astype(str), followups['thread_id'].astype(str)):
+            thread = responses.get(thread_id)
+            if thread is not None:
+                replies[email_id] = self._count_replies(self._summarize_thread(thread), email_id)
+        
+        print(
+            f"Reply refresh: {len(responses)}/{len(thread_ids)} threads of {len(followups)} open emails "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return replies
+    
+    def get_own_address(self) -> Optional[str]:
+        """Email address of the mailbox (from the profile, asked once)"""
+        if self._own_address is None:
+            try:
+                profile = self.api.run(self.service.users().getProfile(userId='me'))
+                self._own_address = profile.get('emailAddress') or ''
+            except Exception as e:
+                # Not asked again for every thread; the SENT label still applies
+                print(f"Could not get mailbox address: {e}")
+                self._own_address = ''
+        return self._own_address or None
+    
+    def build_reply_index(self, days_back: int, batch_size: int = 50) -> ReplyIndex:
+        """
+        Lists the messages received in the window and indexes their
+        In-Reply-To/References headers. Only metadata is fetched, in
+        batches, and received messages never change, so the message cache
+        serves every one already seen by an earlier scan. Past
+        REPLY_INDEX_MAX_MESSAGES only the newest messages are indexed and
+        emails sent before the oldest of them are checked by thread.
+        """
+        import time
+        
+        started = time.perf_counter()
+        start_date = datetime.now() - timedelta(days=days_back)
+        query = f'after:{start_date.strftime("%Y/%m/%d")} -in:sent -in:drafts -in:chats'
+        message_ids = [
+            message['id']
+            for page in self.iter_message_pages(query, max_results=self.REPLY_INDEX_MAX_MESSAGES)
+            for message in page
+        ]
+        
+        messages = list(self.get_messages_batch(message_ids, batch_size, message_format='metadata').values())
+        index = ReplyIndex([self.get_own_address()])
+        index.add_many(messages)
+        if len(message_ids) >= self.REPLY_INDEX_MAX_MESSAGES and messages:
+            index.complete_since = min(message['internal_date'] for message in messages)
+            self.reporter.warning(
+                f"More than {self.REPLY_INDEX_MAX_MESSAGES} messages received in the last {days_back} days: "
+                f"replies to emails sent before {index.complete_since:%Y-%m-%d %H:%M} are checked by thread"
+            )
+        print(f"Reply index: {index.stats()} from {len(message_ids)} received messages in {time.perf_counter() - started:.2f}s")
+        return index
+    
+    def has_replies(self, thread_id: str, original_message_id: str, history_id: str = None) -> Tuple[bool, int]:
         """
         Verifica si un mensaje tiene respuestas
         Retorna (has_replies, reply_count)
         """
-        thread_messages = self.get_thread_messages(thread_id)
-        
+        return self._count_replies(self.get_thread_summary(thread_id, history_id), original_message_id)
+    
+    def _count_replies(self, thread_messages: List[Dict], original_message_id: str) -> Tuple[bool, int]:
+        """
+        Counts the messages of a thread that come after the original one.
+        Our own follow-ups are not replies, so sending one doesn't close
+        the email. Full scans, incremental syncs and the pending refresh
+        all count through here, with the rule ReplyIndex uses.
+        """
         if len(thread_messages) <= 1:
             return False, 0
         
@@ -341,16 +660,73 @@ class GmailService:
             return False, 0
         
         # Contar respuestas posteriores al mensaje original
-        replies_count = len(thread_messages) - original_index - 1
+        own_addresses = [self.get_own_address()]
+        replies_count = sum(
+            1 for msg in thread_messages[original_index + 1:]
+            if not is_own_message(msg, own_addresses)
+        )
         return replies_count > 0, replies_count
     
     def analyze_sent_emails(self, 
                            days_back: int = 30,
                            keywords: str = "",
                            exclude_automated: bool = True,
-                           max_results: int = 200) -> pd.DataFrame:
+                           max_results: int = 200,
+                           fetch_mode: str = 'batch',
+                           batch_size: int = 50,
+                           workers: int = 8,
+                           tiered: bool = False,
+                           reply_detection: str = 'threads') -> pd.DataFrame:
+        """
+        Analiza correos enviados para encontrar los que necesitan seguimiento.
+        fetch_mode picks how message and thread details are downloaded:
+        'batch' groups batch_size calls per batch request, 'concurrent' runs
+        them over a pool of workers threads and 'serial' does one call at a time.
+        With tiered, messages are first fetched as metadata and bodies are
+        only downloaded when subject and snippet can't settle the priority.
+        With reply_detection='headers' no thread is downloaded: replies come
+        from a ReplyIndex of the messages received in the window.
         """
-        Analiza correos enviados para encontrar los que necesitan seguimiento
+        query = self._build_sent_query(days_back, keywords, exclude_automated)
+        
+        self.reporter.info(f"Searching with query: {query}")
+        
+        try:
+            reply_index = self._reply_index_for(reply_detection, days_back, batch_size)
+        except Exception as e:
+            self.reporter.error(f"Error searching messages: {e}")
+            return pd.DataFrame()
+        
+        # Search pages are listed on a producer thread (with its own HTTP
+        # client) while details of the pages already listed are fetched
+        pages = self._prefetch_pages(self.iter_message_pages(
+            query=query,
+            max_results=max_results,
+            http=self._new_http()
+        ))
+        
+        try:
+            return self._analyze_pages(pages, query, keywords, fetch_mode, batch_size, workers, tiered, reply_index)
+        except Exception as e:
+            self.reporter.error(f"Error searching messages: {e}")
+            return pd.DataFrame()
+    
+    def _reply_index_for(self, reply_detection: str, days_back: int, batch_size: int) -> Optional[ReplyIndex]:
+        """The ReplyIndex of the window in 'headers' mode, None when threads are downloaded"""
+        if reply_detection not in self.REPLY_DETECTION_MODES:
+            raise ValueError(f"Unknown reply detection mode: {reply_detection}")
+        if reply_detection == 'threads':
+            return None
+        return self.build_reply_index(days_back, batch_size)
+    
+    def _build_sent_query(self,
+                          days_back: int,
+                          keywords: str = "",
+                          exclude_automated: bool = True,
+                          open_ended: bool = False) -> str:
+        """
+        Builds the Gmail search query for sent emails.
+        With open_ended the query has no before: bound, so it also covers today.
         """
         # Construir query de búsqueda
         end_date = datetime.now()
@@ -358,9 +734,10 @@ class GmailService:
         
         query_parts = [
             'in:sent',
-            f'after:{start_date.strftime("%Y/%m/%d")}',
-            f'before:{end_date.strftime("%Y/%m/%d")}'
+            f'after:{start_date.strftime("%Y/%m/%d")}'
         ]
+        if not open_ended:
+            query_parts.append(f'before:{end_date.strftime("%Y/%m/%d")}')
         
         if keywords:
             # Separar keywords por OR
@@ -380,69 +757,444 @@ class GmailService:
             ]
             query_parts.extend(automated_patterns)
         
-        query = ' '.join(query_parts)
+        return ' '.join(query_parts)
+    
+    def _analyze_messages(self,
+                          messages: List[Dict],
+                          query: str,
+                          keywords: str,
+                          fetch_mode: str,
+                          batch_size: int,
+                          workers: int,
+                          tiered: bool = False,
+                          reply_index: ReplyIndex = None) -> pd.DataFrame:
+        """Builds the tracking DataFrame of a list of {'id', 'threadId'} messages"""
+        return self._analyze_pages([messages], query, keywords, fetch_mode, batch_size, workers, tiered, reply_index)
+    
+    def _analyze_pages(self,
+                       pages: Iterable[List[Dict]],
+                       query: str,
+                       keywords: str,
+                       fetch_mode: str,
+                       batch_size: int,
+                       workers: int,
+                       tiered: bool = False,
+                       reply_index: ReplyIndex = None) -> pd.DataFrame:
+        """
+        Builds the tracking DataFrame of pages of {'id', 'threadId'} messages,
+        one page at a time. Replies are counted from reply_index when given
+        (from the threads of the emails it doesn't cover), otherwise from
+        the threads.
+        """
+        import time
+        
+        if fetch_mode not in self.FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {fetch_mode}")
         
-        st.info(f"Searching with query: {query}")
+        started = time.perf_counter()
+        history_lookup = self._thread_history_lookup(query)
+        message_format = 'metadata' if tiered else 'full'
+        self._bodies_fetched = 0
+        total = 0
+        email_data = []
         
-        # Search for messages
-        messages = self.search_messages(query=query, max_results=max_results)
+        for messages in pages:
+            if not messages:
+                continue
+            total += len(messages)
+            
+            # Group messages by thread so each thread is only checked once, and
+            # validate cached threads against their current historyId
+            thread_ids = list(dict.fromkeys(msg['threadId'] for msg in messages))
+            history_ids = {}
+            if (reply_index is None or reply_index.complete_since is not None) and self.thread_cache.contains_any(thread_ids):
+                history_ids = history_lookup(thread_ids)
+            
+            if fetch_mode == 'batch':
+                email_data += self._process_messages_batch(messages, keywords, batch_size, history_ids, message_format, reply_index)
+            elif fetch_mode == 'concurrent':
+                email_data += self._process_messages_concurrent(messages, keywords, workers, history_ids, message_format, reply_index)
+            else:
+                email_data += self._process_messages_serial(messages, keywords, history_ids, message_format, reply_index)
         
-        if not messages:
+        if total == 0:
             return pd.DataFrame()
         
-        # Procesar cada mensaje
+        elapsed = time.perf_counter() - started
+        self.last_scan_stats = {
+            'mode': fetch_mode + (' tiered' if tiered else ''),
+            'reply_detection': 'threads' if reply_index is None else 'headers',
+            'messages': total,
+            'bodies_fetched': self._bodies_fetched if tiered else total,
+            'seconds': round(elapsed, 2),
+            'messages_per_sec': round(total / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        print(f"Scan stats: {self.last_scan_stats}")
+        print(f"Thread cache: {self.thread_cache.stats()}")
+        
+        if email_data:
+            df = pd.DataFrame(email_data)
+            # Ordenar por fecha (más recientes primero)
+            df = df.sort_values('date_sent', ascending=False).reset_index(drop=True)
+            return df
+        
+        return pd.DataFrame()
+    
+    def get_current_history_id(self) -> Optional[str]:
+        """Gets the latest historyId of the mailbox"""
+        try:
+            profile = self.api.run(self.service.users().getProfile(userId='me'))
+            return profile.get('historyId')
+        except Exception as e:
+            print(f"Could not get mailbox history id: {e}")
+            return None
+    
+    def list_history_changes(self, start_history_id: str) -> Optional[Dict]:
+        """
+        Lists the messages added and the label changes since a historyId.
+        Returns None when the historyId is too old and a full scan is needed.
+        """
+        params = {
+            'userId': 'me',
+            'startHistoryId': start_history_id,
+            'historyTypes': ['messageAdded', 'labelAdded', 'labelRemoved'],
+            'maxResults': 500
+        }
+        changes = {'added': {}, 'label_changes': {}, 'history_id': start_history_id}
+        
+        try:
+            while True:
+                result = self.api.run(self.service.users().history().list(**params))
+                
+                for record in result.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        changes['added'][message['id']] = message
+                    for key in ('labelsAdded', 'labelsRemoved'):
+                        for item in record.get(key, []):
+                            message = item['message']
+                            changes['label_changes'][message['id']] = message.get('labelIds', [])
+                
+                changes['history_id'] = result.get('historyId', changes['history_id'])
+                if 'nextPageToken' not in result:
+                    break
+                params['pageToken'] = result['nextPageToken']
+                
+        except HttpError as e:
+            if e.resp.status == 404:
+                # The start historyId is no longer available
+                return None
+            raise
+        
+        return changes
+    
+    def incremental_sync(self,
+                         existing_df: pd.DataFrame,
+                         sync_state: Dict,
+                         days_back: int = 30,
+                         keywords: str = "",
+                         exclude_automated: bool = True,
+                         max_results: int = 200,
+                         batch_size: int = 50,
+                         force_full: bool = False,
+                         fetch_mode: str = 'batch',
+                         workers: int = 8,
+                         tiered: bool = False,
+                         reply_detection: str = 'threads',
+                         allow_full_scan: bool = True) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Updates the tracked emails with only what changed since the last sync.
+        Uses users.history.list from the stored historyId to find new sent
+        messages, threads that received messages and label changes. Falls back
+        to a full scan when there is no stored historyId, it has expired or
+        force_full is set. Returns the updated DataFrame and the new sync state.
+        Without allow_full_scan an unusable history returns existing_df
+        unchanged with mode 'expired' instead of scanning.
+        """
+        start_history_id = sync_state.get('history_id')
+        changes = None
+        if start_history_id and not existing_df.empty and not force_full:
+            try:
+                changes = self.list_history_changes(start_history_id)
+            except Exception as e:
+                print(f"Error listing history changes: {e}")
+            if changes is None and allow_full_scan:
+                self.reporter.info("Sync history expired, running a full scan")
+        
+        if changes is None and not allow_full_scan and not force_full:
+            self.last_sync_changes = {}
+            return existing_df, {**sync_state, 'mode': 'expired'}
+        
+        if changes is None:
+            # Take the historyId before scanning so nothing in between is missed
+            history_id = self.get_current_history_id()
+            df = self.analyze_sent_emails(
+                days_back=days_back,
+                keywords=keywords,
+                exclude_automated=exclude_automated,
+                max_results=max_results,
+                fetch_mode=fetch_mode,
+                batch_size=batch_size,
+                workers=workers,
+                tiered=tiered,
+                reply_detection=reply_detection
+            )
+            self.last_sync_changes = {'scanned': len(df)}
+            return df, self._build_sync_state(history_id or start_history_id, 'full')
+        
+        df = existing_df.copy()
+        tracked_ids = set(df['id'])
+        added = changes['added']
+        
+        # Label changes of tracked messages
+        for message_id, labels in changes['label_changes'].items():
+            if message_id in tracked_ids:
+                df.loc[df['id'] == message_id, 'labels'] = ', '.join(labels)
+            if self.message_cache is not None and message_id in self.message_cache:
+                self.message_cache.update_labels(message_id, labels)
+        
+        # Tracked threads that received new messages need their replies counted again
+        touched_threads = {message['threadId'] for message in added.values()} & set(df['thread_id'])
+        if touched_threads:
+            for thread_id in touched_threads:
+                self.thread_cache.invalidate(thread_id)
+            threads_by_id = self.get_threads_batch(list(touched_threads), batch_size)
+            
+            for idx in df.index[df['thread_id'].isin(touched_threads)]:
+                thread_messages = threads_by_id.get(df.at[idx, 'thread_id'])
+                if thread_messages is None:
+                    continue
+                has_reply, reply_count = self._count_replies(thread_messages, df.at[idx, 'id'])
+                df.at[idx, 'has_reply'] = has_reply
+                df.at[idx, 'reply_count'] = reply_count
+        
+        # New sent messages, kept only when they match the search criteria
+        new_sent = {
+            message_id: message for message_id, message in added.items()
+            if 'SENT' in message.get('labelIds', []) and message_id not in tracked_ids
+        }
+        if new_sent:
+            last_sync = sync_state.get('last_sync')
+            window_days = days_back
+            if last_sync:
+                window_days = min(days_back, (datetime.now() - datetime.fromisoformat(last_sync)).days + 1)
+            query = self._build_sent_query(window_days, keywords, exclude_automated, open_ended=True)
+            matching = self.search_messages(query=query, max_results=max_results)
+            new_messages = [msg for msg in matching if msg['id'] in new_sent]
+            
+            reply_index = self._reply_index_for(reply_detection, window_days, batch_size) if new_messages else None
+            new_df = self._analyze_messages(new_messages, query, keywords, fetch_mode, batch_size, workers, tiered, reply_index)
+            if not new_df.empty:
+                df = pd.concat([new_df, df], ignore_index=True)
+        
+        self.last_sync_changes = {
+            'new_sent': len(new_sent),
+            'threads_refreshed': len(touched_threads),
+            'label_changes': len(changes['label_changes'])
+        }
+        print(
+            f"Incremental sync: {len(new_sent)} new sent, {len(touched_threads)} threads refreshed, "
+            f"{len(changes['label_changes'])} label changes"
+        )
+        return df, self._build_sync_state(changes['history_id'], 'incremental')
+    
+    def _build_sync_state(self, history_id: Optional[str], mode: str) -> Dict:
+        """Builds the sync state stored after a scan"""
+        return {
+            'history_id': history_id,
+            'last_sync': datetime.now().isoformat(timespec='seconds'),
+            'mode': mode
+        }
+    
+    def _process_messages_serial(self,
+                                 messages: List[Dict],
+                                 keywords: str,
+                                 history_ids: Dict[str, str],
+                                 message_format: str = 'full',
+                                 reply_index: ReplyIndex = None) -> List[Dict]:
+        """Builds the tracking records fetching each message and thread one by one"""
         email_data = []
-        progress_bar = st.progress(0)
+        threads_by_id = {}
+        progress_bar = self.reporter.progress()
         
         for i, msg in enumerate(messages):
             progress_bar.progress((i + 1) / len(messages))
             
-            details = self.get_message_details(msg['id'])
+            details = self.get_message_details(msg['id'], message_format=message_format)
             if not details:
                 continue
+            if self._needs_body(details, keywords):
+                details = self.get_message_details(msg['id']) or details
+                self._bodies_fetched += 1
             
             # Verificar si tiene respuestas
-            has_reply, reply_count = self.has_replies(details['thread_id'], details['id'])
-            
-            # Extraer información del destinatario
-            to_emails = self._extract_emails(details['to'])
+            if self._counted_by_index(details, reply_index):
+                has_reply, reply_count = reply_index.count_replies(details['message_id_header'])
+            else:
+                thread_id = details['thread_id']
+                if thread_id not in threads_by_id:
+                    threads_by_id[thread_id] = self.get_thread_summary(thread_id, history_ids.get(thread_id))
+                has_reply, reply_count = self._count_replies(threads_by_id[thread_id], details['id'])
+            email_data.append(self._build_email_record(details, has_reply, reply_count, keywords))
+        
+        progress_bar.empty()
+        return email_data
+    
+    def _process_messages_concurrent(self,
+                                     messages: List[Dict],
+                                     keywords: str,
+                                     workers: int,
+                                     history_ids: Dict[str, str],
+                                     message_format: str = 'full',
+                                     reply_index: ReplyIndex = None) -> List[Dict]:
+        """
+        Builds the tracking records fanning message and thread fetches out
+        over a bounded pool of worker threads. Results keep the input order.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        workers = max(1, workers)
+        progress_bar = self.reporter.progress()
+        # Errors of the workers, reported from this thread once they are done
+        errors = []
+        
+        def fetch_details(message_id, fmt=message_format):
+            return self.get_message_details(message_id, http=self._thread_http(), message_format=fmt, errors=errors)
+        
+        def fetch_thread(thread_id):
+            return self.get_thread_summary(thread_id, history_ids.get(thread_id), http=self._thread_http(), errors=errors)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gmail-fetch') as pool:
+            # Progress is reported from this thread: Streamlit elements can't
+            # be updated from the workers
+            futures = {pool.submit(fetch_details, msg['id']): i for i, msg in enumerate(messages)}
+            details_list = [None] * len(messages)
+            for done, future in enumerate(as_completed(futures), start=1):
+                details_list[futures[future]] = future.result()
+                progress_bar.progress(done / len(messages) * 0.5)
             
-            email_record = {
-                'id': details['id'],
-                'thread_id': details['thread_id'],
-                'subject': details['subject'],
-                'to': details['to'],
-                'to_emails': ', '.join(to_emails),
-                'date_sent': details['date'] or details['internal_date'],
-                'snippet': details['snippet'],
-                'has_reply': has_reply if has_reply is not None else False,
-                'reply_count': reply_count if reply_count is not None else 0,
-                'status': 'Closed' if has_reply else 'Pending',
-                'priority': self._calculate_priority(details, keywords) or 'Low',
-                'days_since_sent': self._calculate_days_since(details['date'] or details['internal_date']),
-                'body_preview': details['body'][:200] + '...' if len(details['body']) > 200 else details['body'],
-                'labels': ', '.join(details['labels']),
-                'notes': '',
-                'follow_up_date': None,
-                'created_reminder': False,
-                'calendar_event_id': None,
-                'follow_up_count': 0,
-                'final_outcome': None,
-                'last_updated': datetime.now(),
-          
+            # Second tier: bodies of the messages whose priority is still open
+            futures = {
+                pool.submit(fetch_details, details['id'], 'full'): i
+                for i, details in enumerate(details_list) if details and self._needs_body(details, keywords)
             }
+            for future in as_completed(futures):
+                details_list[futures[future]] = future.result() or details_list[futures[future]]
+            self._bodies_fetched += len(futures)
             
-            email_data.append(email_record)
+            thread_ids = list(dict.fromkeys(
+                details['thread_id'] for details in details_list
+                if details and not self._counted_by_index(details, reply_index)
+            ))
+            futures = {pool.submit(fetch_thread, thread_id): thread_id for thread_id in thread_ids}
+            threads_by_id = {}
+            for done, future in enumerate(as_completed(futures), start=1):
+                threads_by_id[futures[future]] = future.result()
+                progress_bar.progress(0.5 + done / len(thread_ids) * 0.5)
+        
+        for message in errors:
+            self.reporter.error(message)
+        
+        email_data = []
+        for details in details_list:
+            if not details:
+                continue
+            if self._counted_by_index(details, reply_index):
+                has_reply, reply_count = reply_index.count_replies(details['message_id_header'])
+            else:
+                has_reply, reply_count = self._count_replies(threads_by_id.get(details['thread_id'], []), details['id'])
+            email_data.append(self._build_email_record(details, has_reply, reply_count, keywords))
         
         progress_bar.empty()
+        return email_data
+    
+    def _process_messages_batch(self,
+                                messages: List[Dict],
+                                keywords: str,
+                                batch_size: int,
+                                history_ids: Dict[str, str],
+                                message_format: str = 'full',
+                                reply_index: ReplyIndex = None) -> List[Dict]:
+        """Builds the tracking records fetching messages and threads in batches"""
+        progress_bar = self.reporter.progress()
         
-        if email_data:
-            df = pd.DataFrame(email_data)
-            # Ordenar por fecha (más recientes primero)
-            df = df.sort_values('date_sent', ascending=False).reset_index(drop=True)
-            return df
+        # First half of the bar for messages, second half for threads
+        details_by_id = self.get_messages_batch(
+            [msg['id'] for msg in messages],
+            batch_size,
+            progress_callback=lambda done, total: progress_bar.progress(min(1.0, done / total) * 0.5),
+            message_format=message_format
+        )
         
-        return pd.DataFrame()
+        # Second tier: bodies of the messages whose priority is still open
+        undecided = [mid for mid, details in details_by_id.items() if self._needs_body(details, keywords)]
+        if undecided:
+            details_by_id.update(self.get_messages_batch(undecided, batch_size))
+            self._bodies_fetched += len(undecided)
+        
+        # Threads are only downloaded for the emails the reply index doesn't cover
+        thread_ids = [
+            details['thread_id'] for details in details_by_id.values()
+            if not self._counted_by_index(details, reply_index)
+        ]
+        threads_by_id = self.get_threads_batch(
+            thread_ids,
+            batch_size,
+            history_ids=history_ids,
+            progress_callback=lambda done, total: progress_bar.progress(0.5 + min(1.0, done / total) * 0.5)
+        )
+        
+        email_data = []
+        for msg in messages:
+            details = details_by_id.get(msg['id'])
+            if not details:
+                continue
+            
+            if self._counted_by_index(details, reply_index):
+                has_reply, reply_count = reply_index.count_replies(details['message_id_header'])
+            else:
+                has_reply, reply_count = self._count_replies(threads_by_id.get(details['thread_id'], []), details['id'])
+            email_data.append(self._build_email_record(details, has_reply, reply_count, keywords))
+        
+        progress_bar.empty()
+        return email_data
+    
+    def _counted_by_index(self, details: Dict, reply_index: Optional[ReplyIndex]) -> bool:
+        """Whether the replies of a sent message come from reply_index instead of its thread"""
+        return reply_index is not None and reply_index.covers(details['internal_date'])
+    
+    def _build_email_record(self, details: Dict, has_reply: bool, reply_count: int, keywords: str) -> Dict:
+        """Builds the tracking record of a sent message"""
+        # Extraer información del destinatario
+        to_emails = self._extract_emails(details['to'])
+        # Metadata-only messages preview their snippet instead of the body
+        body = details['body'] if details.get('body') is not None else details['snippet']
+        keyword_score = self._keyword_score(details, keywords)
+        
+        return {
+            'id': details['id'],
+            'thread_id': details['thread_id'],
+            'subject': details['subject'],
+            'to': details['to'],
+            'to_emails': ', '.join(to_emails),
+            'date_sent': details['date'] or details['internal_date'],
+            'snippet': details['snippet'],
+            'has_reply': has_reply if has_reply is not None else False,
+            'reply_count': reply_count if reply_count is not None else 0,
+            'status': 'Closed' if has_reply else 'Pending',
+            'priority': priority_tier(keyword_score + self._age_points(details)),
+            # Kept so the age bonus can be recomputed whenever the data is loaded
+            'keyword_score': keyword_score,
+            'body_preview': body[:200] + '...' if len(body) > 200 else body,
+            'labels': ', '.join(details['labels']),
+            'notes': '',
+            'follow_up_date': None,
+            'created_reminder': False,
+            'calendar_event_id': None,
+            'follow_up_count': 0,
+            'final_outcome': None,
+            'last_updated': datetime.now(),
+        }
     
     def _extract_emails(self, email_field: str) -> List[str]:
         """Extrae direcciones de email de un campo"""
@@ -454,59 +1206,30 @@ class GmailService:
         emails = re.findall(email_pattern, email_field)
         return list(set(emails))  # Remover duplicados
     
-    def _calculate_priority(self, message_details: Dict, keywords: str) -> str:
-        """Calcula la prioridad del seguimiento basado en diversos factores"""
-        priority_score = 0
-        
-        # Palabras clave de alta prioridad
-        high_priority_words = ['interview', 'urgent', 'important', 'deadline', 'proposal']
-        medium_priority_words = ['follow up', 'follow-up', 'checking in', 'update']
-        
-        subject_lower = message_details['subject'].lower()
-        body_lower = message_details['body'].lower()
-        
-        # Verificar palabras de alta prioridad
-        for word in high_priority_words:
-            if word in subject_lower or word in body_lower:
-                priority_score += 3
-        
-        # Verificar palabras de prioridad media
-        for word in medium_priority_words:
-            if word in subject_lower or word in body_lower:
-                priority_score += 2
+    def _age_points(self, message_details: Dict) -> int:
+        """Priority points given by the days since the email was sent"""
+        return age_points(days_since(message_details['date'] or message_details['internal_date']))
+    
+    def _keyword_score(self, message_details: Dict, keywords: str) -> int:
+        """Priority points of the keywords in the subject and body"""
+        # Without a body, the snippet (its beginning) is the best text there is
+        body = message_details['body'] if message_details.get('body') is not None else message_details.get('snippet', '')
+        return get_matcher(keywords).keyword_score(f"{message_details['subject']}\n{body}".lower())
+    
+    
+    def _needs_body(self, message_details: Dict, keywords: str) -> bool:
+        """
+        Tells whether a metadata-only message needs its body to settle its
+        priority: the words found in subject and snippet give the lowest
+        possible score, and adding every word still missing gives the
+        highest one. If both land on the same tier the body can't change it.
+        """
+        if message_details.get('body') is not None:
+            return False
+        if len(message_details.get('snippet', '')) < self.SNIPPET_COMPLETE_CHARS:
+            return False
         
-        # Verificar keywords del usuario
-        if keywords:
-            user_keywords = [kw.strip().lower() for kw in keywords.split(',')]
-            for keyword in user_keywords:
-                if keyword in subject_lower or keyword in body_lower:
-                    priority_score += 1
-        
-        # Calcular días desde el envío
-        days_ago = self._safe_calculate_days(message_details['date'] or message_details['internal_date'])
-        
-        if days_ago > 7:
-            priority_score += 2
-        elif days_ago > 3:
-            priority_score += 1
-        
-        # Determinar prioridad final con validación
-        if priority_score >= 5:
-            return 'High'
-        elif priority_score >= 3:
-            return 'Medium'
-        else:
-            return 'Low'
-    def _calculate_days_since(self, date_obj):
-        """Calcula días manejando timezone"""
-        if date_obj is None:
-            return 0
-        try:
-            now = datetime.now()
-            if hasattr(date_obj, 'tzinfo') and date_obj.tzinfo:
-                date_obj = date_obj.replace(tzinfo=None)
-            if hasattr(now, 'tzinfo') and now.tzinfo:
-                now = now.replace(tzinfo=None)
-            return max(0, (now - date_obj).days)
-        except:
-            return 0
\ No newline at end of file
+        known_text = f"{message_details['subject']}\n{message_details.get('snippet', '')}".lower()
+        lowest, highest = get_matcher(keywords).score_bounds(known_text)
+        age = self._age_points(message_details)
+        return priority_tier(lowest + age) != priority_tier(highest + age)
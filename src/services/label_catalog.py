@@ -0,0 +1,91 @@
+# src/services/label_catalog.py
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+
+class LabelCatalog:
+    """
+    Gmail labels cached in memory and in a JSON file, reused for
+    ttl_seconds so the label list is fetched at most once per TTL window
+    by every session of the process (and across restarts). Lookups by
+    name and id go through dict indexes.
+    """
+
+    def __init__(self, catalog_file: Path, ttl_seconds: float = 3600):
+        self.catalog_file = catalog_file
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._labels = []
+        self._by_name = {}
+        self._by_id = {}
+        self.fetched_at = 0.0
+        self._load()
+
+    def get_labels(self, fetch: Callable[[], Optional[List[Dict]]], refresh: bool = False) -> List[Dict]:
+        """
+        Returns the labels sorted by name. fetch (a labels.list call
+        returning None on failure) only runs when the catalog is expired,
+        empty or refresh is requested; on failure the old catalog is kept.
+        """
+        with self._lock:
+            if not refresh and self._labels and not self.is_expired():
+                return list(self._labels)
+
+            labels = fetch()
+            if labels is not None:
+                self._set_labels(labels, time.time())
+                self._save()
+            return list(self._labels)
+
+    def label_id(self, name: str) -> Optional[str]:
+        """Id of a label by its name"""
+        with self._lock:
+            return self._by_name.get(name)
+
+    def label_name(self, label_id: str) -> Optional[str]:
+        """Name of a label by its id"""
+        with self._lock:
+            return self._by_id.get(label_id)
+
+    def name_to_id(self) -> Dict[str, str]:
+        """The whole name -> id index, in label name order"""
+        with self._lock:
+            return dict(self._by_name)
+
+    def is_expired(self) -> bool:
+        return time.time() - self.fetched_at >= self.ttl_seconds
+
+    def age_seconds(self) -> float:
+        return time.time() - self.fetched_at if self.fetched_at else float('inf')
+
+    def _set_labels(self, labels: List[Dict], fetched_at: float):
+        """Replaces the catalog and its indexes (lock must be held)"""
+        self._labels = sorted(labels, key=lambda x: x['name'])
+        self._by_name = {label['name']: label['id'] for label in self._labels}
+        self._by_id = {label['id']: label['name'] for label in self._labels}
+        self.fetched_at = fetched_at
+
+    def _load(self):
+        if not self.catalog_file.exists():
+            return
+        try:
+            with open(self.catalog_file, 'r') as f:
+                data = json.load(f)
+            self._set_labels(data['labels'], data['fetched_at'])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable label catalog {self.catalog_file.name}: {e}")
+
+    def _save(self):
+        """Writes the catalog atomically (lock must be held)"""
+        try:
+            self.catalog_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.catalog_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({'fetched_at': self.fetched_at, 'labels': self._labels}, f)
+            os.replace(tmp_file, self.catalog_file)
+        except OSError as e:
+            print(f"Could not save label catalog: {e}")
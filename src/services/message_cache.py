@@ -0,0 +1,120 @@
+# src/services/message_cache.py
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class MessageCache:
+    """Persistent SQLite cache of parsed Gmail messages, keyed by message id"""
+
+    # Fields of a parsed message stored as ISO strings
+    DATETIME_FIELDS = ('internal_date', 'date')
+    # SQLite limits the number of parameters of a single query
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                thread_id TEXT,
+                data TEXT NOT NULL,
+                cached_at TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # Known ids are kept in memory so splitting a search result is free
+        self.known_ids = {row[0] for row in self._conn.execute('SELECT id FROM messages')}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self.known_ids
+
+    def split_known(self, message_ids: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Splits message ids into (cached, new)"""
+        cached, new = [], []
+        for message_id in message_ids:
+            (cached if message_id in self.known_ids else new).append(message_id)
+        return cached, new
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        """Returns a cached message or None"""
+        return self.get_many([message_id]).get(message_id)
+
+    def get_many(self, message_ids: List[str]) -> Dict[str, Dict]:
+        """Returns the cached messages among the given ids"""
+        wanted = [message_id for message_id in message_ids if message_id in self.known_ids]
+        messages = {}
+
+        with self._lock:
+            for start in range(0, len(wanted), self.QUERY_CHUNK_SIZE):
+                chunk = wanted[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT id, data FROM messages WHERE id IN ({placeholders})', chunk
+                )
+                for message_id, data in rows:
+                    messages[message_id] = self._decode(data)
+
+            self.hits += len(messages)
+            self.misses += len(message_ids) - len(messages)
+
+        return messages
+
+    def put(self, message: Dict):
+        """Stores a parsed message"""
+        self.put_many([message])
+
+    def put_many(self, messages: Iterable[Dict]):
+        """Stores several parsed messages in one transaction"""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(message['id'], message.get('thread_id'), self._encode(message), now) for message in messages]
+        if not rows:
+            return
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO messages (id, thread_id, data, cached_at) VALUES (?, ?, ?, ?)', rows
+                )
+            self.known_ids.update(row[0] for row in rows)
+
+    def update_labels(self, message_id: str, labels: List[str]):
+        """Updates the labels of a cached message, the only part of it that changes"""
+        message = self.get(message_id)
+        if message is not None:
+            message['labels'] = labels
+            self.put(message)
+
+    def stats(self) -> Dict:
+        """Returns usage counters of the cache"""
+        return {
+            'messages': len(self.known_ids),
+            'hits': self.hits,
+            'misses': self.misses,
+            'size_mb': round(self.db_path.stat().st_size / (1024 * 1024), 2) if self.db_path.exists() else 0
+        }
+
+    def _encode(self, message: Dict) -> str:
+        """Serializes a parsed message to JSON"""
+        data = dict(message)
+        for field in self.DATETIME_FIELDS:
+            if isinstance(data.get(field), datetime):
+                data[field] = data[field].isoformat()
+        return json.dumps(data)
+
+    def _decode(self, data: str) -> Dict:
+        """Restores a parsed message from JSON"""
+        message = json.loads(data)
+        for field in self.DATETIME_FIELDS:
+            if message.get(field):
+                message[field] = datetime.fromisoformat(message[field])
+        return message
@@ -0,0 +1,139 @@
+# src/services/priority.py
+from datetime import datetime
+from functools import lru_cache
+from typing import Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Palabras clave de alta y media prioridad
+HIGH_PRIORITY_WORDS = ['interview', 'urgent', 'important', 'deadline', 'proposal']
+MEDIUM_PRIORITY_WORDS = ['follow up', 'follow-up', 'checking in', 'update']
+
+
+def priority_tier(priority_score: int) -> str:
+    """Determinar prioridad final"""
+    if priority_score >= 5:
+        return 'High'
+    elif priority_score >= 3:
+        return 'Medium'
+    else:
+        return 'Low'
+
+
+def age_points(days_ago: int) -> int:
+    """Priority points given by the days since the email was sent"""
+    if days_ago > 7:
+        return 2
+    elif days_ago > 3:
+        return 1
+    return 0
+
+
+def days_since(date_obj: datetime) -> int:
+    """Calendar days since a datetime, compared in its own timezone"""
+    if date_obj is None:
+        return 0
+    try:
+        now = datetime.now(date_obj.tzinfo) if date_obj.tzinfo is not None else datetime.now()
+        return max(0, (now.date() - date_obj.date()).days)
+    except (TypeError, AttributeError):
+        return 0
+
+
+def priority_tiers(scores: np.ndarray) -> np.ndarray:
+    """Vectorized priority_tier"""
+    return np.select([scores >= 5, scores >= 3], ['High', 'Medium'], 'Low')
+
+
+def age_points_array(days: np.ndarray) -> np.ndarray:
+    """Vectorized age_points"""
+    return np.select([days > 7, days > 3], [2, 1], 0)
+
+
+class PriorityMatcher:
+    """
+    Scores text against the high, medium and user keyword sets of one
+    keyword configuration. The sets are merged once into a table of
+    distinct words and points, ordered longest first with a containment
+    closure: once a word is found, the words it contains are known to be
+    present without searching for them. Each remaining word is one C-level
+    substring search (faster in CPython than a regex alternation, which
+    tries every position of the text).
+    """
+
+    def __init__(self, keywords: str = ""):
+        # A word listed in several sets (or twice) scores each time, as before
+        self.points = {}
+        for word in HIGH_PRIORITY_WORDS:
+            self.points[word] = self.points.get(word, 0) + 3
+        for word in MEDIUM_PRIORITY_WORDS:
+            self.points[word] = self.points.get(word, 0) + 2
+        if keywords:
+            for keyword in keywords.split(','):
+                word = keyword.strip().lower()
+                self.points[word] = self.points.get(word, 0) + 1
+
+        # An empty keyword is in every text
+        self.base_points = self.points.pop('', 0)
+        self.total_points = self.base_points + sum(self.points.values())
+
+        self.words = sorted(self.points, key=len, reverse=True)
+        # word -> longer words containing it
+        self.containers = {
+            word: [other for other in self.words if len(other) > len(word) and word in other]
+            for word in self.words
+        }
+        # word -> shorter words it contains
+        self.contained = {
+            word: [other for other in self.words if len(other) < len(word) and other in word]
+            for word in self.words
+        }
+
+    def matched_words(self, text: str) -> Set[str]:
+        """Keywords present in a lowercase text"""
+        found = set()
+        for word in self.words:
+            if word in found:
+                continue
+            if word in text:
+                found.add(word)
+                found.update(self.contained[word])
+        return found
+
+    def keyword_score(self, text: str) -> int:
+        """Points of the keywords present in a lowercase text"""
+        return self.base_points + sum(self.points[word] for word in self.matched_words(text))
+
+    def score_bounds(self, known_text: str) -> Tuple[int, int]:
+        """
+        Lowest and highest keyword score of a text of which only part is
+        known: the words found count in both, the missing ones only in the
+        highest.
+        """
+        return self.keyword_score(known_text), self.total_points
+
+    def score_series(self, text: pd.Series) -> pd.Series:
+        """Vectorized keyword score of a Series of lowercase texts"""
+        texts = text.fillna('').astype(str).tolist()
+        score = np.full(len(texts), self.base_points, dtype='int64')
+        present = {}
+        for word in self.words:
+            # Rows holding a longer word that contains this one need no search
+            known = np.zeros(len(texts), dtype=bool)
+            for container in self.containers[word]:
+                known |= present[container]
+            if known.any():
+                found = np.fromiter((k or word in t for k, t in zip(known.tolist(), texts)), dtype=bool, count=len(texts))
+            else:
+                found = np.fromiter((word in t for t in texts), dtype=bool, count=len(texts))
+            present[word] = found
+            score += found * self.points[word]
+
+        return pd.Series(score, index=text.index)
+
+
+@lru_cache(maxsize=32)
+def get_matcher(keywords: str = "") -> PriorityMatcher:
+    """Matcher of a keyword configuration, built once"""
+    return PriorityMatcher(keywords or "")
@@ -0,0 +1,80 @@
+# src/services/reply_index.py
+import re
+from datetime import datetime
+from email.utils import parseaddr
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# A Message-ID as it appears in Message-ID, In-Reply-To and References
+MESSAGE_ID_PATTERN = re.compile(r'<[^<>\s]+>')
+
+
+def is_own_message(message: Dict, own_addresses: Iterable[str] = ()) -> bool:
+    """
+    Whether a message was sent by us (labelled SENT or from one of our
+    addresses); the same rule for every reply count, so headers and
+    threads detection agree on what a reply is
+    """
+    if 'SENT' in (message.get('labels') or []):
+        return True
+    sender = parseaddr(message.get('from') or '')[1].lower()
+    return bool(sender) and sender in {address.lower() for address in own_addresses if address}
+
+
+class ReplyIndex:
+    """
+    Replies found by joining headers instead of downloading threads.
+    Every received message is indexed under the Message-IDs its
+    In-Reply-To and References headers point to, so the replies to a sent
+    email are a dictionary lookup of its own Message-ID. A reply further
+    down the conversation references the whole chain and counts too.
+    Messages from our own addresses (or labelled SENT) are left out, so
+    our own follow-ups are not counted as replies.
+    """
+
+    def __init__(self, own_addresses: Iterable[str] = ()):
+        self.own_addresses = {address.lower() for address in own_addresses if address}
+        # Referenced Message-ID -> ids of the received messages referencing it
+        self._replies: Dict[str, Set[str]] = {}
+        self.indexed = 0
+        self.skipped_own = 0
+        # None when every received message of the window was indexed;
+        # otherwise only the replies received from this date on are
+        self.complete_since: Optional[datetime] = None
+
+    def add(self, message: Dict) -> bool:
+        """Indexes a parsed message (see GmailService._parse_message); False when it is ours"""
+        if is_own_message(message, self.own_addresses):
+            self.skipped_own += 1
+            return False
+
+        referenced = MESSAGE_ID_PATTERN.findall(f"{message.get('in_reply_to') or ''} {message.get('references') or ''}")
+        for message_id in set(referenced):
+            self._replies.setdefault(message_id, set()).add(message['id'])
+        self.indexed += 1
+        return True
+
+    def add_many(self, messages: Iterable[Dict]):
+        for message in messages:
+            self.add(message)
+
+    def covers(self, sent: Optional[datetime]) -> bool:
+        """Whether every reply to an email sent at that date is in the index"""
+        if self.complete_since is None:
+            return True
+        return sent is not None and sent >= self.complete_since
+
+    def count_replies(self, message_id_header: str) -> Tuple[bool, int]:
+        """(has_reply, reply_count) of a sent email, by its Message-ID header"""
+        ids = MESSAGE_ID_PATTERN.findall(message_id_header or '')
+        if not ids:
+            return False, 0
+        count = len(self._replies.get(ids[0], ()))
+        return count > 0, count
+
+    def stats(self) -> Dict:
+        return {
+            'indexed': self.indexed,
+            'skipped_own': self.skipped_own,
+            'referenced_ids': len(self._replies),
+            'complete_since': self.complete_since.isoformat(timespec='seconds') if self.complete_since else None
+        }
@@ -0,0 +1,376 @@
+# src/services/storage.py
+import hashlib
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List
+
+import pandas as pd
+
+from services.analytics_summary import AnalyticsSummary
+
+
+class StorageBackend(ABC):
+    """Persistence of the email tracking table"""
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """Tells whether there is stored data"""
+
+    @abstractmethod
+    def load(self) -> pd.DataFrame:
+        """Loads the whole table"""
+
+    @abstractmethod
+    def get_rows(self, ids: List[str]) -> pd.DataFrame:
+        """Loads only the rows with the given ids"""
+
+    @abstractmethod
+    def save(self, df: pd.DataFrame, touch_column: str = None) -> int:
+        """
+        Replaces the stored table with df. touch_column (if any) is set to the
+        current time on the rows that changed. Returns how many rows were written.
+        """
+
+    @abstractmethod
+    def upsert(self, df: pd.DataFrame, touch_column: str = None) -> int:
+        """Inserts or updates the rows of df, leaving the other ones untouched"""
+
+    @abstractmethod
+    def update_rows(self, updates: Dict[str, Dict]) -> int:
+        """Applies {id: {column: value}} changes to existing rows"""
+
+    @abstractmethod
+    def version(self):
+        """Value that changes whenever the stored table changes, from any process"""
+
+    def summary(self) -> AnalyticsSummary:
+        """Aggregates of the stored table (backends may keep them up to date on writes)"""
+        df = self.load()
+        return AnalyticsSummary.from_records(df.to_dict('records') if not df.empty else [])
+
+
+class ExcelStorage(StorageBackend):
+    """Legacy backend that rewrites an Excel file (and its CSV mirror) on every write"""
+
+    def __init__(self, excel_file: Path):
+        self.excel_file = excel_file
+
+    def exists(self) -> bool:
+        return self.excel_file.exists()
+
+    def load(self) -> pd.DataFrame:
+        if not self.excel_file.exists():
+            return pd.DataFrame()
+        return pd.read_excel(self.excel_file)
+
+    def version(self):
+        if not self.excel_file.exists():
+            return None
+        stat = self.excel_file.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_rows(self, ids: List[str]) -> pd.DataFrame:
+        df = self.load()
+        if df.empty:
+            return df
+        return df[df['id'].isin(ids)].reset_index(drop=True)
+
+    def save(self, df: pd.DataFrame, touch_column: str = None) -> int:
+        if touch_column:
+            df[touch_column] = datetime.now()
+
+        df.to_excel(self.excel_file, index=False)
+        # También guardar en CSV para compatibilidad
+        df.to_csv(self.excel_file.with_suffix('.csv'), index=False)
+        return len(df)
+
+    def upsert(self, df: pd.DataFrame, touch_column: str = None) -> int:
+        existing = self.load()
+        if not existing.empty:
+            existing = existing[~existing['id'].isin(df['id'])]
+            df = pd.concat([existing, df], ignore_index=True)
+        return self.save(df, touch_column)
+
+    def update_rows(self, updates: Dict[str, Dict]) -> int:
+        df = self.load()
+        updated = 0
+        for row_id, changes in updates.items():
+            mask = df['id'] == row_id
+            if not mask.any():
+                continue
+            for col, value in changes.items():
+                # read_excel loads empty columns (e.g. notes) as float64
+                if col not in df.columns:
+                    df[col] = None
+                if df[col].dtype != object:
+                    df[col] = df[col].astype(object)
+                df.loc[mask, col] = value
+            updated += 1
+
+        if updated:
+            self.save(df)
+        return updated
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Transactional backend keeping one row per email in SQLite.
+    Rows are stored as JSON with indexed id, thread_id and status columns and
+    a content hash, so writes only touch the rows that actually changed.
+    The analytics summary is updated with the rows each write replaces, in
+    the same transaction.
+    """
+
+    SUMMARY_NAME = 'analytics'
+    VERSION_NAME = 'version'
+
+    # SQLite limits the number of parameters of a single query
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._create_schema()
+
+    def _create_schema(self):
+        """Creates the table and its indexes if they don't exist"""
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS emails (
+                    id TEXT PRIMARY KEY,
+                    thread_id TEXT,
+                    status TEXT,
+                    data TEXT NOT NULL,
+                    row_hash TEXT NOT NULL
+                )
+            """)
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_emails_thread_id ON emails (thread_id)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_emails_status ON emails (status)')
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS summary (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                )
+            """)
+
+    def exists(self) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM emails LIMIT 1').fetchone() is not None
+
+    def load(self) -> pd.DataFrame:
+        with self._lock:
+            rows = self._conn.execute('SELECT data FROM emails').fetchall()
+        return self._to_dataframe(rows)
+
+    def get_rows(self, ids: List[str]) -> pd.DataFrame:
+        ids = [str(row_id) for row_id in ids]
+        rows = []
+        with self._lock:
+            for start in range(0, len(ids), self.QUERY_CHUNK_SIZE):
+                chunk = ids[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows.extend(self._conn.execute(
+                    f'SELECT data FROM emails WHERE id IN ({placeholders})', chunk
+                ).fetchall())
+        return self._to_dataframe(rows)
+
+    def save(self, df: pd.DataFrame, touch_column: str = None) -> int:
+        return self._write(df, touch_column, delete_missing=True)
+
+    def summary(self) -> AnalyticsSummary:
+        with self._lock:
+            return self._load_summary()
+
+    def version(self):
+        """Write counter stored in the database, so writes of other processes count too"""
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM summary WHERE name = ?', (self.VERSION_NAME,)).fetchone()
+        return int(row[0]) if row is not None else 0
+
+    def upsert(self, df: pd.DataFrame, touch_column: str = None) -> int:
+        return self._write(df, touch_column, delete_missing=False)
+
+    def update_rows(self, updates: Dict[str, Dict]) -> int:
+        updates = {str(row_id): changes for row_id, changes in updates.items()}
+        ids = list(updates)
+        current = {}
+        with self._lock, self._write_transaction():
+            for start in range(0, len(ids), self.QUERY_CHUNK_SIZE):
+                chunk = ids[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                for row_id, data in self._conn.execute(
+                    f'SELECT id, data FROM emails WHERE id IN ({placeholders})', chunk
+                ):
+                    current[row_id] = json.loads(data)
+
+            summary = self._load_summary()
+            rows = []
+            for row_id, record in current.items():
+                summary.remove(record)
+                for col, value in updates[row_id].items():
+                    record[col] = self._to_json_value(value)
+                summary.add(record)
+                data = json.dumps(record)
+                rows.append((row_id, record.get('thread_id'), record.get('status'), data, self._hash(record)))
+
+            self._upsert_rows(rows)
+            if rows:
+                self._store_summary(summary)
+                self._bump_version()
+
+        return len(rows)
+
+    def _write(self, df: pd.DataFrame, touch_column: str, delete_missing: bool) -> int:
+        """Writes only the rows of df whose content differs from the stored one"""
+        records = json.loads(df.to_json(orient='records', date_format='iso')) if not df.empty else []
+        incoming = {}
+        for record in records:
+            record['id'] = str(record['id'])
+            incoming[record['id']] = record
+
+        with self._lock, self._write_transaction():
+            stored_hashes = dict(self._conn.execute('SELECT id, row_hash FROM emails').fetchall())
+            now = self._format_datetime(datetime.now())
+
+            rows = []
+            for row_id, record in incoming.items():
+                row_hash = self._hash(record)
+                if stored_hashes.get(row_id) == row_hash:
+                    continue
+                if touch_column:
+                    record[touch_column] = now
+                rows.append((row_id, record.get('thread_id'), record.get('status'), json.dumps(record), row_hash))
+
+            removed = [row_id for row_id in stored_hashes if row_id not in incoming] if delete_missing else []
+
+            # Only the replaced rows are read back, to take them out of the summary
+            summary = self._load_summary()
+            replaced = [row[0] for row in rows if row[0] in stored_hashes] + removed
+            for record in self._read_records(replaced):
+                summary.remove(record)
+            for row in rows:
+                summary.add(incoming[row[0]])
+
+            self._upsert_rows(rows)
+            for start in range(0, len(removed), self.QUERY_CHUNK_SIZE):
+                chunk = removed[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                self._conn.execute(f'DELETE FROM emails WHERE id IN ({placeholders})', chunk)
+            if rows or removed:
+                self._store_summary(summary)
+                self._bump_version()
+
+        return len(rows) + len(removed)
+
+    @contextmanager
+    def _write_transaction(self):
+        """
+        BEGIN IMMEDIATE takes SQLite's write lock before the stored hashes
+        and the summary are read, so a writer of another process (or
+        another instance) can't change them between the read and the
+        write and lose its summary deltas (lock must be held)
+        """
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def _upsert_rows(self, rows: List[tuple]):
+        """Inserts or replaces (id, thread_id, status, data, row_hash) rows (lock must be held)"""
+        self._conn.executemany("""
+            INSERT INTO emails (id, thread_id, status, data, row_hash) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                thread_id = excluded.thread_id,
+                status = excluded.status,
+                data = excluded.data,
+                row_hash = excluded.row_hash
+        """, rows)
+
+    def _read_records(self, ids: List[str]) -> List[Dict]:
+        """Stored records of some ids (lock must be held)"""
+        records = []
+        for start in range(0, len(ids), self.QUERY_CHUNK_SIZE):
+            chunk = ids[start:start + self.QUERY_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            records.extend(
+                json.loads(data) for (data,) in
+                self._conn.execute(f'SELECT data FROM emails WHERE id IN ({placeholders})', chunk)
+            )
+        return records
+
+    def _load_summary(self) -> AnalyticsSummary:
+        """
+        Reads the stored summary, building it once from every row for
+        databases created before it existed (lock must be held)
+        """
+        row = self._conn.execute('SELECT data FROM summary WHERE name = ?', (self.SUMMARY_NAME,)).fetchone()
+        if row is not None:
+            return AnalyticsSummary(json.loads(row[0]))
+
+        summary = AnalyticsSummary.from_records(
+            json.loads(data) for (data,) in self._conn.execute('SELECT data FROM emails')
+        )
+        if self._conn.in_transaction:
+            # Committed together with the write that asked for it
+            self._store_summary(summary)
+        else:
+            with self._conn:
+                self._store_summary(summary)
+        return summary
+
+    def _store_summary(self, summary: AnalyticsSummary):
+        """Writes the summary (lock must be held, inside the write transaction)"""
+        self._conn.execute("""
+            INSERT INTO summary (name, data) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET data = excluded.data
+        """, (self.SUMMARY_NAME, json.dumps(summary.to_dict())))
+
+    def _bump_version(self):
+        """Increments the write counter (lock must be held, inside the write transaction)"""
+        self._conn.execute("""
+            INSERT INTO summary (name, data) VALUES (?, '1')
+            ON CONFLICT(name) DO UPDATE SET data = CAST(data AS INTEGER) + 1
+        """, (self.VERSION_NAME,))
+
+    def _hash(self, record: Dict) -> str:
+        """Hashes a record ignoring its last_updated timestamp"""
+        content = {}
+        for key, value in record.items():
+            if key == 'last_updated':
+                continue
+            # 1 and 1.0 are the same value, whatever dtype the column had
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            content[key] = value
+        return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _to_json_value(self, value):
+        """Converts a DataFrame cell to a JSON compatible value"""
+        if value is None or (not isinstance(value, (list, dict, str)) and pd.isna(value)):
+            return None
+        if isinstance(value, (datetime, date)):
+            return self._format_datetime(value)
+        if hasattr(value, 'item'):
+            # numpy scalars
+            return value.item()
+        return value
+
+    def _format_datetime(self, value) -> str:
+        """Formats a datetime the same way DataFrame.to_json does"""
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+        return timestamp.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+    def _to_dataframe(self, rows: List[tuple]) -> pd.DataFrame:
+        """Builds a DataFrame from stored JSON rows"""
+        return pd.DataFrame([json.loads(row[0]) for row in rows])
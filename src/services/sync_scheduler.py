@@ -0,0 +1,180 @@
+# src/services/sync_scheduler.py
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+# A sync job returns a short summary of what it did, e.g. {'changed': 3}
+SyncJob = Callable[[], Dict]
+
+
+class SyncScheduler:
+    """
+    Runs a sync job on a daemon thread every interval_seconds, plus a
+    random jitter so several processes or accounts don't hit Gmail at the
+    same time. What happened is published to status_file, which the
+    dashboard (of this or any other process) reads without waiting for
+    a sync.
+    """
+
+    def __init__(self,
+                 job: SyncJob,
+                 status_file: Path,
+                 interval_seconds: float = 900,
+                 jitter_seconds: float = 60,
+                 initial_delay_seconds: float = 5,
+                 name: str = 'sync'):
+        self.job = job
+        self.status_file = status_file
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+        self.initial_delay_seconds = initial_delay_seconds
+        self.name = name
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._status = self.read_status(status_file)
+        self._status.update({'running': False, 'next_run': None})
+
+    def start(self):
+        """Starts the thread; starting twice is a no-op"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=f'{self.name}-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_now(self):
+        """Asks for a sync right away without waiting for it"""
+        self._wake.set()
+
+    def status(self) -> Dict:
+        """Last published status: last_synced, last_attempt, last_error, last_result, next_run, running"""
+        with self._lock:
+            return dict(self._status)
+
+    @staticmethod
+    def read_status(status_file: Path) -> Dict:
+        """Reads the status published by a scheduler (maybe of another process)"""
+        try:
+            with open(status_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _loop(self):
+        delay = self.initial_delay_seconds
+        while not self._stop.is_set():
+            self._publish(next_run=datetime.fromtimestamp(time.time() + delay).isoformat(timespec='seconds'))
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.run_once()
+            delay = self.interval_seconds + random.uniform(0, self.jitter_seconds)
+
+    def run_once(self):
+        """Runs the job now, on the calling thread, and publishes the result"""
+        started = time.perf_counter()
+        self._publish(running=True, last_attempt=datetime.now().isoformat(timespec='seconds'))
+        try:
+            result = self.job() or {}
+        except Exception as e:
+            print(f"{self.name}: sync failed: {e}")
+            self._publish(running=False, last_error=str(e))
+            return
+
+        result['seconds'] = round(time.perf_counter() - started, 2)
+        print(f"{self.name}: sync done: {result}")
+        self._publish(
+            running=False,
+            last_synced=datetime.now().isoformat(timespec='seconds'),
+            last_error=None,
+            last_result=result
+        )
+
+    def _publish(self, **changes):
+        with self._lock:
+            self._status.update(changes)
+            status = dict(self._status)
+        try:
+            self.status_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.status_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(status, f, indent=2)
+            os.replace(tmp_file, self.status_file)
+        except OSError as e:
+            print(f"{self.name}: could not publish sync status: {e}")
+
+
+def refresh_open_followups(gmail_service, data_service, batch_size: int = 50) -> Dict:
+    """
+    Pending-only refresh: recounts the replies of the emails still open
+    (Pending / Following Up) and saves the changes in one write. Its cost
+    follows the number of open follow-ups, not the size of the mailbox.
+    """
+    followups = data_service.get_open_followups()
+    if followups.empty:
+        return {'mode': 'pending', 'open': 0, 'changed': 0}
+
+    replies = gmail_service.refresh_replies(followups, batch_size)
+    changed = data_service.apply_reply_status(replies)
+    return {'mode': 'pending', 'open': len(followups), 'checked': len(replies), 'changed': changed}
+
+
+def sync_tracked_emails(gmail_service, data_service, options: Optional[Dict] = None,
+                        pending_only: bool = False) -> Dict:
+    """
+    One background sync: refreshes the tracked emails from the Gmail
+    history stored by the last search and upserts them through DataService
+    (it never replaces the table, that is up to a search). Without a stored
+    history (or with pending_only) only the replies of the open follow-ups
+    are refreshed, and so they are when the history has expired, with a
+    warning to search again; nothing is written when Gmail reports no
+    changes.
+    """
+    options = options or {}
+    existing_df = data_service.load_email_data()
+    if existing_df.empty:
+        return {'skipped': 'no search yet'}
+    sync_state = data_service.load_sync_state()
+    if pending_only or not sync_state.get('history_id'):
+        return refresh_open_followups(gmail_service, data_service, options.get('batch_size', 50))
+
+    settings = data_service.load_settings()
+    options = {
+        'days_back': settings.get('default_lookback_days', 30),
+        'keywords': settings.get('default_keywords', ''),
+        **options
+    }
+    df, new_sync_state = gmail_service.incremental_sync(existing_df, sync_state, allow_full_scan=False, **options)
+    if new_sync_state['mode'] == 'expired':
+        result = refresh_open_followups(gmail_service, data_service, options.get('batch_size', 50))
+        return {**result, 'warning': 'Gmail history expired, search again'}
+
+    changes = gmail_service.last_sync_changes
+    if new_sync_state['mode'] == 'incremental' and not any(changes.values()):
+        data_service.save_sync_state(new_sync_state)
+        return {'mode': 'incremental', 'changed': 0}
+
+    if df.empty:
+        return {'mode': new_sync_state['mode'], 'changed': 0}
+    if not data_service.upsert_email_data(data_service.merge_with_existing_data(df)):
+        raise RuntimeError("could not save the synced emails")
+    data_service.save_sync_state(new_sync_state)
+    return {'mode': new_sync_state['mode'], **changes}
@@ -0,0 +1,98 @@
+# src/services/thread_cache.py
+import sys
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+
+class ThreadCache:
+    """Bounded LRU cache of thread summaries keyed by thread_id and historyId"""
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # thread_id -> (history_id, messages, size)
+        self._lock = Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, thread_id: str, history_id: Optional[str]) -> Optional[List[Dict]]:
+        """
+        Returns the cached messages of a thread, or None on a miss.
+        An entry only counts as a hit when its historyId matches the given one,
+        since any change to the thread (like a new reply) bumps its historyId.
+        """
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is None or history_id is None or entry[0] != str(history_id):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(thread_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, thread_id: str, history_id: Optional[str], messages: List[Dict]):
+        """Stores the messages of a thread, evicting the least recently used ones"""
+        if history_id is None:
+            return
+
+        size = self._estimate_size(messages)
+        with self._lock:
+            self._remove(thread_id)
+            if size > self.max_bytes:
+                return
+
+            self._entries[thread_id] = (str(history_id), messages, size)
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def contains_any(self, thread_ids: Iterable[str]) -> bool:
+        """Tells whether any of the threads has a cached entry"""
+        with self._lock:
+            return any(thread_id in self._entries for thread_id in thread_ids)
+
+    def invalidate(self, thread_id: str = None):
+        """Drops one thread from the cache, or all of them"""
+        with self._lock:
+            if thread_id is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            else:
+                self._remove(thread_id)
+
+    def stats(self) -> Dict:
+        """Returns usage counters of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_mb': round(self.current_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0
+            }
+
+    def _remove(self, thread_id: str):
+        """Removes an entry without touching the counters (lock must be held)"""
+        entry = self._entries.pop(thread_id, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def _estimate_size(self, messages: List[Dict]) -> int:
+        """Approximates the memory used by a list of message summaries"""
+        size = sys.getsizeof(messages)
+        for message in messages:
+            size += sys.getsizeof(message)
+            for key, value in message.items():
+                size += sys.getsizeof(key) + sys.getsizeof(value)
+                if isinstance(value, list):
+                    size += sum(sys.getsizeof(item) for item in value)
+        return size
@@ -0,0 +1,253 @@
+# src/utils/api_executor.py
+import random
+import socket
+import ssl
+import threading
+import time
+from typing import Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+# Quota units charged per method (Gmail API usage limits). Calendar counts
+# queries, so every Calendar call costs one unit.
+QUOTA_COSTS = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.labels.list': 1,
+    'gmail.users.history.list': 2,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.list': 5,
+    'gmail.users.threads.get': 10,
+    'gmail.users.threads.list': 10,
+}
+DEFAULT_COSTS = {'gmail': 5, 'calendar': 1}
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# 403 reasons Google uses for quota errors instead of a 429
+THROTTLE_REASONS = ('ratelimitexceeded', 'userratelimitexceeded', 'quotaexceeded')
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+def is_throttle(error: Exception) -> bool:
+    """Tells whether an error means the quota or rate limit was hit"""
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    if error.resp.status == 403:
+        content = error.content.decode('utf-8', errors='ignore') if isinstance(error.content, bytes) else str(error.content)
+        return any(reason in content.lower() for reason in THROTTLE_REASONS)
+    return False
+
+
+def is_retryable(error: Exception) -> bool:
+    """Tells whether an API error is transient and worth retrying"""
+    # HttpError is checked first: it is also an Exception with "ssl" free text
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUS or is_throttle(error)
+    if isinstance(error, (ssl.SSLError, socket.timeout, TimeoutError, ConnectionError)):
+        return True
+    message = str(error).lower()
+    return 'ssl' in message or 'record layer failure' in message
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Reads the Retry-After header of a throttled response, if any"""
+    if not isinstance(error, HttpError):
+        return None
+    value = error.resp.get('retry-after') if hasattr(error.resp, 'get') else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ApiExecutor:
+    """
+    Single execution path for Google API calls of one API and user.
+    Paces calls with a token bucket of quota units per second, caps the
+    calls in flight with an AIMD limit (halved on throttling, grown by one
+    per window of successes), retries transient errors with jittered
+    exponential backoff honoring Retry-After, and opens a circuit breaker
+    after repeated failures so a broken API is not hammered.
+    """
+
+    def __init__(self,
+                 name: str,
+                 units_per_second: float = 250,
+                 max_concurrency: int = 16,
+                 max_retries: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 32.0,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.name = name
+        self.units_per_second = float(units_per_second)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._cond = threading.Condition()
+        # Token bucket, one second worth of budget
+        self._tokens = self.units_per_second
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        # AIMD concurrency limit
+        self._limit = float(max(1, self.max_concurrency // 2))
+        self._in_flight = 0
+        # Circuit breaker
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+        self.counters = {'calls': 0, 'units': 0, 'retries': 0, 'throttled': 0, 'failed': 0, 'rejected': 0}
+
+    def run(self, request, operation: str = None, cost: int = None, http=None):
+        """
+        Executes a googleapiclient request (or anything with execute())
+        and returns its response. Raises the last error once retries are
+        exhausted, or CircuitOpenError while the breaker is open.
+        """
+        operation = operation or getattr(request, 'methodId', None) or self.name
+        cost = self.cost_of(request) if cost is None else cost
+
+        for attempt in range(self.max_retries):
+            self._before_call(cost)
+            try:
+                response = request.execute(http=http) if http is not None else request.execute()
+            except Exception as e:
+                self._release()
+                retryable = is_retryable(e)
+                self.report_error(e)
+                if not retryable or attempt == self.max_retries - 1:
+                    with self._cond:
+                        self.counters['failed'] += 1
+                    raise
+
+                delay = self.retry_delay(attempt, e)
+                with self._cond:
+                    self.counters['retries'] += 1
+                print(f"{self.name}: {operation} failed on attempt {attempt + 1}/{self.max_retries} ({e}). Retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self._release()
+            self.report_success()
+            return response
+
+    def cost_of(self, request) -> int:
+        """Quota units of a request, from its method id"""
+        method_id = getattr(request, 'methodId', None)
+        return QUOTA_COSTS.get(method_id, DEFAULT_COSTS.get(self.name, 1))
+
+    def retry_delay(self, attempt: int, error: Exception = None) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After when given"""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def report_success(self):
+        """Additive increase of the concurrency limit and breaker reset"""
+        with self._cond:
+            self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+            self._cond.notify_all()
+
+    def report_error(self, error: Exception):
+        """Feeds a failed call (or batch item) into the limiter and the breaker"""
+        with self._cond:
+            self._probing = False
+            if is_throttle(error):
+                # Multiplicative decrease, and everyone waits out Retry-After
+                self.counters['throttled'] += 1
+                self._limit = max(1.0, self._limit / 2)
+                retry_after = retry_after_seconds(error)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif is_retryable(error):
+                self._failures += 1
+                # A failed half-open probe opens the circuit again
+                if self._failures >= self.failure_threshold and self._circuit_state() != 'open':
+                    self._opened_at = time.monotonic()
+                    print(f"{self.name}: circuit opened after {self._failures} consecutive failures")
+            else:
+                # The API answered (a 404, a bad request...), so it is reachable
+                self._failures = 0
+                self._opened_at = None
+
+    def stats(self) -> Dict:
+        """Returns counters and the current limiter state"""
+        with self._cond:
+            return {
+                **self.counters,
+                'concurrency_limit': round(self._limit, 1),
+                'in_flight': self._in_flight,
+                'circuit': self._circuit_state()
+            }
+
+    def _before_call(self, cost: int):
+        """Waits for the breaker, a concurrency slot and enough quota units"""
+        with self._cond:
+            state = self._circuit_state()
+            if state == 'open' or (state == 'half_open' and self._probing):
+                self.counters['rejected'] += 1
+                raise CircuitOpenError(f"{self.name} API calls paused after repeated failures")
+            if state == 'half_open':
+                # Let a single probe through
+                self._probing = True
+
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.units_per_second, self._tokens + (now - self._refilled_at) * self.units_per_second)
+                self._refilled_at = now
+                # Costs above the bucket size go into debt instead of waiting forever
+                needed = min(cost, self.units_per_second)
+                wait = max(self._paused_until - now, (needed - self._tokens) / self.units_per_second)
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+
+            self._tokens -= cost
+            self.counters['calls'] += 1
+            self.counters['units'] += cost
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _circuit_state(self) -> str:
+        """closed, open or half_open (lock must be held)"""
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(api: str, account: str = 'me', **settings) -> ApiExecutor:
+    """
+    Returns the executor shared by every caller of an API for one account.
+    settings only apply when the executor is created.
+    """
+    with _executors_lock:
+        key = (api, account)
+        if key not in _executors:
+            _executors[key] = ApiExecutor(api, **settings)
+        return _executors[key]
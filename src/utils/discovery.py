@@ -0,0 +1,123 @@
+# src/utils/discovery.py
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+# Discovery documents read in this process: 'gmail.v1' -> JSON text.
+# The text (not the parsed dict) is kept because building a service
+# fills in the method descriptions of the document it is given.
+_documents = {}
+_lock = threading.Lock()
+_cache_dir = None
+
+# How each service was built: 'gmail.v1' -> {'source', 'load_ms', 'build_ms'}
+build_timings = {}
+
+# Authenticated services shared by every caller (and Streamlit session) of the process
+_services = {}
+_services_lock = threading.Lock()
+
+
+def set_cache_dir(cache_dir: Path):
+    """Directory where discovery documents are kept on disk"""
+    global _cache_dir
+    _cache_dir = Path(cache_dir)
+
+
+def load_document(api: str, version: str) -> Tuple[Optional[str], str]:
+    """
+    Returns the discovery document of an API and where it came from:
+    memory, disk (the cache directory), bundled (the copy shipped with
+    google-api-python-client, saved to disk for next time) or None when
+    only the network has it.
+    """
+    name = f'{api}.{version}'
+    with _lock:
+        if name in _documents:
+            return _documents[name], 'memory'
+
+        local_file = _cache_dir / f'{name}.json' if _cache_dir else None
+        if local_file is not None and local_file.exists():
+            content, source = local_file.read_text(encoding='utf-8'), 'disk'
+        else:
+            from googleapiclient.discovery_cache import get_static_doc
+            content, source = get_static_doc(api, version), 'bundled'
+            if content is None:
+                return None, 'network'
+            if local_file is not None:
+                _save_document(local_file, content)
+
+        _documents[name] = content
+        return content, source
+
+
+def build_service(api: str, version: str, credentials) -> object:
+    """Builds an API client from the local discovery document, timing it"""
+    # googleapiclient.discovery is slow to import and only needed here
+    from googleapiclient.discovery import build, build_from_document
+
+    started = time.perf_counter()
+    document, source = load_document(api, version)
+    loaded = time.perf_counter()
+
+    if document is None:
+        service = build(api, version, credentials=credentials, static_discovery=False)
+    else:
+        service = build_from_document(document, credentials=credentials)
+    built = time.perf_counter()
+
+    timing = {
+        'source': source,
+        'load_ms': round((loaded - started) * 1000, 1),
+        'build_ms': round((built - loaded) * 1000, 1)
+    }
+    build_timings[f'{api}.{version}'] = timing
+    print(f"Built {api} {version} from the {source} discovery document: "
+          f"load {timing['load_ms']} ms, build {timing['build_ms']} ms")
+    return service
+
+
+def new_http(service, timeout: float = 30) -> object:
+    """
+    A new HTTP client authorized with the credentials of service, for a
+    call made off the thread that owns it (httplib2 is not thread-safe)
+    """
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+
+    return AuthorizedHttp(service._http.credentials, http=httplib2.Http(timeout=timeout))
+
+
+def shared_service(key: str, factory: Callable[[], Optional[object]]) -> Optional[object]:
+    """
+    Returns the service stored under key, building it with factory the
+    first time. A failed build (None) is not stored, so it is retried.
+    """
+    with _services_lock:
+        service = _services.get(key)
+    if service is not None:
+        return service
+
+    service = factory()
+    if service is not None:
+        with _services_lock:
+            service = _services.setdefault(key, service)
+    return service
+
+
+def drop_shared_service(key: str):
+    """Forgets a shared service, e.g. after its credentials were revoked"""
+    with _services_lock:
+        _services.pop(key, None)
+
+
+def _save_document(local_file: Path, content: str):
+    try:
+        local_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = local_file.with_suffix('.tmp')
+        tmp_file.write_text(content, encoding='utf-8')
+        os.replace(tmp_file, local_file)
+    except OSError as e:
+        print(f"Could not save discovery document {local_file.name}: {e}")
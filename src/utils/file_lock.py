@@ -0,0 +1,56 @@
+# src/utils/file_lock.py
+from pathlib import Path
+from threading import Lock
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Lock shared by the threads of this process (one threading.Lock per
+    path) and by other processes (flock on the file, msvcrt on Windows).
+    Used as a context manager; it is not reentrant.
+    """
+
+    _locks = {}
+    _locks_guard = Lock()
+
+    def __init__(self, lock_file: Path):
+        self.lock_file = lock_file
+        with self._locks_guard:
+            self._lock = self._locks.setdefault(str(lock_file.resolve()), Lock())
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.lock_file, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+            self._lock.release()
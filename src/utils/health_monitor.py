@@ -0,0 +1,87 @@
+# src/utils/health_monitor.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Tuple
+
+# A probe returns (ok, message) and must not call Streamlit
+Probe = Callable[[], Tuple[bool, str]]
+
+
+class HealthMonitor:
+    """
+    Cached connection health of the Google APIs. Results are reused for
+    ttl_seconds (failures for failure_ttl_seconds, so a recovery is noticed
+    soon). A stale result is returned right away while the probe refreshes
+    it in the background; only a service that was never checked waits, and
+    all of its probes run concurrently under a single deadline.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, failure_ttl_seconds: float = 30, deadline_seconds: float = 10):
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.deadline_seconds = deadline_seconds
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='health-probe')
+
+    def check(self, probes: Dict[str, Probe], force: bool = False) -> Dict[str, Dict]:
+        """
+        Returns {name: {'ok', 'message', 'checked_at'}} for every probe.
+        ok is None when a first check did not finish before the deadline.
+        """
+        waiting = []
+        with self._lock:
+            for name, probe in probes.items():
+                result = self._results.get(name)
+                if not force and result is not None and not self._is_stale(result):
+                    continue
+                future = self._pending.get(name)
+                if future is None:
+                    future = self._pool.submit(self._run_probe, name, probe)
+                    self._pending[name] = future
+                if force or result is None:
+                    waiting.append(future)
+
+        if waiting:
+            wait(waiting, timeout=self.deadline_seconds)
+
+        with self._lock:
+            return {
+                name: dict(self._results.get(name) or {
+                    'ok': None,
+                    'message': f"No answer from {name} after {self.deadline_seconds:g}s",
+                    'checked_at': None
+                })
+                for name in probes
+            }
+
+    def invalidate(self, name: str = None):
+        """Forgets a cached result (all of them when name is None)"""
+        with self._lock:
+            if name is None:
+                self._results.clear()
+            else:
+                self._results.pop(name, None)
+
+    def _is_stale(self, result: Dict) -> bool:
+        ttl = self.ttl_seconds if result['ok'] else self.failure_ttl_seconds
+        return time.monotonic() - result['monotonic'] >= ttl
+
+    def _run_probe(self, name: str, probe: Probe):
+        started = time.perf_counter()
+        try:
+            ok, message = probe()
+        except Exception as e:
+            ok, message = False, f"{name} health check failed: {e}"
+        print(f"Health check {name}: {'ok' if ok else 'failed'} in {time.perf_counter() - started:.2f}s")
+
+        with self._lock:
+            self._results[name] = {
+                'ok': ok,
+                'message': message,
+                'checked_at': time.strftime('%H:%M:%S'),
+                'monotonic': time.monotonic()
+            }
+            self._pending.pop(name, None)
@@ -0,0 +1,70 @@
+# src/utils/import_timer.py
+import builtins
+import sys
+import threading
+import time
+from typing import Dict, List
+
+# module -> {'total_ms', 'self_ms'} of its first import
+import_times = {}
+_original_import = None
+_reported_count = 0
+_state = threading.local()
+
+
+def install():
+    """
+    Times every first-time import from now on (like python -X importtime,
+    but readable from the app). Installing twice is a no-op.
+    """
+    global _original_import
+    if _original_import is not None:
+        return
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def is_installed() -> bool:
+    return _original_import is not None
+
+
+def report(limit: int = 25) -> List[Dict]:
+    """Slowest imports by their own time (excluding the modules they imported)"""
+    rows = [{'module': name, **times} for name, times in import_times.items()]
+    rows.sort(key=lambda row: row['self_ms'], reverse=True)
+    return rows[:limit]
+
+
+def print_report(limit: int = 25):
+    """Prints the report, unless no module was imported since the last one"""
+    global _reported_count
+    if len(import_times) == _reported_count:
+        return
+    _reported_count = len(import_times)
+
+    rows = report(limit)
+    total = sum(times['self_ms'] for times in import_times.values())
+    print(f"Import time: {total:.0f} ms in {len(import_times)} modules, slowest first:")
+    for row in rows:
+        print(f"  {row['self_ms']:8.1f} ms self {row['total_ms']:8.1f} ms total  {row['module']}")
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Only absolute imports of modules not loaded yet cost anything
+    if level != 0 or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    children = getattr(_state, 'children', None)
+    _state.children = 0.0
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = _state.children
+        _state.children = (children or 0.0) + elapsed
+        if name not in import_times:
+            import_times[name] = {
+                'total_ms': round(elapsed * 1000, 1),
+                'self_ms': round((elapsed - nested) * 1000, 1)
+            }
@@ -0,0 +1,131 @@
+# src/utils/reporter.py
+import sys
+import threading
+from typing import Optional, TextIO
+
+
+class ProgressBar:
+    """Progress of a long operation, the interface of st.progress"""
+
+    def progress(self, value: float):
+        """Sets the completed fraction, from 0 to 1"""
+
+    def empty(self):
+        """Removes the bar once the operation is done"""
+
+
+class Reporter:
+    """
+    Where services send the messages and progress meant for the user.
+    The base class drops everything; StreamlitReporter shows it in the page
+    and ConsoleReporter prints it, so the services run the same with or
+    without Streamlit.
+    """
+
+    def info(self, message: str):
+        pass
+
+    def success(self, message: str):
+        pass
+
+    def warning(self, message: str):
+        pass
+
+    def error(self, message: str):
+        pass
+
+    def progress(self) -> ProgressBar:
+        return ProgressBar()
+
+
+class StreamlitReporter(Reporter):
+    """Shows messages with st.info/st.error... and progress with st.progress"""
+
+    def __init__(self):
+        import streamlit as st
+        self.st = st
+
+    def info(self, message: str):
+        self.st.info(message)
+
+    def success(self, message: str):
+        self.st.success(message)
+
+    def warning(self, message: str):
+        self.st.warning(message)
+
+    def error(self, message: str):
+        self.st.error(message)
+
+    def progress(self) -> ProgressBar:
+        return self.st.progress(0)
+
+
+class ConsoleProgressBar(ProgressBar):
+    """Prints the progress every step (10% by default)"""
+
+    def __init__(self, reporter: 'ConsoleReporter', step: float = 0.1):
+        self.reporter = reporter
+        self.step = step
+        self._printed = -1.0
+
+    def progress(self, value: float):
+        if value >= 1.0 or value - self._printed >= self.step:
+            self._printed = value
+            self.reporter.write('progress', f"{value:.0%}")
+
+    def empty(self):
+        pass
+
+
+class ConsoleReporter(Reporter):
+    """Prints messages (and progress unless quiet) to a stream, stderr by default"""
+
+    def __init__(self, prefix: str = '', stream: Optional[TextIO] = None, quiet: bool = False):
+        self.prefix = prefix
+        self.stream = stream
+        self.quiet = quiet
+        self._lock = threading.Lock()
+
+    def info(self, message: str):
+        if not self.quiet:
+            self.write('info', message)
+
+    def success(self, message: str):
+        if not self.quiet:
+            self.write('ok', message)
+
+    def warning(self, message: str):
+        self.write('warning', message)
+
+    def error(self, message: str):
+        self.write('error', message)
+
+    def progress(self) -> ProgressBar:
+        return ProgressBar() if self.quiet else ConsoleProgressBar(self)
+
+    def write(self, level: str, message: str):
+        with self._lock:
+            print(f"{self.prefix}[{level}] {message}", file=self.stream or sys.stderr, flush=True)
+
+
+_default = None
+
+
+def get_reporter() -> Reporter:
+    """
+    The process-wide reporter: the one set with set_reporter, else
+    Streamlit inside a running Streamlit app and the console otherwise
+    """
+    if _default is not None:
+        return _default
+    if 'streamlit' in sys.modules:
+        from streamlit import runtime
+        if runtime.exists():
+            return StreamlitReporter()
+    return ConsoleReporter()
+
+
+def set_reporter(reporter: Reporter):
+    global _default
+    _default = reporter
@@ -0,0 +1,44 @@
+# tests/test_reply_counting.py
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from services.gmail_service import GmailService
+
+
+def minimal_message(message_id: str, internal_date: int, labels):
+    """A message as threads.get(format='minimal') returns it"""
+    return {'id': message_id, 'threadId': 't1', 'internalDate': str(internal_date), 'labelIds': labels}
+
+
+class RefreshRepliesTest(unittest.TestCase):
+    def refresh(self, thread_messages):
+        service = SimpleNamespace(users=lambda: SimpleNamespace(threads=lambda: None))
+        gmail_service = GmailService(SimpleNamespace(account='test'), service=service)
+        gmail_service._execute_batch = lambda factories, batch_size: {'t1': {'id': 't1', 'messages': thread_messages}}
+        followups = pd.DataFrame([{'id': 'm1', 'thread_id': 't1'}])
+        return gmail_service.refresh_replies(followups)['m1']
+
+    def test_own_follow_up_is_not_a_reply(self):
+        replies = self.refresh([
+            minimal_message('m1', 1_000, ['SENT']),
+            minimal_message('f1', 2_000, ['SENT'])
+        ])
+        self.assertEqual(replies, (False, 0))
+
+    def test_received_message_after_follow_up_is_a_reply(self):
+        replies = self.refresh([
+            minimal_message('m1', 1_000, ['SENT']),
+            minimal_message('f1', 2_000, ['SENT']),
+            minimal_message('r1', 3_000, ['INBOX', 'UNREAD'])
+        ])
+        self.assertEqual(replies, (True, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()